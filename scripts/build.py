@@ -93,6 +93,8 @@ a = Analysis(
         'uvicorn.lifespan.on',
         'pywebview',
         'sqlite3',
+        'pysqlite3',
+        'pysqlite3.dbapi2',
         
         # Pydantic and validation
         'pydantic',
@@ -121,11 +123,16 @@ a = Analysis(
         # Other required packages
         'multipart',
         'python_multipart',
-        'jose',
+        'jwt',
+        'orjson',
         'passlib',
         'passlib.handlers',
         'passlib.handlers.bcrypt',
         'bcrypt',
+        'argon2',
+        'argon2.exceptions',
+        '_argon2_cffi_bindings',
+        '_cffi_backend',
         'cryptography',
         'reportlab',
         'PIL',
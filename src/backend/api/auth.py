@@ -4,7 +4,8 @@ AUTHENTICATION API ENDPOINTS
 """
 
 import datetime
-from fastapi import APIRouter, HTTPException, Depends, Request, Body
+from typing import Optional
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Depends, Query, Request, Body
 from fastapi.responses import JSONResponse
 from pydantic import BaseModel
 import logging
@@ -23,9 +24,10 @@ from core.auth import (
     update_user,
     delete_user,
     get_active_sessions,
-    terminate_session
+    terminate_session,
+    role_summary
 )
-from core.logger import audit_log
+from core.database import get_db_cursor, get_db_read_cursor
 
 router = APIRouter(prefix="/auth", tags=["authentication"])
 logger = logging.getLogger(__name__)
@@ -103,6 +105,7 @@ async def refresh_token(
 @router.post("/logout")
 async def logout(
     request: Request,
+    background_tasks: BackgroundTasks,
     current_user: dict = Depends(get_current_user)
 ):
     """
@@ -110,7 +113,7 @@ async def logout(
     """
     try:
         session_token = request.headers.get("X-Session-Token")
-        await auth_manager.logout_user(current_user["id"], session_token)
+        await auth_manager.logout_user(current_user["id"], background_tasks, session_token)
         
         return {"success": True, "message": "Logged out successfully"}
         
@@ -125,6 +128,7 @@ async def logout(
 async def change_password(
     password_data: ChangePasswordRequest,
     request: Request,
+    background_tasks: BackgroundTasks,
     current_user: dict = Depends(get_current_user)
 ):
     """
@@ -135,7 +139,8 @@ async def change_password(
             current_user["id"],
             password_data.current_password,
             password_data.new_password,
-            request
+            request,
+            background_tasks
         )
         
         if success:
@@ -170,13 +175,15 @@ async def get_current_user_info(
 async def create_new_user(
     user_data: UserCreate,
     request: Request,
-    current_user: dict = Depends(get_current_user)
+    background_tasks: BackgroundTasks,
+    current_user: dict = Depends(get_current_user),
+    cursor = Depends(get_db_cursor)
 ):
     """
     Create a new user (admin only).
     """
     try:
-        user = await create_user(user_data, current_user, request)
+        user = await create_user(user_data, current_user, request, cursor, background_tasks)
         return {"success": True, "user": user}
         
     except HTTPException as e:
@@ -190,14 +197,22 @@ async def create_new_user(
 
 @router.get("/users", dependencies=[Depends(require_permission("users.manage"))])
 async def get_all_users(
-    current_user: dict = Depends(get_current_user)
+    hydrate: bool = Query(False),
+    after_id: Optional[int] = Query(None),
+    limit: Optional[int] = Query(None, ge=1, le=200),
+    current_user: dict = Depends(get_current_user),
+    cursor = Depends(get_db_read_cursor)
 ):
     """
-    Get all users (admin only).
+    Get users (admin only), newest first.
+    Pass hydrate=true to include each user's role permissions. Without
+    limit every user is returned; with it, pass the returned next_cursor
+    as after_id to fetch the next page.
     """
     try:
-        users = await get_users(current_user)
-        return {"success": True, "users": users}
+        users = await get_users(current_user, cursor, hydrate, after_id, limit)
+        next_cursor = users[-1]["id"] if limit is not None and len(users) == limit else None
+        return {"success": True, "users": users, "next_cursor": next_cursor}
         
     except HTTPException as e:
         raise e
@@ -211,40 +226,32 @@ async def get_all_users(
 @router.get("/users/{user_id}", dependencies=[Depends(require_permission("users.manage"))])
 async def get_user_by_id(
     user_id: int,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user),
+    cursor = Depends(get_db_read_cursor)
 ):
     """
     Get user by ID (admin only).
     """
     try:
-        from core.database import get_database_manager
+        cursor.execute('''
+            SELECT id, username, full_name, role, status,
+                   phone, cnic, salary, commission_rate,
+                   last_login, created_at, login_attempts
+            FROM users 
+            WHERE id = ?
+        ''', (user_id,))
+        
+        user = cursor.fetchone()
+        if not user:
+            raise HTTPException(status_code=404, detail="User not found")
+        
+        user_dict = dict(user)
+        
+        # Add role info
+        user_dict.update(role_summary(user_dict["role"]))
+        
+        return {"success": True, "user": user_dict}
         
-        db_manager = get_database_manager()
-        with db_manager.get_cursor() as cursor:
-            cursor.execute('''
-                SELECT id, username, full_name, role, status,
-                       phone, cnic, salary, commission_rate,
-                       last_login, created_at, login_attempts
-                FROM users 
-                WHERE id = ?
-            ''', (user_id,))
-            
-            user = cursor.fetchone()
-            if not user:
-                raise HTTPException(status_code=404, detail="User not found")
-            
-            user_dict = dict(user)
-            
-            # Add role info
-            from core.auth import PAKISTANI_ROLES
-            role_config = PAKISTANI_ROLES.get(user_dict["role"], {})
-            user_dict.update({
-                "role_name": role_config.get("name", user_dict["role"]),
-                "permissions": role_config.get("permissions", [])
-            })
-            
-            return {"success": True, "user": user_dict}
-            
     except HTTPException as e:
         raise e
     except Exception as e:
@@ -259,13 +266,15 @@ async def update_user_by_id(
     user_id: int,
     user_data: UserUpdate,
     request: Request,
-    current_user: dict = Depends(get_current_user)
+    background_tasks: BackgroundTasks,
+    current_user: dict = Depends(get_current_user),
+    cursor = Depends(get_db_cursor)
 ):
     """
     Update user by ID (admin only).
     """
     try:
-        user = await update_user(user_id, user_data, current_user, request)
+        user = await update_user(user_id, user_data, current_user, request, cursor, background_tasks)
         return {"success": True, "user": user}
         
     except HTTPException as e:
@@ -281,13 +290,15 @@ async def update_user_by_id(
 async def delete_user_by_id(
     user_id: int,
     request: Request,
-    current_user: dict = Depends(get_current_user)
+    background_tasks: BackgroundTasks,
+    current_user: dict = Depends(get_current_user),
+    cursor = Depends(get_db_cursor)
 ):
     """
     Delete user by ID (admin only).
     """
     try:
-        success = await delete_user(user_id, current_user, request)
+        success = await delete_user(user_id, current_user, request, cursor, background_tasks)
         if success:
             return {"success": True, "message": "User deleted successfully"}
         else:
@@ -310,14 +321,15 @@ async def delete_user_by_id(
 @router.get("/sessions/{user_id}")
 async def get_user_sessions(
     user_id: int,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user),
+    cursor = Depends(get_db_read_cursor)
 ):
     """
     Get active sessions for a user.
     Users can view their own sessions, admins can view all.
     """
     try:
-        sessions = await get_active_sessions(user_id, current_user)
+        sessions = await get_active_sessions(user_id, current_user, cursor)
         return {"success": True, "sessions": sessions}
         
     except HTTPException as e:
@@ -333,14 +345,16 @@ async def get_user_sessions(
 async def terminate_user_session(
     session_token: str,
     request: Request,
-    current_user: dict = Depends(get_current_user)
+    background_tasks: BackgroundTasks,
+    current_user: dict = Depends(get_current_user),
+    cursor = Depends(get_db_cursor)
 ):
     """
     Terminate a specific session.
     Users can terminate their own sessions, admins can terminate any.
     """
     try:
-        success = await terminate_session(session_token, current_user, request)
+        success = await terminate_session(session_token, current_user, request, cursor, background_tasks)
         if success:
             return {"success": True, "message": "Session terminated successfully"}
         else:
@@ -164,11 +164,10 @@ async def get_credit_sales(
         db = get_database_manager()
         with db.get_cursor() as cur:
             query = """
-                SELECT s.id, s.invoice_number, s.customer_id, c.full_name as customer_name,
+                SELECT s.id, s.invoice_number, s.customer_id, s.customer_name,
                        s.created_at, s.grand_total, s.balance_due, s.payment_status,
                        s.customer_phone, s.notes
                 FROM sales s
-                LEFT JOIN customers c ON s.customer_id = c.id
                 WHERE s.payment_status IN ('pending', 'partial')
             """
             params = []
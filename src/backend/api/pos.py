@@ -8,11 +8,31 @@ from typing import List, Dict, Any, Optional
 import logging
 
 from core.auth import get_current_user, require_permission
-from core.database import get_database_manager
+from core.database import get_database_manager, SQLITE_HAS_RETURNING
 
 router = APIRouter(prefix="/pos", tags=["pos"])
 logger = logging.getLogger(__name__)
 
+# Column order for the batched line-item inserts below
+_SALE_ITEM_COLUMNS = [
+    "sale_id", "product_id", "product_code", "product_name",
+    "quantity", "unit_price", "cost_price",
+    "line_total", "line_profit", "created_at"
+]
+_STOCK_MOVEMENT_COLUMNS = [
+    "product_id", "movement_type", "quantity",
+    "previous_quantity", "new_quantity", "unit_cost",
+    "total_cost", "reference_id", "reference_type",
+    "reason", "notes", "created_by", "created_at"
+]
+
+
+def _log_analyze_failure(future):
+    """Log a failed background ANALYZE (submit_write futures are not awaited)."""
+    error = future.exception()
+    if error is not None:
+        logger.warning(f"Planner statistics refresh failed: {error}")
+
 
 @router.post("/transaction", dependencies=[Depends(require_permission("pos.sell"))])
 async def create_pos_transaction(
@@ -35,15 +55,21 @@ async def create_pos_transaction(
             payment_method = transaction_data.get("payment_type", "cash")
             payment_status = "pending" if payment_method.lower() in ["credit", "credit_sale"] else "paid"
             
+            # Customer name/phone are copied onto the sale so listings need no join
+            customer_id = transaction_data.get("customer_id")
             cur.execute("""
                 INSERT INTO sales (
-                    invoice_number, customer_id, grand_total, subtotal, discount_amount,
+                    invoice_number, customer_id, customer_name, customer_phone,
+                    grand_total, subtotal, discount_amount,
                     gst_amount, payment_method, payment_status, notes,
                     cashier_id, cashier_name, created_at, updated_at
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ) VALUES (
+                    ?, ?, (SELECT full_name FROM customers WHERE id = ?), (SELECT phone FROM customers WHERE id = ?),
+                    ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?
+                )
             """, (
                 invoice_number,
-                transaction_data.get("customer_id"),
+                customer_id, customer_id, customer_id,
                 transaction_data.get("total_amount", 0),
                 transaction_data.get("subtotal", 0),
                 transaction_data.get("discount_amount", 0),
@@ -60,13 +86,29 @@ async def create_pos_transaction(
             sale_id = cur.lastrowid
             
             # Add items and update stock
+            sale_items = []
+            stock_movements = []
             for item in transaction_data.get("items", []):
                 product_id = item.get("product_id")
                 quantity = item.get("quantity")
                 
-                # Fetch product details for the invoice
-                cur.execute("SELECT product_code, name, cost_price, current_stock FROM products WHERE id = ?", (product_id,))
-                product_row = cur.fetchone()
+                # Take the stock and read back the invoice details in one
+                # statement (current_stock comes back as the pre-sale level)
+                if SQLITE_HAS_RETURNING:
+                    cur.execute("""
+                        UPDATE products SET current_stock = current_stock - ?
+                        WHERE id = ?
+                        RETURNING product_code, name, cost_price, current_stock + ? AS current_stock
+                    """, (quantity, product_id, quantity))
+                    product_row = cur.fetchone()
+                else:
+                    cur.execute("SELECT product_code, name, cost_price, current_stock FROM products WHERE id = ?", (product_id,))
+                    product_row = cur.fetchone()
+                    if product_row:
+                        cur.execute(
+                            "UPDATE products SET current_stock = current_stock - ? WHERE id = ?",
+                            (quantity, product_id)
+                        )
                 
                 if not product_row:
                     raise HTTPException(status_code=400, detail=f"Product ID {product_id} not found")
@@ -82,14 +124,8 @@ async def create_pos_transaction(
                 # Calculate profit
                 line_profit = line_total - (cost_price * quantity)
                 
-                # Add sale item
-                cur.execute("""
-                    INSERT INTO sale_items (
-                        sale_id, product_id, product_code, product_name,
-                        quantity, unit_price, cost_price,
-                        line_total, line_profit, created_at
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """, (
+                # Queue sale item
+                sale_items.append((
                     sale_id,
                     product_id,
                     product_code,
@@ -102,22 +138,10 @@ async def create_pos_transaction(
                     datetime.datetime.now().isoformat(sep=' ')
                 ))
                 
-                # Update product stock
                 new_stock = current_stock - quantity
-                cur.execute(
-                    "UPDATE products SET current_stock = ? WHERE id = ?",
-                    (new_stock, product_id)
-                )
                 
-                # Record stock movement
-                cur.execute("""
-                    INSERT INTO stock_movements (
-                        product_id, movement_type, quantity, 
-                        previous_quantity, new_quantity, unit_cost,
-                        total_cost, reference_id, reference_type,
-                        reason, notes, created_by, created_at
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """, (
+                # Queue stock movement
+                stock_movements.append((
                     product_id,
                     "sale",
                     -quantity,
@@ -133,6 +157,10 @@ async def create_pos_transaction(
                     datetime.datetime.now().isoformat()
                 ))
             
+            # One executemany per table instead of one INSERT per line
+            db.bulk_insert("sale_items", _SALE_ITEM_COLUMNS, sale_items, cursor=cur)
+            db.bulk_insert("stock_movements", _STOCK_MOVEMENT_COLUMNS, stock_movements, cursor=cur)
+            
             # Record payment
             cur.execute("""
                 INSERT INTO payments (
@@ -326,6 +354,10 @@ async def close_session(
                 session_id
             ))
         
+        # Refresh planner statistics (STAT4 histograms where compiled in)
+        # after the day's sales, on the writer thread rather than this request
+        db.submit_write("ANALYZE").add_done_callback(_log_analyze_failure)
+        
         return {
             "success": True,
             "message": "POS session closed successfully"
@@ -352,15 +384,20 @@ async def hold_sale(
             cashier_name = current_user.get("name") or current_user.get("username") or f"User {current_user['id']}"
             
             # Create sale with 'hold' status
+            customer_id = sale_data.get("customer_id")
             cur.execute("""
                 INSERT INTO sales (
-                    invoice_number, customer_id, grand_total, subtotal, discount_amount,
+                    invoice_number, customer_id, customer_name, customer_phone,
+                    grand_total, subtotal, discount_amount,
                     gst_amount, payment_method, payment_status, notes,
                     cashier_id, cashier_name, created_at, updated_at, sale_status, hold_reason
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ) VALUES (
+                    ?, ?, (SELECT full_name FROM customers WHERE id = ?), (SELECT phone FROM customers WHERE id = ?),
+                    ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?
+                )
             """, (
                 invoice_number,
-                sale_data.get("customer_id"),
+                customer_id, customer_id, customer_id,
                 sale_data.get("total_amount", 0),
                 sale_data.get("subtotal", 0),
                 sale_data.get("discount_amount", 0),
@@ -379,6 +416,7 @@ async def hold_sale(
             sale_id = cur.lastrowid
             
             # Add items to the sale
+            sale_items = []
             for item in sale_data.get("items", []):
                 product_id = item.get("product_id")
                 quantity = item.get("quantity")
@@ -400,14 +438,8 @@ async def hold_sale(
                 # Calculate profit
                 line_profit = line_total - (cost_price * quantity)
                 
-                # Add sale item
-                cur.execute("""
-                    INSERT INTO sale_items (
-                        sale_id, product_id, product_code, product_name,
-                        quantity, unit_price, cost_price,
-                        line_total, line_profit, created_at
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """, (
+                # Queue sale item
+                sale_items.append((
                     sale_id,
                     product_id,
                     product_code,
@@ -420,6 +452,8 @@ async def hold_sale(
                     datetime.datetime.now().isoformat(sep=' ')
                 ))
             
+            db.bulk_insert("sale_items", _SALE_ITEM_COLUMNS, sale_items, cursor=cur)
+            
             # Update customer's credit balance if this is a credit sale
             customer_id = sale_data.get("customer_id")
             if customer_id:
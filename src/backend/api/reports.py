@@ -29,7 +29,7 @@ from typing import Dict, Any, Optional
 import logging
 
 from core.auth import get_current_user, require_permission
-from core.database import get_database_manager
+from core.database import get_database_manager, namedtuple_row_factory
 
 router = APIRouter(prefix="/reports", tags=["reports"])
 logger = logging.getLogger(__name__)
@@ -80,24 +80,21 @@ def _get_shop_info():
     """Return (shop_name, logo_path) from DB if available."""
     try:
         db = get_database_manager()
-        with db.get_cursor() as cur:
-            cur.execute("SELECT shop_name, logo_path FROM shop_settings LIMIT 1")
-            row = cur.fetchone()
-            if row:
-                shop = dict(row)
-                shop_name = shop.get('shop_name') or 'Auto Accessories POS'
-                logo_path = shop.get('logo_path')
-                # If logo_path is relative, try to resolve under app data uploads
-                if logo_path and not os.path.isabs(logo_path):
-                    # attempt to find under DB manager app_data_path
-                    try:
-                        base = get_database_manager().app_data_path
-                        candidate = os.path.join(str(base), 'uploads', logo_path)
-                        if os.path.exists(candidate):
-                            logo_path = candidate
-                    except Exception:
-                        pass
-                return shop_name, logo_path
+        shop = db.get_shop_settings()
+        if shop:
+            shop_name = shop.get('shop_name') or 'Auto Accessories POS'
+            logo_path = shop.get('logo_path')
+            # If logo_path is relative, try to resolve under app data uploads
+            if logo_path and not os.path.isabs(logo_path):
+                # attempt to find under DB manager app_data_path
+                try:
+                    base = db.app_data_path
+                    candidate = os.path.join(str(base), 'uploads', logo_path)
+                    if os.path.exists(candidate):
+                        logo_path = candidate
+                except Exception:
+                    pass
+            return shop_name, logo_path
     except Exception:
         pass
     return 'Auto Accessories POS', None
@@ -418,6 +415,7 @@ async def sales_pdf(
     try:
         db = get_database_manager()
         with db.get_cursor() as cur:
+            cur.row_factory = namedtuple_row_factory
             query = """
                 SELECT s.created_at,
                        COALESCE(c.full_name, s.customer_id) as customer,
@@ -659,6 +657,7 @@ async def gst_pdf(
     try:
         db = get_database_manager()
         with db.get_cursor() as cur:
+            cur.row_factory = namedtuple_row_factory
             # omit invoice_number from GST PDF per request
             query = "SELECT created_at, subtotal, gst_amount FROM sales WHERE gst_amount > 0 AND sale_status != 'cancelled'"
             params = []
@@ -807,23 +806,19 @@ async def dashboard_analytics(
             today = datetime.now().date()
             yesterday = today - timedelta(days=1)
             
-            # Today's sales
-            cur.execute("""
-                SELECT COUNT(*) as transactions, SUM(grand_total) as total_sales,
-                       COUNT(DISTINCT customer_id) as unique_customers
-                FROM sales 
-                WHERE DATE(created_at) = ? AND sale_status != 'cancelled'
-            """, (today,))
-            today_data = cur.fetchone()
-            
-            # Yesterday's sales
+            # Today's and yesterday's sales in one pass. The created_at range
+            # (rather than DATE(created_at) = ?) lets idx_sales_created limit
+            # the scan to these two days however long the history is.
             cur.execute("""
-                SELECT COUNT(*) as transactions, SUM(grand_total) as total_sales,
+                SELECT DATE(created_at) as day, COUNT(*) as transactions, SUM(grand_total) as total_sales,
                        COUNT(DISTINCT customer_id) as unique_customers
                 FROM sales 
-                WHERE DATE(created_at) = ? AND sale_status != 'cancelled'
-            """, (yesterday,))
-            yesterday_data = cur.fetchone()
+                WHERE created_at >= ? AND created_at < ? AND sale_status != 'cancelled'
+                GROUP BY day
+            """, (yesterday.isoformat(), (today + timedelta(days=1)).isoformat()))
+            by_day = {row[0]: row[1:] for row in cur.fetchall()}
+            today_data = by_day.get(today.isoformat(), (0, 0, 0))
+            yesterday_data = by_day.get(yesterday.isoformat(), (0, 0, 0))
             
             # Calculate metrics
             today_sales = today_data[1] or 0
@@ -199,18 +199,28 @@ async def create_sale(
             # Insert sale record
             cur.execute('''
                 INSERT INTO sales (
-                    invoice_number, invoice_date, customer_id, customer_name,
+                    invoice_number, invoice_date, customer_id, customer_name, customer_phone,
                     total_items, total_quantity, subtotal, discount_amount, discount_percent,
                     gst_amount, gst_rate, additional_tax, withholding_tax,
                     shipping_charge, round_off, grand_total, amount_paid, balance_due,
                     payment_method, payment_status, sale_type, sale_status,
                     cashier_id, cashier_name, notes, created_at, updated_at
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ) VALUES (
+                    ?, ?, ?,
+                    COALESCE(?, (SELECT full_name FROM customers WHERE id = ?)),
+                    COALESCE(?, (SELECT phone FROM customers WHERE id = ?)),
+                    ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?
+                )
             ''', (
                 sale_data.get("invoice_number") or f"POS-{datetime.datetime.now().strftime('%Y%m%d%H%M%S')}",
                 sale_data.get("invoice_date") or datetime.datetime.now().isoformat(),
                 sale_data.get("customer_id"),
+                # Listings read these columns directly, so fill them from
+                # the customer when the client only sends customer_id
                 sale_data.get("customer_name"),
+                sale_data.get("customer_id"),
+                sale_data.get("customer_phone"),
+                sale_data.get("customer_id"),
                 len(sale_data.get("items", [])),
                 sum(float(item.get("quantity", 0)) for item in sale_data.get("items", [])),
                 sale_data.get("subtotal", 0),
@@ -8,12 +8,12 @@ from typing import Dict, Any, List
 import os
 import shutil
 import logging
-import sqlite3
 from pathlib import Path
 from tempfile import NamedTemporaryFile
 
-from core.auth import get_current_user, require_permission
-from core.database import get_database_manager
+from core.auth import get_current_user, require_permission, invalidate_user_cache
+from core.database import get_database_manager, sqlite3
+from core.file_manager import fast_copy
 
 router = APIRouter(prefix="/settings", tags=["settings"])
 logger = logging.getLogger(__name__)
@@ -25,27 +25,15 @@ async def get_shop_settings(
 ):
     """Get shop settings."""
     try:
-        db = get_database_manager()
-        with db.get_cursor() as cur:
-            cur.execute("""
-                SELECT shop_name, shop_phone, shop_email, shop_address,
-                       shop_city, owner_name, ntn_number, gst_number,
-                       currency_symbol, 'Asia/Karachi', '09:00', '18:00',
-                       logo_path, created_at, receipt_footer
-                FROM shop_settings LIMIT 1
-            """)
-            row = cur.fetchone()
+        settings = get_database_manager().get_shop_settings()
         
-        if not row:
+        if not settings:
             return {
                 "success": True,
                 "settings": None,
                 "message": "No settings configured yet"
             }
         
-        # Convert sqlite3.Row to dict
-        settings = dict(row)
-        
         return {
             "success": True,
             "settings": {
@@ -257,7 +245,7 @@ async def create_backup(
             local_backups = Path.cwd() / "backups"
             local_backups.mkdir(exist_ok=True)
             if backup_path and os.path.exists(backup_path):
-                 shutil.copy2(backup_path, local_backups / os.path.basename(backup_path))
+                 fast_copy(backup_path, local_backups / os.path.basename(backup_path))
         except Exception as e:
             logger.warning(f"Failed to copy backup to local folder: {e}")
         
@@ -361,7 +349,7 @@ async def upload_logo(
         target_name = f"shop_logo{extension}"
         destination_path = destination_dir / target_name
         
-        shutil.copy2(source_path, destination_path)
+        fast_copy(source_path, destination_path)
         
         # Update settings with relative path for frontend
         logo_url = f"/uploads/{target_name}"
@@ -640,6 +628,7 @@ async def update_user(
                 query = f"UPDATE users SET {', '.join(updates)} WHERE id = ?"
                 params.append(user_id)
                 cur.execute(query, params)
+        invalidate_user_cache(user_id)
         
         return {
             "success": True,
@@ -661,6 +650,7 @@ async def delete_user(
         
         with db.get_cursor() as cur:
             cur.execute("UPDATE users SET is_active = 0 WHERE id = ?", (user_id,))
+        invalidate_user_cache(user_id)
         
         return {
             "success": True,
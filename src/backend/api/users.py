@@ -9,7 +9,7 @@ import logging
 import bcrypt
 from datetime import timezone
 
-from core.auth import get_current_user, require_permission
+from core.auth import get_current_user, require_permission, invalidate_user_cache
 from core.database import get_database_manager
 import secrets
 
@@ -208,6 +208,7 @@ async def update_user(
                 
                 query = f"UPDATE users SET {', '.join(updates)} WHERE id = ?"
                 cur.execute(query, params)
+        invalidate_user_cache(user_id)
         
         return {
             "success": True,
@@ -248,6 +249,7 @@ async def delete_user(
                 "DELETE FROM users WHERE id = ?",
                 (user_id,)
             )
+        invalidate_user_cache(user_id)
         
         return {
             "success": True,
@@ -295,6 +297,7 @@ async def reset_user_password(
             # Check if the update was successful
             if cur.rowcount == 0:
                 raise HTTPException(status_code=404, detail="User not found or password not updated")
+        invalidate_user_cache(user_id)
         
         return {
             "success": True,
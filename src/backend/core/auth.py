@@ -7,20 +7,28 @@ COMPLETE AUTHENTICATION SYSTEM FOR PAKISTANI AUTO SHOPS
 - Session management
 """
 
-from jose import jwt
-from jose.exceptions import ExpiredSignatureError
+import jwt
+from jwt import api_jws
+import orjson
+import asyncio
+import os
 import hashlib
 import secrets
 import logging
+import time
+from collections import ChainMap
+from functools import lru_cache
+from types import MappingProxyType
 from datetime import datetime, timedelta, timezone
-from typing import Optional, Dict, Any, List, Tuple
-from fastapi import HTTPException, Request, Depends
+from typing import Optional, Dict, Any, List
+from fastapi import BackgroundTasks, HTTPException, Request, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from pydantic import BaseModel, validator, Field
 import json
 
-from core.database import get_database_manager
-from core.logger import audit_log
+from core.cache import TTLCache, RotatingSet
+from core.database import DatabaseManager, get_database_manager, sqlite3, SQLITE_HAS_RETURNING
+from core.logger import audit_log, queue_audit_log
 
 logger = logging.getLogger(__name__)
 
@@ -37,6 +45,101 @@ MAX_LOGIN_ATTEMPTS = 5
 ACCOUNT_LOCK_MINUTES = 30
 PASSWORD_MIN_LENGTH = 6
 PASSWORD_EXPIRE_DAYS = 90
+USER_CACHE_TTL_SECONDS = 30  # How long an authenticated user is reused without a DB lookup
+SESSION_ACTIVITY_FLUSH_SECONDS = 1.0  # Window for coalescing last_activity updates
+SESSION_ACTIVITY_BATCH_SIZE = 500
+
+# Development mode is fixed for the life of the process
+_ENV_DEV = os.environ.get('ENV') == 'development'
+
+# ==================== SQL STATEMENTS ====================
+# Kept as module constants so every call passes the identical string to
+# sqlite3's per-connection statement cache.
+
+_SQL_FIND_USER = (
+    "SELECT id, username, password_hash, full_name, role, status, login_attempts, "
+    "locked_until, password_changed_at, last_login, phone FROM users WHERE username = ?"
+)
+_SQL_UPDATE_ATTEMPTS = "UPDATE users SET login_attempts = ? WHERE id = ?"
+_SQL_LOCK_ACCOUNT = "UPDATE users SET login_attempts = ?, locked_until = ? WHERE id = ?"
+_SQL_RESET_LOGIN = (
+    "UPDATE users SET login_attempts = 0, locked_until = NULL, last_login = CURRENT_TIMESTAMP "
+    "WHERE id = ?"
+)
+_SQL_INSERT_SESSION = (
+    "INSERT INTO user_sessions (user_id, session_token, device_info, ip_address, expiry_time) "
+    "VALUES (?, ?, ?, ?, ?)"
+)
+_SQL_FIND_ACTIVE_USER = "SELECT id, username, role, status FROM users WHERE id = ? AND status = 'active'"
+_CURRENT_USER_COLUMNS = (
+    "id", "username", "full_name", "role", "status",
+    "phone", "last_login", "password_changed_at",
+)
+_SQL_GET_CURRENT_USER = (
+    "SELECT id, username, full_name, role, status, phone, last_login, password_changed_at "
+    "FROM users WHERE id = ? AND status = 'active'"
+)
+# Same row plus a trailing flag for whether the given session is still valid
+_SQL_GET_CURRENT_USER_AND_SESSION = (
+    "SELECT id, username, full_name, role, status, phone, last_login, password_changed_at, "
+    "EXISTS(SELECT 1 FROM user_sessions WHERE session_token = ? AND user_id = users.id "
+    "AND is_active = 1 AND expiry_time > CURRENT_TIMESTAMP) "
+    "FROM users WHERE id = ? AND status = 'active'"
+)
+_SQL_TOUCH_SESSION = "UPDATE user_sessions SET last_activity = CURRENT_TIMESTAMP WHERE session_token = ?"
+_SQL_INVALIDATE_SESSION = "UPDATE user_sessions SET is_active = 0 WHERE session_token = ? AND user_id = ?"
+_SQL_INVALIDATE_USER_SESSIONS = "UPDATE user_sessions SET is_active = 0 WHERE user_id = ?"
+_SQL_GET_PASSWORD_HASH = "SELECT password_hash FROM users WHERE id = ?"
+_SQL_SET_PASSWORD = (
+    "UPDATE users SET password_hash = ?, password_changed_at = CURRENT_TIMESTAMP, "
+    "login_attempts = 0, locked_until = NULL WHERE id = ?"
+)
+_SQL_INSERT_USER = (
+    "INSERT INTO users (username, password_hash, full_name, role, phone, cnic, salary, "
+    "commission_rate, created_at, updated_at) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)"
+)
+_SQL_GET_CREATED_USER = (
+    "SELECT id, username, full_name, role, status, phone, cnic, salary, "
+    "commission_rate, created_at, last_login FROM users WHERE id = ?"
+)
+# Keyset pages over the rowid, newest first
+_SQL_LIST_USERS = (
+    "SELECT id, username, full_name, role, status, phone, cnic, salary, "
+    "commission_rate, last_login, created_at, login_attempts "
+    "FROM users ORDER BY id DESC LIMIT ?"
+)
+_SQL_LIST_USERS_AFTER = (
+    "SELECT id, username, full_name, role, status, phone, cnic, salary, "
+    "commission_rate, last_login, created_at, login_attempts "
+    "FROM users WHERE id < ? ORDER BY id DESC LIMIT ?"
+)
+_SQL_DEACTIVATE_USER = (
+    "UPDATE users SET status = 'inactive', updated_at = CURRENT_TIMESTAMP WHERE id = ?"
+)
+_SQL_LIST_SESSIONS = (
+    "SELECT id, session_token, device_info, ip_address, login_time, last_activity, "
+    "expiry_time, is_active FROM user_sessions "
+    "WHERE user_id = ? AND is_active = 1 ORDER BY last_activity DESC"
+)
+# Terminates only if the caller owns the session or may manage users (third param 1)
+_TERMINATE_SESSION_WHERE = (
+    "WHERE session_token = ? AND is_active = 1 AND (user_id = ? OR ? = 1)"
+)
+_SQL_TERMINATE_SESSION = (
+    f"UPDATE user_sessions SET is_active = 0 {_TERMINATE_SESSION_WHERE} RETURNING user_id"
+)
+# Fallback for SQLite < 3.35: find the owned session, then deactivate it
+_SQL_FIND_SESSION_TO_TERMINATE = f"SELECT user_id FROM user_sessions {_TERMINATE_SESSION_WHERE}"
+_SQL_DEACTIVATE_SESSION = "UPDATE user_sessions SET is_active = 0 WHERE session_token = ?"
+_SQL_ACTIVE_SESSION_EXISTS = (
+    "SELECT EXISTS(SELECT 1 FROM user_sessions WHERE session_token = ? AND is_active = 1)"
+)
+# Snapshot recorded as audit old_values; never includes password_hash
+_SQL_GET_USER_FOR_AUDIT = (
+    "SELECT id, username, full_name, role, status, phone, cnic, salary, "
+    "commission_rate, last_login FROM users WHERE id = ?"
+)
 
 # Pakistani Role Definitions
 PAKISTANI_ROLES = {
@@ -122,9 +225,177 @@ PAKISTANI_ROLES = {
     }
 }
 
+# Role capability flags copied onto authenticated user payloads
+ROLE_CAPABILITY_KEYS = (
+    "can_manage_users",
+    "can_view_reports",
+    "can_manage_stock",
+    "can_manage_products",
+    "can_manage_customers",
+    "can_manage_sales",
+    "can_manage_expenses",
+    "can_manage_settings",
+    "can_backup_restore",
+)
+
+# Capability bits packed into a user's perm_mask (same order as ROLE_CAPABILITY_KEYS)
+CAN_MANAGE_USERS = 1 << 0
+CAN_VIEW_REPORTS = 1 << 1
+CAN_MANAGE_STOCK = 1 << 2
+CAN_MANAGE_PRODUCTS = 1 << 3
+CAN_MANAGE_CUSTOMERS = 1 << 4
+CAN_MANAGE_SALES = 1 << 5
+CAN_MANAGE_EXPENSES = 1 << 6
+CAN_MANAGE_SETTINGS = 1 << 7
+CAN_BACKUP_RESTORE = 1 << 8
+ALL_CAPABILITIES = (1 << len(ROLE_CAPABILITY_KEYS)) - 1
+
+_CAPABILITY_BITS = tuple((key, 1 << bit) for bit, key in enumerate(ROLE_CAPABILITY_KEYS))
+
+def _role_mask(role_config: Dict[str, Any]) -> int:
+    """
+    Pack a role's can_* flags into a capability bitmask.
+    
+    Args:
+        role_config: Role definition from PAKISTANI_ROLES
+        
+    Returns:
+        Bitmask of CAN_* flags
+    """
+    return sum(flag for key, flag in _CAPABILITY_BITS if role_config.get(key, False))
+
+def _build_role_view(role: str, role_config: Dict[str, Any]) -> MappingProxyType:
+    """
+    Build the read-only, role-derived part of a user payload.
+    
+    Args:
+        role: Role key
+        role_config: Role definition from PAKISTANI_ROLES
+        
+    Returns:
+        Immutable mapping of role_name, permissions, perm_mask and capability flags
+    """
+    view = {
+        "role_name": role_config.get("name", role),
+        "permissions": tuple(role_config.get("permissions", ())),
+        "perm_mask": _role_mask(role_config),
+    }
+    for key in ROLE_CAPABILITY_KEYS:
+        view[key] = role_config.get(key, False)
+    return MappingProxyType(view)
+
+# Fallback role config for roles missing from PAKISTANI_ROLES. "name" is
+# deliberately absent so role_name falls back to the raw role key.
+_EMPTY_ROLE = MappingProxyType({
+    "permissions": (),
+    **{key: False for key in ROLE_CAPABILITY_KEYS},
+})
+
+@lru_cache(maxsize=32)
+def hydrate_role(role: str) -> MappingProxyType:
+    """
+    Get the role-derived fields for a role.
+    
+    Views are built once per role and shared by reference across responses.
+    
+    Args:
+        role: Role key
+        
+    Returns:
+        Read-only view, with no permissions for unknown roles
+    """
+    return _build_role_view(role, PAKISTANI_ROLES.get(role, _EMPTY_ROLE))
+
+@lru_cache(maxsize=32)
+def role_summary(role: str) -> MappingProxyType:
+    """
+    Get role_name and permissions for a role (used in user listings).
+    
+    Args:
+        role: Role key
+        
+    Returns:
+        Read-only mapping with role_name and permissions
+    """
+    view = hydrate_role(role)
+    return MappingProxyType({"role_name": view["role_name"], "permissions": view["permissions"]})
+
+def _build_user_response(
+    user_id: int,
+    username: str,
+    role: str,
+    full_name: str,
+    status: str,
+    phone: Optional[str],
+    session_token: str,
+    password_expired: bool,
+    last_login_serialized: Optional[str]
+) -> ChainMap:
+    """
+    Build the user payload returned on login.
+    
+    Args:
+        user_id: Authenticated user ID
+        username: Username
+        role: User role
+        full_name: Full name
+        status: Account status
+        phone: Phone number
+        session_token: Newly issued session token
+        password_expired: Whether the password has expired
+        last_login_serialized: Previous login time as an ISO string
+        
+    Returns:
+        Per-login fields layered over the shared role view
+    """
+    return ChainMap({
+        "id": user_id,
+        "username": username,
+        "role": role,
+        "full_name": full_name,
+        "status": status,
+        "session_token": session_token,
+        "password_expired": password_expired,
+        "last_login": last_login_serialized,
+        "phone": phone,
+    }, hydrate_role(role))
+
 # Security instance
 security = HTTPBearer(auto_error=False)  # Allow requests without token for dev mode
 
+# Authenticated users keyed by a digest of (access token, session token)
+_USER_CACHE = TTLCache(maxsize=10_000, ttl=USER_CACHE_TTL_SECONDS)
+
+def _user_cache_key(token: str, session_token: Optional[str]) -> str:
+    """Digest of the credentials a cached user was validated with."""
+    digest = hashlib.sha256(token.encode())
+    if session_token:
+        digest.update(b"\0")
+        digest.update(session_token.encode())
+    return digest.hexdigest()[:32]
+
+# Digests of tokens that already failed to decode (forgotten after 1-2 hours)
+_BAD_TOKENS = RotatingSet(rotate_seconds=3600, maxsize=10_000)
+
+def _token_digest(token: str) -> bytes:
+    """Short digest identifying a bearer token."""
+    return hashlib.blake2b(token.encode(), digest_size=16).digest()
+
+def invalidate_user_cache(user_id: Optional[int] = None):
+    """
+    Drop cached authentication results for a user.
+    
+    Call after anything that should take effect before the cache TTL
+    (logout, password, role or status change, session termination).
+    
+    Args:
+        user_id: User ID, or None to drop every cached user
+    """
+    if user_id is None:
+        _USER_CACHE.clear()
+        return
+    _USER_CACHE.discard_where(lambda cached_user: cached_user["id"] == user_id)
+
 # ==================== PYDANTIC MODELS ====================
 
 class LoginRequest(BaseModel):
@@ -199,51 +470,28 @@ class AuthenticationManager:
     def __init__(self):
         self.db_manager = get_database_manager()
     
-    @staticmethod
-    def hash_password(password: str, salt: Optional[str] = None) -> Tuple[str, str]:
-        """
-        Hash password with salt using SHA-256.
-        
-        Args:
-            password: Plain text password
-            salt: Optional salt (generated if None)
-            
-        Returns:
-            Tuple of (hashed_password, salt)
-        """
-        if salt is None:
-            salt = secrets.token_hex(16)
-        
-        hash_obj = hashlib.sha256(f"{password}{salt}".encode())
-        hashed = f"sha256${salt}${hash_obj.hexdigest()}"
-        
-        return hashed, salt
+    # Password hashing lives on DatabaseManager so the admin seed shares it
+    hash_password = staticmethod(DatabaseManager.hash_password)
+    verify_password = staticmethod(DatabaseManager.verify_password)
     
     @staticmethod
-    def verify_password(password: str, hashed_password: str) -> bool:
+    def _sign_payload(payload: Dict[str, Any]) -> str:
         """
-        Verify password against hash.
+        Sign JWT claims, serializing them with orjson.
+        
+        Claims must already be JSON-native (numeric exp/iat), since the
+        encoded bytes are handed to the signer as-is.
         
         Args:
-            password: Plain text password
-            hashed_password: Hashed password string
+            payload: Token claims
             
         Returns:
-            True if password matches
+            JWT token string
         """
-        try:
-            algorithm, salt, hash_value = hashed_password.split('$')
-            if algorithm != 'sha256':
-                return False
-            
-            test_hash = hashlib.sha256(f"{password}{salt}".encode()).hexdigest()
-            return test_hash == hash_value
-            
-        except ValueError:
-            return False
+        return api_jws.encode(orjson.dumps(payload), JWT_SECRET, algorithm=JWT_ALGORITHM)
     
     @staticmethod
-    def create_access_token(user_id: int, username: str, role: str) -> str:
+    def create_access_token(user_id: int, username: str, role: str, now: Optional[datetime] = None) -> str:
         """
         Create JWT access token.
         
@@ -251,44 +499,50 @@ class AuthenticationManager:
             user_id: User ID
             username: Username
             role: User role
+            now: Issue time (defaults to current UTC time)
             
         Returns:
             JWT token string
         """
-        expire = datetime.now(timezone.utc) + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+        if now is None:
+            now = datetime.now(timezone.utc)
+        expire = now + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
         
         payload = {
             "sub": str(user_id),
             "username": username,
             "role": role,
-            "exp": expire,
-            "iat": datetime.now(timezone.utc),
+            "exp": int(expire.timestamp()),
+            "iat": int(now.timestamp()),
             "type": "access"
         }
         
-        return jwt.encode(payload, JWT_SECRET, algorithm=JWT_ALGORITHM)
+        return AuthenticationManager._sign_payload(payload)
     
     @staticmethod
-    def create_refresh_token(user_id: int) -> str:
+    def create_refresh_token(user_id: int, now: Optional[datetime] = None) -> str:
         """
         Create JWT refresh token.
         
         Args:
             user_id: User ID
+            now: Issue time (defaults to current UTC time)
             
         Returns:
             Refresh token string
         """
-        expire = datetime.now(timezone.utc) + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
+        if now is None:
+            now = datetime.now(timezone.utc)
+        expire = now + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
         
         payload = {
             "sub": str(user_id),
-            "exp": expire,
-            "iat": datetime.now(timezone.utc),
+            "exp": int(expire.timestamp()),
+            "iat": int(now.timestamp()),
             "type": "refresh"
         }
         
-        return jwt.encode(payload, JWT_SECRET, algorithm=JWT_ALGORITHM)
+        return AuthenticationManager._sign_payload(payload)
     
     @staticmethod
     def decode_token(token: str) -> Dict[str, Any]:
@@ -314,53 +568,54 @@ class AuthenticationManager:
                 detail="Token has expired",
                 headers={"WWW-Authenticate": "Bearer"}
             )
-        except jwt.JWTError:
+        except jwt.InvalidTokenError:
             raise HTTPException(
                 status_code=401,
                 detail="Invalid token",
                 headers={"WWW-Authenticate": "Bearer"}
             )
     
-    def check_user_lock(self, user_data: Dict[str, Any]) -> bool:
+    def check_user_lock(self, status: str, locked_until: Optional[str], now: Optional[datetime] = None) -> bool:
         """
         Check if user account is locked.
         
         Args:
-            user_data: User data from database
+            status: Account status from database
+            locked_until: Lock expiry (ISO string) from database
+            now: Reference time (defaults to current UTC time)
             
         Returns:
             True if account is locked
         """
-        if user_data.get("status") != "active":
+        if status != "active":
             return True
         
-        locked_until = user_data.get("locked_until")
         if locked_until:
             try:
                 lock_time = datetime.fromisoformat(locked_until)
-                if datetime.now(timezone.utc) < lock_time:
+                if (now or datetime.now(timezone.utc)) < lock_time:
                     return True
             except (ValueError, TypeError):
                 pass
         
         return False
     
-    def check_password_expiry(self, user_data: Dict[str, Any]) -> bool:
+    def check_password_expiry(self, password_changed_at: Optional[str], now: Optional[datetime] = None) -> bool:
         """
         Check if password needs to be changed.
         
         Args:
-            user_data: User data from database
+            password_changed_at: Last password change time from database
+            now: Reference time (defaults to current UTC time)
             
         Returns:
             True if password has expired
         """
-        password_changed_at = user_data.get("password_changed_at")
         if password_changed_at:
             try:
                 changed_date = datetime.fromisoformat(password_changed_at)
                 expiry_date = changed_date + timedelta(days=PASSWORD_EXPIRE_DAYS)
-                return datetime.now(timezone.utc) > expiry_date
+                return (now or datetime.now(timezone.utc)) > expiry_date
             except (ValueError, TypeError):
                 pass
         
@@ -381,22 +636,19 @@ class AuthenticationManager:
         Raises:
             HTTPException: If authentication fails
         """
+        # One timestamp for lock checks, session expiry, tokens and audit
+        now = datetime.now(timezone.utc)
+        
         try:
             with self.db_manager.get_cursor() as cursor:
                 # Get user by username
-                cursor.execute('''
-                    SELECT id, username, password_hash, full_name, role, status,
-                           login_attempts, locked_until, password_changed_at,
-                           last_login
-                    FROM users 
-                    WHERE username = ?
-                ''', (username.lower(),))
+                cursor.execute(_SQL_FIND_USER, (username.lower(),))
                 
                 user = cursor.fetchone()
                 
                 if not user:
                     # Log failed attempt
-                    audit_log(
+                    queue_audit_log(
                         user_id=None,
                         action="login_failed",
                         table_name="users",
@@ -411,35 +663,32 @@ class AuthenticationManager:
                         detail="Invalid username or password"
                     )
                 
-                user_dict = dict(user)
+                (user_id, user_name, password_hash, full_name, role, status,
+                 login_attempts, locked_until, password_changed_at, last_login, phone) = user
                 
                 # Check if account is locked
-                if self.check_user_lock(user_dict):
+                if self.check_user_lock(status, locked_until, now):
                     raise HTTPException(
                         status_code=403,
                         detail="Account is locked. Please contact administrator."
                     )
                 
                 # Verify password
-                if not self.verify_password(password, user_dict["password_hash"]):
+                if not self.verify_password(password, password_hash):
                     # Increment failed login attempts
-                    attempts = user_dict.get("login_attempts", 0) + 1
+                    attempts = (login_attempts or 0) + 1
                     
                     if attempts >= MAX_LOGIN_ATTEMPTS:
                         # Lock account for 30 minutes
-                        lock_until = datetime.now(timezone.utc) + timedelta(minutes=ACCOUNT_LOCK_MINUTES)
-                        cursor.execute('''
-                            UPDATE users 
-                            SET login_attempts = ?, locked_until = ?
-                            WHERE id = ?
-                        ''', (attempts, lock_until.isoformat(), user_dict["id"]))
+                        lock_until = now + timedelta(minutes=ACCOUNT_LOCK_MINUTES)
+                        cursor.execute(_SQL_LOCK_ACCOUNT, (attempts, lock_until.isoformat(), user_id))
                         
                         # Log account lock
-                        audit_log(
-                            user_id=user_dict["id"],
+                        queue_audit_log(
+                            user_id=user_id,
                             action="account_locked",
                             table_name="users",
-                            record_id=user_dict["id"],
+                            record_id=user_id,
                             old_values={"login_attempts": attempts - 1},
                             new_values={
                                 "login_attempts": attempts,
@@ -455,16 +704,14 @@ class AuthenticationManager:
                         )
                     else:
                         # Update login attempts
-                        cursor.execute('''
-                            UPDATE users SET login_attempts = ? WHERE id = ?
-                        ''', (attempts, user_dict["id"]))
+                        cursor.execute(_SQL_UPDATE_ATTEMPTS, (attempts, user_id))
                         
                         # Log failed attempt
-                        audit_log(
-                            user_id=user_dict["id"],
+                        queue_audit_log(
+                            user_id=user_id,
                             action="login_failed",
                             table_name="users",
-                            record_id=user_dict["id"],
+                            record_id=user_id,
                             old_values={"login_attempts": attempts - 1},
                             new_values={"login_attempts": attempts},
                             ip_address=request.client.host if request.client else None,
@@ -478,25 +725,15 @@ class AuthenticationManager:
                         )
                 
                 # Reset login attempts on successful login
-                cursor.execute('''
-                    UPDATE users 
-                    SET login_attempts = 0, 
-                        locked_until = NULL,
-                        last_login = CURRENT_TIMESTAMP
-                    WHERE id = ?
-                ''', (user_dict["id"],))
+                cursor.execute(_SQL_RESET_LOGIN, (user_id,))
                 
                 # Create session token
                 session_token = secrets.token_urlsafe(32)
-                expiry_time = datetime.now(timezone.utc) + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+                expiry_time = now + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
                 
                 # Insert session record
-                cursor.execute('''
-                    INSERT INTO user_sessions 
-                    (user_id, session_token, device_info, ip_address, expiry_time)
-                    VALUES (?, ?, ?, ?, ?)
-                ''', (
-                    user_dict["id"],
+                cursor.execute(_SQL_INSERT_SESSION, (
+                    user_id,
                     session_token,
                     request.headers.get("user-agent"),
                     request.client.host if request.client else None,
@@ -505,57 +742,46 @@ class AuthenticationManager:
                 
                 # Create tokens
                 access_token = self.create_access_token(
-                    user_dict["id"],
-                    user_dict["username"],
-                    user_dict["role"]
+                    user_id,
+                    user_name,
+                    role,
+                    now
                 )
-                refresh_token = self.create_refresh_token(user_dict["id"])
+                refresh_token = self.create_refresh_token(user_id, now)
                 
                 # Check if password needs to be changed
-                password_expired = self.check_password_expiry(user_dict)
+                password_expired = self.check_password_expiry(password_changed_at, now)
                 
                 # Prepare user response
                 # Ensure values are JSON serializable (datetimes -> ISO strings)
-                last_login_val = user_dict.get("last_login")
-                if isinstance(last_login_val, (str,)):
-                    last_login_serialized = last_login_val
+                if isinstance(last_login, (str,)):
+                    last_login_serialized = last_login
                 else:
                     try:
-                        last_login_serialized = last_login_val.isoformat() if last_login_val is not None else None
+                        last_login_serialized = last_login.isoformat() if last_login is not None else None
                     except Exception:
                         last_login_serialized = None
 
-                user_response = {
-                    "id": user_dict["id"],
-                    "username": user_dict["username"],
-                    "full_name": user_dict["full_name"],
-                    "role": user_dict["role"],
-                    "role_name": PAKISTANI_ROLES.get(user_dict["role"], {}).get("name", user_dict["role"]),
-                    "status": user_dict["status"],
-                    "phone": user_dict.get("phone"),
-                    "last_login": last_login_serialized,
-                    "password_expired": password_expired,
-                    "session_token": session_token,
-                    "permissions": PAKISTANI_ROLES.get(user_dict["role"], {}).get("permissions", []),
-                    "can_manage_users": PAKISTANI_ROLES.get(user_dict["role"], {}).get("can_manage_users", False),
-                    "can_view_reports": PAKISTANI_ROLES.get(user_dict["role"], {}).get("can_view_reports", False),
-                    "can_manage_stock": PAKISTANI_ROLES.get(user_dict["role"], {}).get("can_manage_stock", False),
-                    "can_manage_products": PAKISTANI_ROLES.get(user_dict["role"], {}).get("can_manage_products", False),
-                    "can_manage_customers": PAKISTANI_ROLES.get(user_dict["role"], {}).get("can_manage_customers", False),
-                    "can_manage_sales": PAKISTANI_ROLES.get(user_dict["role"], {}).get("can_manage_sales", False),
-                    "can_manage_expenses": PAKISTANI_ROLES.get(user_dict["role"], {}).get("can_manage_expenses", False),
-                    "can_manage_settings": PAKISTANI_ROLES.get(user_dict["role"], {}).get("can_manage_settings", False),
-                    "can_backup_restore": PAKISTANI_ROLES.get(user_dict["role"], {}).get("can_backup_restore", False),
-                }
+                user_response = _build_user_response(
+                    user_id,
+                    user_name,
+                    role,
+                    full_name,
+                    status,
+                    phone,
+                    session_token,
+                    password_expired,
+                    last_login_serialized
+                )
                 
                 # Log successful login
-                audit_log(
-                    user_id=user_dict["id"],
+                queue_audit_log(
+                    user_id=user_id,
                     action="login_success",
                     table_name="users",
-                    record_id=user_dict["id"],
-                    old_values={"last_login": user_dict.get("last_login")},
-                    new_values={"last_login": datetime.now(timezone.utc).isoformat()},
+                    record_id=user_id,
+                    old_values={"last_login": last_login},
+                    new_values={"last_login": now.isoformat()},
                     ip_address=request.client.host if request.client else None,
                     user_agent=request.headers.get("user-agent")
                 )
@@ -607,11 +833,7 @@ class AuthenticationManager:
             
             # Verify user exists and is active
             with self.db_manager.get_cursor() as cursor:
-                cursor.execute('''
-                    SELECT id, username, role, status
-                    FROM users 
-                    WHERE id = ? AND status = 'active'
-                ''', (user_id,))
+                cursor.execute(_SQL_FIND_ACTIVE_USER, (user_id,))
                 
                 user = cursor.fetchone()
                 if not user:
@@ -644,33 +866,28 @@ class AuthenticationManager:
                 detail="Failed to refresh token"
             )
     
-    async def logout_user(self, user_id: int, session_token: str = None):
+    async def logout_user(self, user_id: int, background_tasks: BackgroundTasks, session_token: str = None):
         """
         Logout user by invalidating session.
         
         Args:
             user_id: User ID
+            background_tasks: Tasks run after the response is sent
             session_token: Optional specific session token
         """
         try:
             with self.db_manager.get_cursor() as cursor:
                 if session_token:
                     # Invalidate specific session
-                    cursor.execute('''
-                        UPDATE user_sessions 
-                        SET is_active = 0 
-                        WHERE session_token = ? AND user_id = ?
-                    ''', (session_token, user_id))
+                    cursor.execute(_SQL_INVALIDATE_SESSION, (session_token, user_id))
                 else:
                     # Invalidate all sessions for user
-                    cursor.execute('''
-                        UPDATE user_sessions 
-                        SET is_active = 0 
-                        WHERE user_id = ?
-                    ''', (user_id,))
+                    cursor.execute(_SQL_INVALIDATE_USER_SESSIONS, (user_id,))
+                invalidate_user_cache(user_id)
                 
                 # Log logout
-                audit_log(
+                background_tasks.add_task(
+                    audit_log,
                     user_id=user_id,
                     action="logout",
                     table_name="users",
@@ -685,7 +902,14 @@ class AuthenticationManager:
             logger.error(f"Logout error: {e}")
             # Don't raise error for logout failures
     
-    async def change_password(self, user_id: int, current_password: str, new_password: str, request: Request) -> bool:
+    async def change_password(
+        self,
+        user_id: int,
+        current_password: str,
+        new_password: str,
+        request: Request,
+        background_tasks: BackgroundTasks
+    ) -> bool:
         """
         Change user password.
         
@@ -694,6 +918,7 @@ class AuthenticationManager:
             current_password: Current password
             new_password: New password
             request: FastAPI request
+            background_tasks: Tasks run after the response is sent
             
         Returns:
             True if successful
@@ -704,9 +929,7 @@ class AuthenticationManager:
         try:
             with self.db_manager.get_cursor() as cursor:
                 # Get current password hash
-                cursor.execute('''
-                    SELECT password_hash FROM users WHERE id = ?
-                ''', (user_id,))
+                cursor.execute(_SQL_GET_PASSWORD_HASH, (user_id,))
                 
                 user = cursor.fetchone()
                 if not user:
@@ -731,17 +954,12 @@ class AuthenticationManager:
                 new_hash, _ = self.hash_password(new_password)
                 
                 # Update password
-                cursor.execute('''
-                    UPDATE users 
-                    SET password_hash = ?, 
-                        password_changed_at = CURRENT_TIMESTAMP,
-                        login_attempts = 0,
-                        locked_until = NULL
-                    WHERE id = ?
-                ''', (new_hash, user_id))
+                cursor.execute(_SQL_SET_PASSWORD, (new_hash, user_id))
+                invalidate_user_cache(user_id)
                 
                 # Log password change
-                audit_log(
+                background_tasks.add_task(
+                    audit_log,
                     user_id=user_id,
                     action="password_change",
                     table_name="users",
@@ -774,8 +992,7 @@ class AuthenticationManager:
         Returns:
             True if user has permission
         """
-        role_config = PAKISTANI_ROLES.get(user_role, {})
-        permissions = role_config.get("permissions", [])
+        permissions = hydrate_role(user_role)["permissions"]
         
         # Malik (owner) has all permissions
         if user_role == "malik":
@@ -804,8 +1021,10 @@ class AuthenticationManager:
         Returns:
             Dependency function
         """
+        allowed = frozenset(allowed_roles)
+        
         async def role_authorization_dependency(current_user: Dict[str, Any] = Depends(get_current_user)):
-            if current_user["role"] not in allowed_roles:
+            if current_user["role"] not in allowed:
                 raise HTTPException(
                     status_code=403,
                     detail=f"Access denied. Required roles: {allowed_roles}"
@@ -845,10 +1064,117 @@ class AuthenticationManager:
         
         return sales_filter_dependency
 
+# ==================== SESSION ACTIVITY ====================
+
+_activity_queue: Optional[asyncio.Queue] = None
+_activity_flusher_task: Optional[asyncio.Task] = None
+
+def _flush_session_activity(session_tokens):
+    """
+    Write last_activity for a batch of sessions in one transaction.
+    
+    Args:
+        session_tokens: Iterable of session tokens
+    """
+    with get_database_manager().get_cursor() as cursor:
+        cursor.executemany(_SQL_TOUCH_SESSION, [(token,) for token in session_tokens])
+
+def queue_session_activity(session_token: str):
+    """
+    Record activity on a session.
+    
+    The update is coalesced by the background flusher; without a
+    running flusher it is written immediately.
+    
+    Args:
+        session_token: Session token
+    """
+    if _activity_flusher_task is not None and not _activity_flusher_task.done():
+        _activity_queue.put_nowait(session_token)
+        return
+    
+    try:
+        _flush_session_activity((session_token,))
+    except Exception as e:
+        logger.error(f"Failed to update session activity: {e}")
+
+async def _session_activity_flusher():
+    """Coalesce queued session tokens and flush them about once per second, until a None sentinel."""
+    running = True
+    while running:
+        batch = {await _activity_queue.get()}
+        if None not in batch:
+            await asyncio.sleep(SESSION_ACTIVITY_FLUSH_SECONDS)
+            while not _activity_queue.empty() and len(batch) < SESSION_ACTIVITY_BATCH_SIZE:
+                batch.add(_activity_queue.get_nowait())
+        
+        if None in batch:
+            running = False
+            batch.discard(None)
+            # Write whatever was queued behind the sentinel as well
+            while not _activity_queue.empty():
+                batch.add(_activity_queue.get_nowait())
+        
+        if not batch:
+            continue
+        
+        # Written on the database writer thread, off the event loop
+        try:
+            await asyncio.wrap_future(get_database_manager().submit_write(
+                _SQL_TOUCH_SESSION, [(token,) for token in batch], many=True
+            ))
+        except Exception as e:
+            logger.error(f"Failed to update session activity ({len(batch)} sessions): {e}")
+
+def start_session_activity_flusher():
+    """Start the background session activity flusher on the running event loop."""
+    global _activity_queue, _activity_flusher_task
+    
+    if _activity_flusher_task is not None and not _activity_flusher_task.done():
+        return
+    
+    _activity_queue = asyncio.Queue()
+    _activity_flusher_task = asyncio.create_task(_session_activity_flusher())
+
+async def stop_session_activity_flusher():
+    """Stop the flusher and write any pending session activity."""
+    global _activity_flusher_task
+    
+    if _activity_flusher_task is None:
+        return
+    
+    # Activity recorded from here on is written immediately
+    task, _activity_flusher_task = _activity_flusher_task, None
+    if not task.done():
+        # A sentinel instead of cancel(), so the batch in hand is still written
+        _activity_queue.put_nowait(None)
+        await task
+
 # ==================== DEPENDENCY INJECTION ====================
 
 auth_manager = AuthenticationManager()
 
+# Mock owner returned in preview / development mode (copied per request)
+_DEV_ADMIN_USER = {
+    "id": 1,
+    "username": "dev_admin",
+    "full_name": "System Administrator",
+    "role": "malik",
+    "role_name": "Malik (Owner)",
+    "status": "active",
+    "permissions": ["*"],
+    "can_manage_users": True,
+    "can_view_reports": True,
+    "can_manage_stock": True,
+    "can_manage_products": True,
+    "can_manage_customers": True,
+    "can_manage_sales": True,
+    "can_manage_expenses": True,
+    "can_manage_settings": True,
+    "can_backup_restore": True,
+    "perm_mask": ALL_CAPABILITIES,
+}
+
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
     request: Request = None
@@ -863,8 +1189,6 @@ async def get_current_user(
     Returns:
         Current user data
     """
-    import os
-    
     # DEVELOPMENT / PREVIEW MODE BYPASS (EXPLICIT)
     # For safety we only return a mock admin user when either the
     # `?preview=1` query parameter is present OR the environment is
@@ -873,109 +1197,78 @@ async def get_current_user(
     # lead to inconsistent behavior when the frontend and backend
     # disagree about preview/auth modes. Making this explicit keeps both
     # sides consistent.
-    if request:
-        try:
-            import os
-            # Check explicit preview query param
-            preview_flag = request.query_params.get('preview') == '1'
-            env_dev = os.environ.get('ENV') == 'development'
-            if preview_flag or env_dev:
-                return {
-                    "id": 1,
-                    "username": "dev_admin",
-                    "full_name": "System Administrator",
-                    "role": "malik",
-                    "role_name": "Malik (Owner)",
-                    "status": "active",
-                    "permissions": ["*"],
-                    "can_manage_users": True,
-                    "can_view_reports": True,
-                    "can_manage_stock": True,
-                    "can_manage_products": True,
-                    "can_manage_customers": True,
-                    "can_manage_sales": True,
-                    "can_manage_expenses": True,
-                    "can_manage_settings": True,
-                    "can_backup_restore": True,
-                }
-        except Exception:
-            # If anything goes wrong while checking preview mode, fall
-            # through and require normal authentication.
-            pass
+    if request is not None and (_ENV_DEV or request.query_params.get('preview') == '1'):
+        return _DEV_ADMIN_USER.copy()
     
     # For non-localhost, require token
     if credentials is None or not credentials.credentials:
         raise HTTPException(status_code=401, detail="Not authenticated")
     
     token = credentials.credentials
+    session_token = request.headers.get("X-Session-Token") if request else None
+    
+    # Reuse a recent lookup for the same credentials
+    cache_key = _user_cache_key(token, session_token)
+    cached_user = _USER_CACHE.get(cache_key)
+    if cached_user is not None:
+        if session_token:
+            queue_session_activity(session_token)
+        return dict(cached_user)
+    
+    # Tokens that failed to decode will fail again; skip the JWT work
+    token_digest = _token_digest(token)
+    if token_digest in _BAD_TOKENS:
+        raise HTTPException(
+            status_code=401,
+            detail="Invalid token",
+            headers={"WWW-Authenticate": "Bearer"}
+        )
     
     try:
         # Decode token
-        payload = auth_manager.decode_token(token)
+        try:
+            payload = auth_manager.decode_token(token)
+        except HTTPException:
+            _BAD_TOKENS.add(token_digest)
+            raise
         
-        # Get user from database
+        # Get user from database, checking the session (optional) in the same query
         db_manager = get_database_manager()
-        with db_manager.get_cursor() as cursor:
-            cursor.execute('''
-                SELECT id, username, full_name, role, status, phone,
-                       last_login, password_changed_at
-                FROM users 
-                WHERE id = ? AND status = 'active'
-            ''', (int(payload["sub"]),))
-            
-            user = cursor.fetchone()
-            
-            if not user:
-                raise HTTPException(
-                    status_code=401,
-                    detail="User not found or inactive"
-                )
-            
-            user_dict = dict(user)
-            
-            # Check session (optional)
-            session_token = request.headers.get("X-Session-Token") if request else None
+        with db_manager.get_cursor(readonly=True) as cursor:
+            cursor.row_factory = None
             if session_token:
-                cursor.execute('''
-                    SELECT 1 FROM user_sessions 
-                    WHERE session_token = ? 
-                      AND user_id = ? 
-                      AND is_active = 1 
-                      AND expiry_time > CURRENT_TIMESTAMP
-                ''', (session_token, user_dict["id"]))
-                
-                if not cursor.fetchone():
-                    raise HTTPException(
-                        status_code=401,
-                        detail="Session expired"
-                    )
-            
-            # Update last activity for session
-            if session_token:
-                cursor.execute('''
-                    UPDATE user_sessions 
-                    SET last_activity = CURRENT_TIMESTAMP 
-                    WHERE session_token = ?
-                ''', (session_token,))
-            
-            # Add role permissions to user data
-            role_config = PAKISTANI_ROLES.get(user_dict["role"], {})
-            user_dict.update({
-                "role_name": role_config.get("name", user_dict["role"]),
-                "permissions": role_config.get("permissions", []),
-                "can_manage_users": role_config.get("can_manage_users", False),
-                "can_view_reports": role_config.get("can_view_reports", False),
-                "can_manage_stock": role_config.get("can_manage_stock", False),
-                "can_manage_products": role_config.get("can_manage_products", False),
-                "can_manage_customers": role_config.get("can_manage_customers", False),
-                "can_manage_sales": role_config.get("can_manage_sales", False),
-                "can_manage_expenses": role_config.get("can_manage_expenses", False),
-                "can_manage_settings": role_config.get("can_manage_settings", False),
-                "can_backup_restore": role_config.get("can_backup_restore", False),
-            })
-            
-            return user_dict
+                cursor.execute(_SQL_GET_CURRENT_USER_AND_SESSION, (session_token, int(payload["sub"])))
+            else:
+                cursor.execute(_SQL_GET_CURRENT_USER, (int(payload["sub"]),))
             
+            user = cursor.fetchone()
+        
+        if not user:
+            raise HTTPException(
+                status_code=401,
+                detail="User not found or inactive"
+            )
+        
+        if session_token and not user[-1]:
+            raise HTTPException(
+                status_code=401,
+                detail="Session expired"
+            )
+        
+        user_dict = dict(zip(_CURRENT_USER_COLUMNS, user))
+        
+        # Update last activity for session (batched)
+        if session_token:
+            queue_session_activity(session_token)
+        
+        # Add role permissions to user data
+        user_dict.update(hydrate_role(user_dict["role"]))
+        
+        # Never cache past the token's own expiry
+        _USER_CACHE.set(cache_key, user_dict, ttl=payload["exp"] - time.time())
+        
+        return dict(user_dict)
+        
     except HTTPException:
         raise
     except Exception as e:
@@ -995,17 +1288,57 @@ def require_permission(permission: str):
     Returns:
         Dependency function
     """
+    # Roles are fixed, so resolve which of them hold the permission once
+    allowed = frozenset(
+        role for role in PAKISTANI_ROLES
+        if auth_manager.validate_permission(role, permission)
+    )
+
     async def permission_dependency(current_user: Dict[str, Any] = Depends(get_current_user)):
-        if not auth_manager.validate_permission(current_user["role"], permission):
+        if current_user["role"] not in allowed:
             raise HTTPException(
                 status_code=403,
                 detail=f"Insufficient permissions. Required: {permission}"
             )
         return current_user
 
-    return permission_dependency# ==================== USER MANAGEMENT FUNCTIONS ====================
+    return permission_dependency
+
+# ==================== USER MANAGEMENT FUNCTIONS ====================
 
-async def create_user(user_data: UserCreate, current_user: Dict[str, Any], request: Request) -> Dict[str, Any]:
+# Column order of the get_users / get_active_sessions SELECTs
+_USER_LIST_COLUMNS = (
+    "id", "username", "full_name", "role", "status",
+    "phone", "cnic", "salary", "commission_rate",
+    "last_login", "created_at", "login_attempts",
+)
+_SESSION_COLUMNS = (
+    "id", "session_token", "device_info", "ip_address",
+    "login_time", "last_activity", "expiry_time", "is_active",
+)
+
+# (UserUpdate attribute, users column) pairs that update_user may set
+_UPDATE_FIELDS = (
+    ("full_name", "full_name"),
+    ("phone", "phone"),
+    ("cnic", "cnic"),
+    ("salary", "salary"),
+    ("commission_rate", "commission_rate"),
+    ("status", "status"),
+)
+_UPDATED_USER_COLUMNS = (
+    "id, username, full_name, role, status, phone, cnic, salary, "
+    "commission_rate, last_login, created_at, updated_at"
+)
+_SQL_GET_UPDATED_USER = f"SELECT {_UPDATED_USER_COLUMNS} FROM users WHERE id = ?"
+
+async def create_user(
+    user_data: UserCreate,
+    current_user: Dict[str, Any],
+    request: Request,
+    cursor: sqlite3.Cursor,
+    background_tasks: BackgroundTasks
+) -> Dict[str, Any]:
     """
     Create a new user.
     
@@ -1013,6 +1346,8 @@ async def create_user(user_data: UserCreate, current_user: Dict[str, Any], reque
         user_data: User creation data
         current_user: Current authenticated user
         request: FastAPI request
+        cursor: Request-scoped database cursor
+        background_tasks: Tasks run after the response is sent
         
     Returns:
         Created user data
@@ -1021,34 +1356,19 @@ async def create_user(user_data: UserCreate, current_user: Dict[str, Any], reque
         HTTPException: If creation fails
     """
     # Check if current user can manage users
-    if not current_user.get("can_manage_users", False):
+    if not current_user["perm_mask"] & CAN_MANAGE_USERS:
         raise HTTPException(
             status_code=403,
             detail="Insufficient permissions to create users"
         )
     
     try:
-        db_manager = get_database_manager()
-        with db_manager.get_cursor() as cursor:
-            # Check if username already exists
-            cursor.execute("SELECT id FROM users WHERE username = ?", (user_data.username,))
-            if cursor.fetchone():
-                raise HTTPException(
-                    status_code=400,
-                    detail="Username already exists"
-                )
-            
-            # Hash password
-            password_hash, _ = auth_manager.hash_password(user_data.password)
-            
-            # Insert user
-            cursor.execute('''
-                INSERT INTO users (
-                    username, password_hash, full_name, role,
-                    phone, cnic, salary, commission_rate,
-                    created_at, updated_at
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)
-            ''', (
+        # Hash password
+        password_hash, _ = auth_manager.hash_password(user_data.password)
+        
+        # Insert user; the UNIQUE index on username rejects duplicates
+        try:
+            cursor.execute(_SQL_INSERT_USER, (
                 user_data.username,
                 password_hash,
                 user_data.full_name,
@@ -1058,44 +1378,43 @@ async def create_user(user_data: UserCreate, current_user: Dict[str, Any], reque
                 user_data.salary,
                 user_data.commission_rate
             ))
-            
-            user_id = cursor.lastrowid
-            
-            # Get created user
-            cursor.execute('''
-                SELECT id, username, full_name, role, status,
-                       phone, cnic, salary, commission_rate,
-                       created_at, last_login
-                FROM users WHERE id = ?
-            ''', (user_id,))
-            
-            created_user = dict(cursor.fetchone())
-            
-            # Add role info
-            role_config = PAKISTANI_ROLES.get(created_user["role"], {})
-            created_user.update({
-                "role_name": role_config.get("name", created_user["role"]),
-                "permissions": role_config.get("permissions", [])
-            })
-            
-            # Log user creation
-            audit_log(
-                user_id=current_user["id"],
-                action="create_user",
-                table_name="users",
-                record_id=user_id,
-                old_values=None,
-                new_values={
-                    "username": user_data.username,
-                    "role": user_data.role,
-                    "full_name": user_data.full_name
-                },
-                ip_address=request.client.host if request.client else None,
-                user_agent=request.headers.get("user-agent")
+        except sqlite3.IntegrityError as e:
+            if "users.username" not in str(e):
+                raise
+            raise HTTPException(
+                status_code=400,
+                detail="Username already exists"
             )
-            
-            return created_user
-            
+        
+        user_id = cursor.lastrowid
+        
+        # Get created user
+        cursor.execute(_SQL_GET_CREATED_USER, (user_id,))
+        
+        created_user = dict(cursor.fetchone())
+        
+        # Add role info
+        created_user.update(role_summary(created_user["role"]))
+        
+        # Log user creation
+        background_tasks.add_task(
+            audit_log,
+            user_id=current_user["id"],
+            action="create_user",
+            table_name="users",
+            record_id=user_id,
+            old_values=None,
+            new_values={
+                "username": user_data.username,
+                "role": user_data.role,
+                "full_name": user_data.full_name
+            },
+            ip_address=request.client.host if request.client else None,
+            user_agent=request.headers.get("user-agent")
+        )
+        
+        return created_user
+        
     except HTTPException:
         raise
     except Exception as e:
@@ -1105,49 +1424,54 @@ async def create_user(user_data: UserCreate, current_user: Dict[str, Any], reque
             detail="Failed to create user"
         )
 
-async def get_users(current_user: Dict[str, Any]) -> List[Dict[str, Any]]:
+async def get_users(
+    current_user: Dict[str, Any],
+    cursor: sqlite3.Cursor,
+    hydrate: bool = False,
+    after_id: Optional[int] = None,
+    limit: Optional[int] = None
+) -> List[Dict[str, Any]]:
     """
-    Get all users (with permission check).
+    Get users, or one page of them, newest first (with permission check).
     
     Args:
         current_user: Current authenticated user
+        cursor: Request-scoped database cursor
+        hydrate: Include each role's permission list, not just its name
+        after_id: Return users with an ID below this one (previous page's last ID)
+        limit: Maximum number of users to return (None for all of them)
         
     Returns:
         List of users
     """
     # Check if current user can manage users
-    if not current_user.get("can_manage_users", False):
+    if not current_user["perm_mask"] & CAN_MANAGE_USERS:
         raise HTTPException(
             status_code=403,
             detail="Insufficient permissions to view users"
         )
     
     try:
-        db_manager = get_database_manager()
-        with db_manager.get_cursor() as cursor:
-            cursor.execute('''
-                SELECT id, username, full_name, role, status,
-                       phone, cnic, salary, commission_rate,
-                       last_login, created_at, login_attempts
-                FROM users 
-                ORDER BY created_at DESC
-            ''')
-            
-            users = []
-            for row in cursor.fetchall():
-                user_dict = dict(row)
-                
-                # Add role info
-                role_config = PAKISTANI_ROLES.get(user_dict["role"], {})
-                user_dict.update({
-                    "role_name": role_config.get("name", user_dict["role"]),
-                    "permissions": role_config.get("permissions", [])
-                })
-                
-                users.append(user_dict)
-            
-            return users
-            
+        # Plain tuples: rows are zipped straight into the response dicts
+        cursor.row_factory = None
+        row_limit = -1 if limit is None else limit  # LIMIT -1 is no limit in SQLite
+        if after_id is None:
+            cursor.execute(_SQL_LIST_USERS, (row_limit,))
+        else:
+            cursor.execute(_SQL_LIST_USERS_AFTER, (after_id, row_limit))
+        
+        # Role is column 3
+        if hydrate:
+            return [
+                {**dict(zip(_USER_LIST_COLUMNS, row)), **role_summary(row[3])}
+                for row in cursor.fetchall()
+            ]
+        
+        return [
+            {**dict(zip(_USER_LIST_COLUMNS, row)), "role_name": hydrate_role(row[3])["role_name"]}
+            for row in cursor.fetchall()
+        ]
+        
     except Exception as e:
         logger.error(f"Error getting users: {e}")
         raise HTTPException(
@@ -1159,7 +1483,9 @@ async def update_user(
     user_id: int,
     user_data: UserUpdate,
     current_user: Dict[str, Any],
-    request: Request
+    request: Request,
+    cursor: sqlite3.Cursor,
+    background_tasks: BackgroundTasks
 ) -> Dict[str, Any]:
     """
     Update user information.
@@ -1169,95 +1495,74 @@ async def update_user(
         user_data: Update data
         current_user: Current authenticated user
         request: FastAPI request
+        cursor: Request-scoped database cursor
+        background_tasks: Tasks run after the response is sent
         
     Returns:
         Updated user data
     """
     # Check if current user can manage users
-    if not current_user.get("can_manage_users", False):
+    if not current_user["perm_mask"] & CAN_MANAGE_USERS:
         raise HTTPException(
             status_code=403,
             detail="Insufficient permissions to update users"
         )
     
     try:
-        db_manager = get_database_manager()
-        with db_manager.get_cursor() as cursor:
-            # Get current user data
-            cursor.execute('SELECT * FROM users WHERE id = ?', (user_id,))
-            existing_user = cursor.fetchone()
-            
-            if not existing_user:
-                raise HTTPException(status_code=404, detail="User not found")
-            
-            existing_dict = dict(existing_user)
-            
-            # Build update query
-            update_fields = []
-            update_values = []
-            
-            if user_data.full_name is not None:
-                update_fields.append("full_name = ?")
-                update_values.append(user_data.full_name)
-            
-            if user_data.phone is not None:
-                update_fields.append("phone = ?")
-                update_values.append(user_data.phone)
-            
-            if user_data.cnic is not None:
-                update_fields.append("cnic = ?")
-                update_values.append(user_data.cnic)
-            
-            if user_data.salary is not None:
-                update_fields.append("salary = ?")
-                update_values.append(user_data.salary)
-            
-            if user_data.commission_rate is not None:
-                update_fields.append("commission_rate = ?")
-                update_values.append(user_data.commission_rate)
-            
-            if user_data.status is not None:
-                update_fields.append("status = ?")
-                update_values.append(user_data.status)
-            
-            if update_fields:
-                update_fields.append("updated_at = CURRENT_TIMESTAMP")
-                update_values.append(user_id)
-                
-                update_query = f"UPDATE users SET {', '.join(update_fields)} WHERE id = ?"
-                cursor.execute(update_query, update_values)
-            
-            # Get updated user
-            cursor.execute('''
-                SELECT id, username, full_name, role, status,
-                       phone, cnic, salary, commission_rate,
-                       last_login, created_at, updated_at
-                FROM users WHERE id = ?
-            ''', (user_id,))
-            
-            updated_user = dict(cursor.fetchone())
-            
-            # Add role info
-            role_config = PAKISTANI_ROLES.get(updated_user["role"], {})
-            updated_user.update({
-                "role_name": role_config.get("name", updated_user["role"]),
-                "permissions": role_config.get("permissions", [])
-            })
-            
-            # Log user update
-            audit_log(
-                user_id=current_user["id"],
-                action="update_user",
-                table_name="users",
-                record_id=user_id,
-                old_values=existing_dict,
-                new_values=updated_user,
-                ip_address=request.client.host if request.client else None,
-                user_agent=request.headers.get("user-agent")
+        # Get current user data
+        cursor.execute(_SQL_GET_USER_FOR_AUDIT, (user_id,))
+        existing_user = cursor.fetchone()
+        
+        if not existing_user:
+            raise HTTPException(status_code=404, detail="User not found")
+        
+        existing_dict = dict(existing_user)
+        
+        # Build update query
+        update_fields = []
+        update_values = []
+        for attr, column in _UPDATE_FIELDS:
+            value = getattr(user_data, attr)
+            if value is not None:
+                update_fields.append(f"{column} = ?")
+                update_values.append(value)
+        
+        if update_fields:
+            update_values.append(user_id)
+            update_sql = (
+                f"UPDATE users SET {', '.join(update_fields)}, updated_at = CURRENT_TIMESTAMP "
+                "WHERE id = ?"
             )
-            
-            return updated_user
-            
+            if SQLITE_HAS_RETURNING:
+                # Update and read back the row in one statement
+                cursor.execute(f"{update_sql} RETURNING {_UPDATED_USER_COLUMNS}", update_values)
+            else:
+                cursor.execute(update_sql, update_values)
+                cursor.execute(_SQL_GET_UPDATED_USER, (user_id,))
+            invalidate_user_cache(user_id)
+        else:
+            cursor.execute(_SQL_GET_UPDATED_USER, (user_id,))
+        
+        updated_user = dict(cursor.fetchone())
+        
+        # Add role info
+        updated_user.update(role_summary(updated_user["role"]))
+        
+        # Log user update
+        background_tasks.add_task(
+            audit_log,
+            user_id=current_user["id"],
+            action="update_user",
+            table_name="users",
+            record_id=user_id,
+            old_values=existing_dict,
+            new_values=updated_user,
+            ip_address=request.client.host if request.client else None,
+            user_agent=request.headers.get("user-agent")
+        )
+        
+        return updated_user
+        
     except HTTPException:
         raise
     except Exception as e:
@@ -1267,7 +1572,13 @@ async def update_user(
             detail="Failed to update user"
         )
 
-async def delete_user(user_id: int, current_user: Dict[str, Any], request: Request) -> bool:
+async def delete_user(
+    user_id: int,
+    current_user: Dict[str, Any],
+    request: Request,
+    cursor: sqlite3.Cursor,
+    background_tasks: BackgroundTasks
+) -> bool:
     """
     Delete a user (soft delete).
     
@@ -1275,12 +1586,14 @@ async def delete_user(user_id: int, current_user: Dict[str, Any], request: Reque
         user_id: User ID to delete
         current_user: Current authenticated user
         request: FastAPI request
+        cursor: Request-scoped database cursor
+        background_tasks: Tasks run after the response is sent
         
     Returns:
         True if successful
     """
     # Check if current user can manage users
-    if not current_user.get("can_manage_users", False):
+    if not current_user["perm_mask"] & CAN_MANAGE_USERS:
         raise HTTPException(
             status_code=403,
             detail="Insufficient permissions to delete users"
@@ -1294,36 +1607,32 @@ async def delete_user(user_id: int, current_user: Dict[str, Any], request: Reque
         )
     
     try:
-        db_manager = get_database_manager()
-        with db_manager.get_cursor() as cursor:
-            # Get user before deletion
-            cursor.execute('SELECT * FROM users WHERE id = ?', (user_id,))
-            user = cursor.fetchone()
-            
-            if not user:
-                raise HTTPException(status_code=404, detail="User not found")
-            
-            # Soft delete (update status)
-            cursor.execute('''
-                UPDATE users 
-                SET status = 'inactive', updated_at = CURRENT_TIMESTAMP
-                WHERE id = ?
-            ''', (user_id,))
-            
-            # Log user deletion
-            audit_log(
-                user_id=current_user["id"],
-                action="delete_user",
-                table_name="users",
-                record_id=user_id,
-                old_values=dict(user),
-                new_values={"status": "inactive"},
-                ip_address=request.client.host if request.client else None,
-                user_agent=request.headers.get("user-agent")
-            )
-            
-            return True
-            
+        # Get user before deletion
+        cursor.execute(_SQL_GET_USER_FOR_AUDIT, (user_id,))
+        user = cursor.fetchone()
+        
+        if not user:
+            raise HTTPException(status_code=404, detail="User not found")
+        
+        # Soft delete (update status)
+        cursor.execute(_SQL_DEACTIVATE_USER, (user_id,))
+        invalidate_user_cache(user_id)
+        
+        # Log user deletion
+        background_tasks.add_task(
+            audit_log,
+            user_id=current_user["id"],
+            action="delete_user",
+            table_name="users",
+            record_id=user_id,
+            old_values=dict(user),
+            new_values={"status": "inactive"},
+            ip_address=request.client.host if request.client else None,
+            user_agent=request.headers.get("user-agent")
+        )
+        
+        return True
+        
     except HTTPException:
         raise
     except Exception as e:
@@ -1335,38 +1644,35 @@ async def delete_user(user_id: int, current_user: Dict[str, Any], request: Reque
 
 # ==================== SESSION MANAGEMENT ====================
 
-async def get_active_sessions(user_id: int, current_user: Dict[str, Any]) -> List[Dict[str, Any]]:
+async def get_active_sessions(
+    user_id: int,
+    current_user: Dict[str, Any],
+    cursor: sqlite3.Cursor
+) -> List[Dict[str, Any]]:
     """
     Get active sessions for a user.
     
     Args:
         user_id: User ID
         current_user: Current authenticated user
+        cursor: Request-scoped database cursor
         
     Returns:
         List of active sessions
     """
     # User can only view their own sessions unless they're admin
-    if user_id != current_user["id"] and not current_user.get("can_manage_users", False):
+    if user_id != current_user["id"] and not current_user["perm_mask"] & CAN_MANAGE_USERS:
         raise HTTPException(
             status_code=403,
             detail="Cannot view other user's sessions"
         )
     
     try:
-        db_manager = get_database_manager()
-        with db_manager.get_cursor() as cursor:
-            cursor.execute('''
-                SELECT id, session_token, device_info, ip_address,
-                       login_time, last_activity, expiry_time, is_active
-                FROM user_sessions 
-                WHERE user_id = ? AND is_active = 1
-                ORDER BY last_activity DESC
-            ''', (user_id,))
-            
-            sessions = [dict(row) for row in cursor.fetchall()]
-            return sessions
-            
+        cursor.row_factory = None
+        cursor.execute(_SQL_LIST_SESSIONS, (user_id,))
+        
+        return [dict(zip(_SESSION_COLUMNS, row)) for row in cursor.fetchall()]
+        
     except Exception as e:
         logger.error(f"Error getting sessions: {e}")
         raise HTTPException(
@@ -1374,7 +1680,13 @@ async def get_active_sessions(user_id: int, current_user: Dict[str, Any]) -> Lis
             detail="Failed to get sessions"
         )
 
-async def terminate_session(session_token: str, current_user: Dict[str, Any], request: Request) -> bool:
+async def terminate_session(
+    session_token: str,
+    current_user: Dict[str, Any],
+    request: Request,
+    cursor: sqlite3.Cursor,
+    background_tasks: BackgroundTasks
+) -> bool:
     """
     Terminate a specific session.
     
@@ -1382,51 +1694,56 @@ async def terminate_session(session_token: str, current_user: Dict[str, Any], re
         session_token: Session token to terminate
         current_user: Current authenticated user
         request: FastAPI request
+        cursor: Request-scoped database cursor
+        background_tasks: Tasks run after the response is sent
         
     Returns:
         True if successful
     """
     try:
-        db_manager = get_database_manager()
-        with db_manager.get_cursor() as cursor:
-            # Get session details
-            cursor.execute('''
-                SELECT user_id FROM user_sessions 
-                WHERE session_token = ? AND is_active = 1
-            ''', (session_token,))
-            
+        # Terminate session (user can terminate own sessions, admin can terminate any)
+        params = (
+            session_token,
+            current_user["id"],
+            1 if current_user["perm_mask"] & CAN_MANAGE_USERS else 0
+        )
+        if SQLITE_HAS_RETURNING:
+            cursor.execute(_SQL_TERMINATE_SESSION, params)
             session = cursor.fetchone()
-            if not session:
-                raise HTTPException(status_code=404, detail="Session not found")
-            
-            # Check permission (user can terminate own sessions, admin can terminate any)
-            if session["user_id"] != current_user["id"] and not current_user.get("can_manage_users", False):
+        else:
+            cursor.execute(_SQL_FIND_SESSION_TO_TERMINATE, params)
+            session = cursor.fetchone()
+            if session:
+                cursor.execute(_SQL_DEACTIVATE_SESSION, (session_token,))
+        if not session:
+            # Nothing updated: tell a missing session from someone else's
+            cursor.row_factory = None
+            cursor.execute(_SQL_ACTIVE_SESSION_EXISTS, (session_token,))
+            (session_exists,) = cursor.fetchone()
+            if session_exists:
                 raise HTTPException(
                     status_code=403,
                     detail="Cannot terminate other user's sessions"
                 )
-            
-            # Terminate session
-            cursor.execute('''
-                UPDATE user_sessions 
-                SET is_active = 0 
-                WHERE session_token = ?
-            ''', (session_token,))
-            
-            # Log session termination
-            audit_log(
-                user_id=current_user["id"],
-                action="terminate_session",
-                table_name="user_sessions",
-                record_id=None,
-                old_values={"is_active": 1},
-                new_values={"is_active": 0},
-                ip_address=request.client.host if request.client else None,
-                user_agent=request.headers.get("user-agent")
-            )
-            
-            return True
-            
+            raise HTTPException(status_code=404, detail="Session not found")
+        
+        invalidate_user_cache(session["user_id"])
+        
+        # Log session termination
+        background_tasks.add_task(
+            audit_log,
+            user_id=current_user["id"],
+            action="terminate_session",
+            table_name="user_sessions",
+            record_id=None,
+            old_values={"is_active": 1},
+            new_values={"is_active": 0},
+            ip_address=request.client.host if request.client else None,
+            user_agent=request.headers.get("user-agent")
+        )
+        
+        return True
+        
     except HTTPException:
         raise
     except Exception as e:
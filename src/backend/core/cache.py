@@ -0,0 +1,129 @@
+# src/backend/core/cache.py
+"""
+IN-PROCESS CACHES FOR HOT REQUEST PATHS
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+class TTLCache:
+    """
+    Small thread-safe mapping whose entries expire after a time-to-live.
+
+    Entries are evicted lazily on access, and the oldest entry is dropped
+    once maxsize is reached.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 30.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Get a cached value.
+
+        Args:
+            key: Cache key
+            default: Value returned on a miss
+
+        Returns:
+            Cached value, or default if missing or expired
+        """
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                return default
+
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        """
+        Store a value.
+
+        Args:
+            key: Cache key
+            value: Value to cache
+            ttl: Optional per-entry TTL in seconds (capped at the cache TTL)
+        """
+        lifetime = self.ttl if ttl is None else min(ttl, self.ttl)
+        if lifetime <= 0:
+            return
+
+        with self._lock:
+            self._data[key] = (time.monotonic() + lifetime, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """Remove a key and return its value (expired or not)."""
+        with self._lock:
+            entry = self._data.pop(key, None)
+        return default if entry is None else entry[1]
+
+    def discard_where(self, predicate: Callable[[Any], bool]) -> int:
+        """
+        Remove every entry whose value matches predicate.
+
+        Args:
+            predicate: Called with each cached value
+
+        Returns:
+            Number of entries removed
+        """
+        with self._lock:
+            stale = [key for key, (_, value) in self._data.items() if predicate(value)]
+            for key in stale:
+                del self._data[key]
+        return len(stale)
+
+    def clear(self):
+        """Remove all entries."""
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+class RotatingSet:
+    """
+    Membership set that forgets entries after one to two rotation periods.
+
+    Two generations are kept; when the current one is older than the
+    rotation interval (or full) it becomes the previous generation and
+    the old previous generation is dropped. Used as a cheap negative cache.
+    """
+
+    def __init__(self, rotate_seconds: float = 3600.0, maxsize: int = 10_000):
+        self.rotate_seconds = rotate_seconds
+        self.maxsize = maxsize
+        self._current: set = set()
+        self._previous: set = set()
+        self._rotated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _maybe_rotate(self):
+        if len(self._current) >= self.maxsize or time.monotonic() - self._rotated_at >= self.rotate_seconds:
+            self._previous = self._current
+            self._current = set()
+            self._rotated_at = time.monotonic()
+
+    def add(self, key: Hashable):
+        """Add a key to the current generation."""
+        with self._lock:
+            self._maybe_rotate()
+            self._current.add(key)
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            self._maybe_rotate()
+            return key in self._current or key in self._previous
@@ -9,26 +9,115 @@ COMPLETE DATABASE MANAGER FOR PAKISTANI AUTO SHOPS
 """
 
 import os
+import shutil
 import sys
-import sqlite3
+import atexit
 import logging
+try:
+    import pysqlite3 as sqlite3  # Bundles a current SQLite build (Linux wheels)
+except ImportError:
+    import sqlite3
 import json
 import hashlib
+import hmac
 import secrets
 import threading
 import time
-import shutil
+import queue
+import weakref
 from datetime import datetime, timedelta
 from pathlib import Path
 from contextlib import contextmanager
-from typing import Optional, Dict, Any, List, Generator
+from typing import Optional, Dict, Any, List, Tuple, Iterable, Generator, AsyncGenerator
+from concurrent.futures import Future
 import pickle
 import zlib
+from collections import namedtuple
+from functools import lru_cache
+
+from core.file_manager import fast_copy
+from core.schema import (
+    TABLE_DDL, INDEX_DDL, BACKFILL_SQL, SCHEMA_HASH, SCHEMA_META_DDL,
+    AUDIT_COLUMNS, AUDIT_ARCHIVE_DDL, existing_objects, pending_statements,
+)
+
+try:
+    from argon2 import PasswordHasher
+    from argon2.exceptions import InvalidHashError, VerificationError
+except ImportError:  # pragma: no cover - optional dependency
+    PasswordHasher = None
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# UPDATE/INSERT ... RETURNING needs SQLite 3.35+ (older stdlib builds fall back)
+SQLITE_HAS_RETURNING = sqlite3.sqlite_version_info >= (3, 35, 0)
+
+# Argon2id hasher (native argon2-cffi); None falls back to PBKDF2-SHA256
+_password_hasher = PasswordHasher(time_cost=2, memory_cost=65536, parallelism=2) if PasswordHasher is not None else None
+
+# PBKDF2 work factor for new fallback hashes; stored per hash, so it can be raised
+PBKDF2_ITERATIONS = 120_000
+
+# Tables whose row counts get_database_info reports
+STATISTICS_TABLES = ('users', 'products', 'customers', 'sales', 'sale_items')
+
+BACKUP_HISTORY_SQL = (
+    "INSERT INTO backup_history (backup_type, file_path, file_size, status, notes) "
+    "VALUES (?, ?, ?, 'success', ?)"
+)
+
+# Per-connection settings, applied in one executescript call. locking_mode
+# stays NORMAL even for a single POS instance: EXCLUSIVE is held per
+# connection, so it would lock out the rest of the pool, the thread readers
+# and the writer thread within this same process.
+_PRAGMA_SCRIPT = """
+PRAGMA journal_mode = WAL;          -- Write-Ahead Logging for concurrency
+PRAGMA synchronous = NORMAL;        -- Safe under WAL: no corruption, only the last commits can roll back on power loss
+PRAGMA foreign_keys = ON;           -- Enable foreign key constraints
+PRAGMA busy_timeout = 10000;        -- 10 second timeout to reduce transient locks
+PRAGMA cache_size = -65536;         -- 64MB page cache
+PRAGMA temp_store = MEMORY;         -- Store temp tables in memory
+PRAGMA mmap_size = 268435456;       -- Memory-map up to 256MB of the file
+PRAGMA wal_autocheckpoint = 1000;   -- Checkpoint every 1000 WAL pages
+"""
+
+# ==================== ROW FACTORIES ====================
+
+@lru_cache(maxsize=256)
+def _row_class(columns: tuple):
+    """Build (once per column list) the namedtuple class for a result shape."""
+    return namedtuple('Row', columns, rename=True)
+
+
+def namedtuple_row_factory(cursor: sqlite3.Cursor, row: tuple):
+    """
+    Row factory returning lightweight namedtuples.
+    
+    Opt-in per cursor for large result sets (reports, exports); rows support
+    indexing and attribute access but not row['column'] or dict(row).
+    
+    Args:
+        cursor: Cursor that produced the row
+        row: Raw row tuple
+    
+    Returns:
+        namedtuple instance for the row
+    """
+    return _row_class(tuple(d[0] for d in cursor.description))(*row)
+
+
+# ==================== POOLED CONNECTIONS ====================
+
+class _PooledConnection(sqlite3.Connection):
+    """Read-write pool connection that keeps one cursor across checkouts."""
+    
+    reusable_cursor: Optional[sqlite3.Cursor] = None
+
+
+class _ReaderConnection(sqlite3.Connection):
+    """Per-thread read-only connection (a subclass so the manager can track it weakly)."""
+
+
 class DatabaseManager:
     """
     Enterprise-grade database manager for Pakistani auto shops POS system.
@@ -65,17 +154,55 @@ class DatabaseManager:
         self.cache_db_path = self.app_data_path / 'database' / 'cache.db'
         self.backup_dir = self.app_data_path / 'backups'
         
-        # Connection pool
+        # Read-write connection pool
         self.connection_pool = []
         self.max_connections = 10
+        # SQLite runs one write transaction at a time and reads go to the
+        # thread readers, so only a couple of read-write connections (each
+        # with its own page cache) are opened up front; the rest on demand
+        self.prewarm_connections = 2
         self.pool_lock = threading.Lock()
+        
+        # Read-only connections, one per thread; bumping the generation
+        # makes every thread reopen its reader (and the writer thread its
+        # connection) after backup/restore
+        self.reader_local = threading.local()
+        self.connection_generation = 0
+        # Every open reader, so close_all_connections can close the ones
+        # owned by other threads (guarded by pool_lock)
+        self.reader_connections = weakref.WeakSet()
         self.initialized = False
         self.init_lock = threading.Lock()
+        self.initialized_event = threading.Event()
         
         # Performance monitoring
         self.query_count = 0
         self.start_time = time.time()
         
+        # Open pooled connections in the background once the schema exists
+        threading.Thread(target=self._prewarm_pool, name="db-prewarm", daemon=True).start()
+        
+        # Keep the WAL file bounded and planner statistics fresh
+        self.wal_checkpoint_interval = 60
+        
+        # Audit rows older than this many months move to database/archive/audit_YYYYMM.db
+        self.audit_archive_dir = self.app_data_path / 'database' / 'archive'
+        self.audit_keep_months = 3
+        self.audit_archived_month = None
+        
+        # Started by initialize_database; close_all_connections stops it
+        self.maintenance_lock = threading.Lock()
+        self.maintenance_thread = None
+        self.maintenance_stop = threading.Event()
+        
+        # Single writer thread for fire-and-forget writes (submit_write);
+        # close_all_connections stops it and the next submit_write restarts it
+        self.write_queue = queue.Queue()
+        self.write_batch_size = 256
+        self.writer_lock = threading.Lock()
+        self.writer_thread = None
+        self._start_writer()
+        
         logger.info(f"Database Manager initialized. Data path: {self.app_data_path}")
     
     def create_directories(self):
@@ -96,52 +223,249 @@ class DatabaseManager:
         for directory in directories:
             directory.mkdir(parents=True, exist_ok=True)
     
-    def get_connection(self) -> sqlite3.Connection:
+    def _prewarm_pool(self):
         """
-        Get a database connection from pool or create new one.
+        Open the first read-write connections so early requests skip setup.
         
-        Returns:
-            SQLite connection object
+        Runs on a daemon thread and waits for initialize_database so the
+        DDL is never racing these connections.
         """
-        # Retry loop to handle transient 'database is locked' situations
-        attempts = 5
+        self.initialized_event.wait()
+        
         delay = 0.2
-        for attempt in range(attempts):
+        for _ in range(self.prewarm_connections):
+            try:
+                conn = self.create_new_connection()
+            except sqlite3.OperationalError as e:
+                if 'locked' not in str(e).lower():
+                    logger.warning(f"Connection pre-warm stopped: {e}")
+                    return
+                time.sleep(delay)
+                delay *= 2
+                continue
+            
             with self.pool_lock:
-                if self.connection_pool:
-                    conn = self.connection_pool.pop()
+                if len(self.connection_pool) >= self.max_connections:
+                    conn.close()
+                    return
+                self.connection_pool.append(conn)
+    
+    def _start_maintenance(self):
+        """Start the WAL maintenance thread unless it is already running."""
+        with self.maintenance_lock:
+            if self.maintenance_thread is None or not self.maintenance_thread.is_alive():
+                # Each thread gets its own stop event, so one that outlived
+                # _stop_maintenance's join still stops
+                self.maintenance_stop = threading.Event()
+                self.maintenance_thread = threading.Thread(
+                    target=self._wal_maintenance,
+                    args=(self.maintenance_stop,),
+                    name="db-wal-maintenance",
+                    daemon=True
+                )
+                self.maintenance_thread.start()
+    
+    def _stop_maintenance(self):
+        """Stop the WAL maintenance thread, waiting for a pass in progress."""
+        with self.maintenance_lock:
+            thread, self.maintenance_thread = self.maintenance_thread, None
+            self.maintenance_stop.set()
+            if thread is not None and thread.is_alive() and thread is not threading.current_thread():
+                thread.join(timeout=30)
+    
+    def _wal_maintenance(self, stop: threading.Event):
+        """
+        Periodically truncate the WAL and refresh planner statistics.
+        
+        Runs on a daemon thread with a pooled connection between requests;
+        auto-checkpoints only reuse the WAL, so TRUNCATE is what actually
+        shrinks pos_main.db-wal after a busy spell.
+        
+        Args:
+            stop: Set to end the loop
+        """
+        while not stop.wait(self.wal_checkpoint_interval):
+            try:
+                conn = self.get_connection()
+            except sqlite3.Error as e:
+                logger.warning(f"WAL maintenance skipped: {e}")
+                continue
+            
+            try:
+                if not conn.in_transaction:
+                    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+                    conn.execute("PRAGMA optimize")
+            except sqlite3.Error as e:
+                logger.warning(f"WAL maintenance failed: {e}")
+            finally:
+                self.return_connection(conn)
+            
+            # Rotate the audit log once per calendar month
+            month = datetime.now().strftime('%Y%m')
+            if month != self.audit_archived_month:
+                try:
+                    self.archive_audit_log()
+                    self.audit_archived_month = month
+                except sqlite3.Error as e:
+                    logger.warning(f"Audit log archiving failed: {e}")
+    
+    def submit_write(self, sql: str, params: Any = (), many: bool = False) -> Future:
+        """
+        Queue a write statement for the dedicated writer thread.
+        
+        Statements queued together are committed in one transaction, each
+        inside its own savepoint so one failure does not undo the others.
+        
+        Args:
+            sql: INSERT/UPDATE/DELETE statement
+            params: Statement parameters (a sequence of them when many=True)
+            many: Run with executemany
+        
+        Returns:
+            Future resolving to the statement's rowcount once committed
+        """
+        future = Future()
+        self.write_queue.put((sql, params, many, future))
+        self._start_writer()
+        return future
+    
+    def _start_writer(self):
+        """Start the writer thread unless it is already running."""
+        with self.writer_lock:
+            if self.writer_thread is None or not self.writer_thread.is_alive():
+                self.writer_thread = threading.Thread(target=self._writer_loop, name="db-writer", daemon=True)
+                self.writer_thread.start()
+    
+    def _stop_writer(self):
+        """Finish queued writes, close the writer's connection and stop its thread."""
+        with self.writer_lock:
+            thread, self.writer_thread = self.writer_thread, None
+            if thread is None or not thread.is_alive() or thread is threading.current_thread():
+                return
+            # None is the stop sentinel; writes queued before it are committed first
+            self.write_queue.put(None)
+            thread.join(timeout=30)
+        
+        if not self.write_queue.empty():
+            self._start_writer()
+    
+    def _writer_loop(self):
+        """Drain write_queue on one connection, one transaction per batch, until a None sentinel."""
+        conn = None
+        generation = None
+        running = True
+        while running:
+            batch = [self.write_queue.get()]
+            while batch[-1] is not None and len(batch) < self.write_batch_size:
+                try:
+                    batch.append(self.write_queue.get_nowait())
+                except queue.Empty:
+                    break
+            
+            if batch[-1] is None:
+                running = False
+                batch.pop()
+                if not batch:
+                    break
+            
+            self.initialized_event.wait()
+            
+            results = []
+            try:
+                if conn is None or generation != self.connection_generation:
+                    if conn is not None:
+                        conn.close()
+                    generation = self.connection_generation
+                    conn = self.create_new_connection()
+                
+                conn.execute("BEGIN IMMEDIATE")
+                for sql, params, many, future in batch:
+                    conn.execute("SAVEPOINT queued_write")
                     try:
-                        # Test connection
-                        conn.execute("SELECT 1").fetchone()
-                        return conn
-                    except sqlite3.Error:
-                        try:
-                            conn.close()
-                        except Exception:
-                            pass
-                        # Fall through to create a new connection
+                        cursor = conn.executemany(sql, params) if many else conn.execute(sql, params)
+                        results.append((future, cursor.rowcount, None))
+                    except sqlite3.Error as e:
+                        conn.execute("ROLLBACK TO queued_write")
+                        results.append((future, None, e))
+                    conn.execute("RELEASE queued_write")
+                conn.commit()
+            except Exception as e:
+                logger.error(f"Queued write batch failed ({len(batch)} statements): {e}")
+                if conn is not None:
+                    try:
+                        conn.close()
+                    except Exception:
                         pass
+                    conn = None
+                results = [(item[3], None, e) for item in batch]
+            
+            for future, rowcount, error in results:
+                if error is None:
+                    future.set_result(rowcount)
                 else:
-                    try:
-                        return self.create_new_connection()
-                    except sqlite3.OperationalError as e:
-                        # If DB is locked, retry a few times
-                        if 'locked' in str(e).lower() and attempt < attempts - 1:
-                            logger.warning(f"Database locked, retrying (attempt {attempt+1}/{attempts})")
-                            time.sleep(delay)
-                            delay *= 2
-                            continue
-                        raise
-            # If we couldn't get a connection from pool, wait and retry
-            time.sleep(delay)
-            delay *= 2
-        # Final attempt: create connection or raise
+                    future.set_exception(error)
+        
+        if conn is not None:
+            try:
+                conn.close()
+            except Exception:
+                pass
+    
+    def get_connection(self, readonly: bool = False) -> sqlite3.Connection:
+        """
+        Get a database connection from pool or create new one.
+        
+        Args:
+            readonly: Use this thread's read-only connection
+        
+        Returns:
+            SQLite connection object
+        """
+        if readonly:
+            return self._get_thread_reader()
+        
+        # SQLite itself waits out locks (busy_timeout), so no retry loop here
+        with self.pool_lock:
+            if self.connection_pool:
+                # No liveness probe; get_cursor replaces a closed connection
+                return self.connection_pool.pop()
+        
         return self.create_new_connection()
     
-    def create_new_connection(self) -> sqlite3.Connection:
+    def _get_thread_reader(self) -> sqlite3.Connection:
+        """
+        Get the calling thread's read-only connection, opening it if needed.
+        
+        Readers never open a transaction, so cursors from overlapping
+        requests on the same thread can safely share one connection.
+        
+        Returns:
+            Read-only SQLite connection bound to this thread
+        """
+        local = self.reader_local
+        conn = getattr(local, 'conn', None)
+        if conn is not None:
+            if local.generation == self.connection_generation:
+                return conn
+            try:
+                conn.close()
+            except Exception:
+                pass
+        
+        conn = self.create_new_connection(readonly=True)
+        with self.pool_lock:
+            self.reader_connections.add(conn)
+        local.conn = conn
+        local.generation = self.connection_generation
+        return conn
+    
+    def create_new_connection(self, readonly: bool = False) -> sqlite3.Connection:
         """
         Create a new database connection with optimal settings.
         
+        Args:
+            readonly: Open the database read-only (WAL lets these run alongside the writer)
+        
         Returns:
             SQLite connection
         """
@@ -149,54 +473,111 @@ class DatabaseManager:
             # Ensure database directory exists
             self.db_path.parent.mkdir(parents=True, exist_ok=True)
             
+            if readonly:
+                database, uri = self.db_path.resolve().as_uri() + "?mode=ro", True
+            else:
+                database, uri = str(self.db_path), False
+            
             # Create connection with detect_types disabled to prevent errors with mixed timestamp formats
             conn = sqlite3.connect(
-                str(self.db_path),
+                database,
                 timeout=30.0,
                 detect_types=0,  # Disable automatic type conversion to avoid "not enough values to unpack" errors
-                check_same_thread=False
+                check_same_thread=False,  # Readers stay on their thread but may be closed from another
+                cached_statements=1024,  # Every hot auth/POS statement stays compiled for the connection's life
+                uri=uri,
+                factory=_ReaderConnection if readonly else _PooledConnection
             )
             
-            # Optimize for POS usage
-            conn.execute("PRAGMA journal_mode = WAL")  # Write-Ahead Logging for concurrency
-            conn.execute("PRAGMA synchronous = NORMAL")  # Good balance of speed and safety
-            conn.execute("PRAGMA foreign_keys = ON")  # Enable foreign key constraints
-            conn.execute("PRAGMA busy_timeout = 10000")  # 10 second timeout to reduce transient locks
-            conn.execute("PRAGMA cache_size = -2000")  # 2MB cache
-            conn.execute("PRAGMA temp_store = MEMORY")  # Store temp tables in memory
-            
-            # Set row factory for dictionary-like access
-            conn.row_factory = sqlite3.Row
-            
+            self._configure_connection(conn, readonly)
             return conn
             
         except Exception as e:
             logger.error(f"Failed to create database connection: {e}")
             raise
     
-    def return_connection(self, conn: sqlite3.Connection):
+    @staticmethod
+    def _configure_connection(conn: sqlite3.Connection, readonly: bool = False):
+        """
+        Apply the per-connection settings before the connection is used.
+        
+        journal_mode=WAL is persistent in the file, but the rest of
+        _PRAGMA_SCRIPT is per connection and must run on every open.
+        
+        Args:
+            conn: Freshly opened connection to pos_main.db
+            readonly: Whether conn was opened read-only
+        """
+        # Larger pages for a brand-new file; page_size is fixed once the
+        # first page is written (and before WAL is switched on)
+        if not readonly and conn.execute("PRAGMA page_count").fetchone()[0] == 0:
+            conn.execute("PRAGMA page_size = 8192")
+        
+        # Optimize for POS usage
+        conn.executescript(_PRAGMA_SCRIPT)
+        
+        # Set row factory for dictionary-like access
+        conn.row_factory = sqlite3.Row
+    
+    def return_connection(self, conn: sqlite3.Connection, readonly: bool = False):
         """
         Return connection to pool.
         
         Args:
             conn: SQLite connection to return
+            readonly: Whether conn is a thread's reader (kept open, not pooled)
         """
+        if readonly:
+            return
+        
         with self.pool_lock:
             if len(self.connection_pool) < self.max_connections:
                 self.connection_pool.append(conn)
             else:
                 conn.close()
     
+    def _close_pooled_connections(self):
+        """Close idle pooled connections and every thread's reader (caller holds pool_lock)."""
+        for conn in self.connection_pool:
+            try:
+                conn.close()
+            except Exception:
+                pass
+        self.connection_pool.clear()
+        
+        # Close every thread's reader; each thread reopens on next use
+        self.connection_generation += 1
+        for conn in list(self.reader_connections):
+            try:
+                conn.close()
+            except Exception:
+                pass
+        self.reader_connections.clear()
+        self.reader_local.conn = None
+    
     @contextmanager
-    def get_cursor(self) -> Generator[sqlite3.Cursor, None, None]:
+    def get_cursor(self, readonly: bool = False) -> Generator[sqlite3.Cursor, None, None]:
         """
         Context manager for database operations.
         
+        Args:
+            readonly: Use a read-only connection (queries only)
+        
         Yields:
             SQLite cursor
         """
-        conn = self.get_connection()
-        cursor = conn.cursor()
+        conn = self.get_connection(readonly)
+        try:
+            cursor = self._checkout_cursor(conn, readonly)
+        except (sqlite3.ProgrammingError, sqlite3.OperationalError) as e:
+            if 'closed' not in str(e).lower():
+                raise
+            # Pooled connection was closed underneath us; reconnect once
+            logger.warning("Replacing closed database connection")
+            if readonly:
+                self.reader_local.conn = None
+            conn = self.get_connection(readonly) if readonly else self.create_new_connection()
+            cursor = self._checkout_cursor(conn, readonly)
         try:
             yield cursor
             conn.commit()
@@ -205,9 +586,165 @@ class DatabaseManager:
             logger.error(f"Database error: {e}")
             raise
         finally:
-            cursor.close()
+            # Pooled cursors stay open for the next checkout
+            if readonly:
+                cursor.close()
+            self.return_connection(conn, readonly)
+    
+    @staticmethod
+    def _checkout_cursor(conn: sqlite3.Connection, readonly: bool) -> sqlite3.Cursor:
+        """
+        Get a cursor for one get_cursor block.
+        
+        A pooled read-write connection is used by one block at a time, so
+        its cursor is reused (with the row factory reset). Thread readers
+        can serve overlapping requests and always get a fresh cursor.
+        
+        Args:
+            conn: Connection from get_connection
+            readonly: Whether conn is a thread reader
+        
+        Returns:
+            SQLite cursor
+        """
+        if readonly:
+            return conn.cursor()
+        
+        # Also raises ProgrammingError if the connection has been closed
+        if conn.in_transaction:
+            conn.rollback()
+        
+        cursor = conn.reusable_cursor
+        if cursor is None:
+            cursor = conn.reusable_cursor = conn.cursor()
+        else:
+            cursor.row_factory = conn.row_factory
+        return cursor
+    
+    def bulk_insert(self, table: str, columns: List[str], rows: Iterable[tuple],
+                    cursor: Optional[sqlite3.Cursor] = None) -> int:
+        """
+        Insert many rows with one prepared statement.
+        
+        Args:
+            table: Target table name
+            columns: Column names, in the order values appear in each row
+            rows: Row tuples to insert
+            cursor: Cursor of an open transaction to join; without one the
+                rows are written in their own BEGIN IMMEDIATE transaction
+        
+        Returns:
+            Number of rows inserted
+        """
+        if not all(name.isidentifier() for name in [table, *columns]):
+            raise ValueError(f"Invalid table or column name for bulk insert: {table}")
+        
+        sql = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+        
+        if cursor is not None:
+            cursor.executemany(sql, rows)
+            return cursor.rowcount
+        
+        conn = self.get_connection()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            count = conn.executemany(sql, rows).rowcount
+            conn.commit()
+            return count
+        except Exception as e:
+            conn.rollback()
+            logger.error(f"Bulk insert into {table} failed: {e}")
+            raise
+        finally:
             self.return_connection(conn)
     
+    def get_shop_settings(self) -> Optional[Dict[str, Any]]:
+        """
+        Get the shop_settings row, cached until the database changes.
+        
+        PRAGMA data_version on this thread's reader changes whenever another
+        connection commits, so an unchanged version means the cached row is
+        still current. The cache lives beside the reader it was checked on.
+        
+        Returns:
+            Copy of the settings row as a dict, or None if not configured
+        """
+        conn = self._get_thread_reader()
+        version = conn.execute("PRAGMA data_version").fetchone()[0]
+        
+        cached = getattr(self.reader_local, 'shop_settings', None)
+        if cached is None or cached[0] is not conn or cached[1] != version:
+            row = conn.execute("SELECT * FROM shop_settings LIMIT 1").fetchone()
+            cached = (conn, version, dict(row) if row else None)
+            self.reader_local.shop_settings = cached
+        
+        settings = cached[2]
+        return dict(settings) if settings is not None else None
+    
+    @staticmethod
+    def hash_password(password: str, salt: Optional[str] = None) -> Tuple[str, str]:
+        """
+        Hash a password for storage in users.password_hash.
+        
+        Uses Argon2id when argon2-cffi is installed, otherwise (or when an
+        explicit salt is given) pbkdf2_sha256$iterations$salt$hash.
+        
+        Args:
+            password: Plain text password
+            salt: Optional hex salt for the PBKDF2 format
+            
+        Returns:
+            Tuple of (hashed_password, salt)
+        """
+        if _password_hasher is not None and salt is None:
+            hashed = _password_hasher.hash(password)
+            return hashed, hashed.rsplit('$', 2)[1]
+        
+        if salt is None:
+            salt = secrets.token_hex(16)
+        
+        digest = hashlib.pbkdf2_hmac('sha256', password.encode(), bytes.fromhex(salt), PBKDF2_ITERATIONS)
+        return f"pbkdf2_sha256${PBKDF2_ITERATIONS}${salt}${digest.hex()}", salt
+    
+    @staticmethod
+    def verify_password(password: str, hashed_password: str) -> bool:
+        """
+        Verify a password against a stored hash, dispatching on its prefix.
+        
+        Args:
+            password: Plain text password
+            hashed_password: Stored hash ($argon2id$..., pbkdf2_sha256$... or legacy sha256$salt$hash)
+            
+        Returns:
+            True if password matches
+        """
+        if hashed_password.startswith('$argon2'):
+            if _password_hasher is None:
+                logger.error("Argon2 password hash found but argon2-cffi is not installed")
+                return False
+            try:
+                return _password_hasher.verify(hashed_password, password)
+            except (VerificationError, InvalidHashError):
+                return False
+        
+        try:
+            if hashed_password.startswith('pbkdf2_sha256$'):
+                _, iterations, salt, hash_value = hashed_password.split('$')
+                digest = hashlib.pbkdf2_hmac('sha256', password.encode(), bytes.fromhex(salt), int(iterations))
+                return hmac.compare_digest(digest.hex(), hash_value)
+            
+            algorithm, salt, hash_value = hashed_password.split('$')
+            if algorithm != 'sha256':
+                return False
+            
+            hash_obj = hashlib.sha256(password.encode())
+            hash_obj.update(salt.encode())
+            return hmac.compare_digest(hash_obj.hexdigest(), hash_value)
+            
+        except (ValueError, TypeError):
+            # TypeError: stored digest is not ASCII
+            return False
+    
     def initialize_database(self):
         """
         Initialize database with all tables and default data.
@@ -227,1036 +764,70 @@ class DatabaseManager:
                     # Enable foreign keys
                     cursor.execute("PRAGMA foreign_keys = ON")
                     
-                    # ==================== CREATE ALL 52 TABLES ====================
-                    
-                    # 1. USERS TABLE (With Pakistani roles)
-                    cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS users (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        username VARCHAR(50) UNIQUE NOT NULL,
-                        password_hash VARCHAR(255) NOT NULL,
-                        full_name VARCHAR(100) NOT NULL,
-                        role VARCHAR(20) NOT NULL CHECK(role IN ('malik', 'munshi', 'shop_boy', 'stock_boy')),
-                        phone VARCHAR(20),
-                        address TEXT,
-                        cnic VARCHAR(13),
-                        salary DECIMAL(15,2) DEFAULT 0,
-                        commission_rate DECIMAL(5,2) DEFAULT 0,
-                        status VARCHAR(20) DEFAULT 'active' CHECK(status IN ('active', 'inactive', 'suspended')),
-                        last_login TIMESTAMP,
-                        login_attempts INTEGER DEFAULT 0,
-                        locked_until TIMESTAMP,
-                        password_changed_at TIMESTAMP, -- Track when password was last changed
-                        permissions TEXT, -- JSON permissions
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                    )
-                    ''')
-                    
-                    # 2. SHOP SETTINGS
-                    cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS shop_settings (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        shop_name VARCHAR(200) NOT NULL DEFAULT 'Auto Accessories Shop',
-                        shop_address TEXT NOT NULL,
-                        shop_city VARCHAR(50) NOT NULL,
-                        shop_phone VARCHAR(20) NOT NULL,
-                        shop_email VARCHAR(100),
-                        owner_name VARCHAR(100),
-                        owner_phone VARCHAR(20),
-                        owner_cnic VARCHAR(13),
-                        ntn_number VARCHAR(100),
-                        strn_number VARCHAR(100),
-                        gst_number VARCHAR(100),
-                        invoice_prefix VARCHAR(10) DEFAULT 'INV',
-                        invoice_start_number INTEGER DEFAULT 1000,
-                        receipt_footer TEXT,
-                        logo_path VARCHAR(500),
-                        currency_symbol VARCHAR(10) DEFAULT '₹',
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                    )
-                    ''')
-                    
-                    # 3. CATEGORIES (For auto parts)
-                    cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS categories (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        parent_id INTEGER,
-                        category_code VARCHAR(50) UNIQUE NOT NULL,
-                        name VARCHAR(100) NOT NULL,
-                        description TEXT,
-                        image_path VARCHAR(500),
-                        display_order INTEGER DEFAULT 0,
-                        for_vehicle_type VARCHAR(50), -- 'car', 'bike', 'rickshaw', 'truck'
-                        is_active BOOLEAN DEFAULT 1,
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        FOREIGN KEY (parent_id) REFERENCES categories(id) ON DELETE SET NULL
-                    )
-                    ''')
-                    
-                    # 4. BRANDS
-                    cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS brands (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        brand_code VARCHAR(50) UNIQUE NOT NULL,
-                        name VARCHAR(100) NOT NULL,
-                        country VARCHAR(50),
-                        description TEXT,
-                        logo_path VARCHAR(500),
-                        is_active BOOLEAN DEFAULT 1,
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                    )
-                    ''')
-                    
-                    # 5. PRODUCTS (Core table)
-                    cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS products (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        product_code VARCHAR(50) UNIQUE NOT NULL,
-                        barcode VARCHAR(100) UNIQUE,
-                        name VARCHAR(200) NOT NULL,
-                        description TEXT,
-                        category_id INTEGER NOT NULL,
-                        brand_id INTEGER,
-                        unit VARCHAR(20) DEFAULT 'pcs',
-                        
-                        -- Pakistani Pricing (Gola System)
-                        cost_price DECIMAL(15,2) NOT NULL,
-                        retail_price DECIMAL(15,2) NOT NULL,
-                        wholesale_price DECIMAL(15,2),
-                        dealer_price DECIMAL(15,2),
-                        min_sale_price DECIMAL(15,2), -- Minimum allowed price
-                        
-                        -- Stock Management
-                        current_stock DECIMAL(15,3) NOT NULL DEFAULT 0,
-                        min_stock DECIMAL(15,3) NOT NULL DEFAULT 5,
-                        max_stock DECIMAL(15,3),
-                        reorder_level DECIMAL(15,3),
-                        
-                        -- Pakistani Tax
-                        gst_rate DECIMAL(5,2) DEFAULT 17.0,
-                        is_gst_applicable BOOLEAN DEFAULT 1,
-                        hsc_code VARCHAR(50),
-                        
-                        -- Product Details
-                        for_vehicle_type VARCHAR(50), -- Specific vehicle type
-                        model_compatibility TEXT, -- JSON array of compatible models
-                        warranty_days INTEGER DEFAULT 180, -- 6 months default
-                        has_serial BOOLEAN DEFAULT 0, -- Serial number tracking
-                        
-                        -- Images
-                        image_path VARCHAR(500),
-                        
-                        -- Status
-                        is_active BOOLEAN DEFAULT 1,
-                        is_service BOOLEAN DEFAULT 0, -- Service vs product
-                        
-                        -- Audit
-                        created_by INTEGER,
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        last_stock_update TIMESTAMP,
-                        
-                        FOREIGN KEY (category_id) REFERENCES categories(id),
-                        FOREIGN KEY (brand_id) REFERENCES brands(id),
-                        FOREIGN KEY (created_by) REFERENCES users(id)
-                    )
-                    ''')
-                    
-                    # 6. PRODUCT VARIANTS (Size, Color, etc.)
-                    cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS product_variants (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        product_id INTEGER NOT NULL,
-                        variant_code VARCHAR(50) NOT NULL,
-                        variant_name VARCHAR(100) NOT NULL,
-                        barcode VARCHAR(100) UNIQUE,
-                        cost_price DECIMAL(15,2),
-                        sale_price DECIMAL(15,2),
-                        current_stock DECIMAL(15,3) DEFAULT 0,
-                        min_stock DECIMAL(15,3) DEFAULT 0,
-                        image_path VARCHAR(500),
-                        is_active BOOLEAN DEFAULT 1,
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        FOREIGN KEY (product_id) REFERENCES products(id) ON DELETE CASCADE,
-                        UNIQUE(product_id, variant_code)
-                    )
-                    ''')
-                    
-                    # 7. SERIAL NUMBERS (For expensive items)
-                    cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS serial_numbers (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        product_id INTEGER NOT NULL,
-                        serial_number VARCHAR(100) UNIQUE NOT NULL,
-                        purchase_id INTEGER,
-                        purchase_item_id INTEGER,
-                        sale_id INTEGER,
-                        sale_item_id INTEGER,
-                        status VARCHAR(20) DEFAULT 'in_stock' CHECK(status IN ('in_stock', 'sold', 'returned', 'damaged')),
-                        purchase_date DATE,
-                        sale_date DATE,
-                        warranty_start DATE,
-                        warranty_end DATE,
-                        notes TEXT,
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        FOREIGN KEY (product_id) REFERENCES products(id),
-                        FOREIGN KEY (purchase_id) REFERENCES purchases(id),
-                        FOREIGN KEY (sale_id) REFERENCES sales(id)
-                    )
-                    ''')
-                    
-                    # 8. CUSTOMERS
-                    cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS customers (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        customer_code VARCHAR(50) UNIQUE NOT NULL,
-                        full_name VARCHAR(200) NOT NULL,
-                        phone VARCHAR(20) UNIQUE NOT NULL,
-                        phone2 VARCHAR(20),
-                        email VARCHAR(100),
-                        cnic VARCHAR(13) UNIQUE,
-                        address TEXT,
-                        city VARCHAR(50),
-                        area VARCHAR(100), -- Mohalla
-                        customer_type VARCHAR(20) DEFAULT 'retail' CHECK(customer_type IN ('retail', 'wholesale', 'dealer', 'corporate')),
-                        
-                        -- Pakistani Credit System (Udhaar)
-                        credit_limit DECIMAL(15,2) DEFAULT 0,
-                        current_balance DECIMAL(15,2) DEFAULT 0,
-                        credit_days INTEGER DEFAULT 30,
-                        is_credit_allowed BOOLEAN DEFAULT 0,
-                        
-                        -- Loyalty
-                        loyalty_points INTEGER DEFAULT 0,
-                        total_purchases DECIMAL(15,2) DEFAULT 0,
-                        last_purchase_date DATE,
-                        
-                        -- Status
-                        status VARCHAR(20) DEFAULT 'active' CHECK(status IN ('active', 'inactive', 'blacklisted')),
-                        notes TEXT,
-                        
-                        -- Audit
-                        created_by INTEGER,
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        
-                        FOREIGN KEY (created_by) REFERENCES users(id)
-                    )
-                    ''')
-                    
-                    # 9. CUSTOMER VEHICLES
-                    cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS customer_vehicles (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        customer_id INTEGER NOT NULL,
-                        vehicle_type VARCHAR(20) NOT NULL CHECK(vehicle_type IN ('car', 'bike', 'rickshaw', 'truck', 'other')),
-                        make VARCHAR(50), -- Honda, Toyota, Suzuki
-                        model VARCHAR(50),
-                        year INTEGER,
-                        registration_number VARCHAR(50),
-                        chassis_number VARCHAR(100),
-                        engine_number VARCHAR(100),
-                        color VARCHAR(30),
-                        purchase_date DATE,
-                        last_service_date DATE,
-                        next_service_date DATE,
-                        notes TEXT,
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        FOREIGN KEY (customer_id) REFERENCES customers(id) ON DELETE CASCADE
-                    )
-                    ''')
-                    
-                    # 10. PRICE GROUPS (Gola System)
-                    cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS price_groups (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        group_code VARCHAR(50) UNIQUE NOT NULL,
-                        group_name VARCHAR(100) NOT NULL,
-                        description TEXT,
-                        discount_percent DECIMAL(5,2) DEFAULT 0,
-                        is_default BOOLEAN DEFAULT 0,
-                        is_active BOOLEAN DEFAULT 1,
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                    )
-                    ''')
-                    
-                    # 11. CUSTOMER PRICE GROUPS
-                    cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS customer_price_groups (
-                        customer_id INTEGER NOT NULL,
-                        price_group_id INTEGER NOT NULL,
-                        effective_date DATE DEFAULT CURRENT_DATE,
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        PRIMARY KEY (customer_id, price_group_id),
-                        FOREIGN KEY (customer_id) REFERENCES customers(id),
-                        FOREIGN KEY (price_group_id) REFERENCES price_groups(id)
-                    )
-                    ''')
-                    
-                    # 12. SALES (Main sales table)
-                    cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS sales (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        invoice_number VARCHAR(50) UNIQUE NOT NULL,
-                        invoice_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        
-                        -- Customer Info
-                        customer_id INTEGER,
-                        customer_name VARCHAR(200),
-                        customer_phone VARCHAR(20),
-                        customer_cnic VARCHAR(13),
-                        
-                        -- Vehicle Info (for auto shops)
-                        vehicle_type VARCHAR(20),
-                        vehicle_make VARCHAR(50),
-                        vehicle_model VARCHAR(50),
-                        vehicle_registration VARCHAR(50),
-                        
-                        -- Totals
-                        total_items INTEGER NOT NULL DEFAULT 0,
-                        total_quantity DECIMAL(15,3) NOT NULL DEFAULT 0,
-                        subtotal DECIMAL(15,2) NOT NULL DEFAULT 0,
-                        discount_amount DECIMAL(15,2) NOT NULL DEFAULT 0,
-                        discount_percent DECIMAL(5,2) DEFAULT 0,
-                        
-                        -- Pakistani Taxes
-                        gst_amount DECIMAL(15,2) NOT NULL DEFAULT 0,
-                        gst_rate DECIMAL(5,2) DEFAULT 17.0,
-                        additional_tax DECIMAL(15,2) DEFAULT 0,
-                        withholding_tax DECIMAL(15,2) DEFAULT 0,
-                        
-                        -- Final Amounts
-                        shipping_charge DECIMAL(15,2) DEFAULT 0,
-                        round_off DECIMAL(10,2) DEFAULT 0,
-                        grand_total DECIMAL(15,2) NOT NULL DEFAULT 0,
-                        amount_paid DECIMAL(15,2) NOT NULL DEFAULT 0,
-                        balance_due DECIMAL(15,2) NOT NULL DEFAULT 0,
-                        
-                        -- Payment Info (Pakistani methods)
-                        payment_method VARCHAR(50) DEFAULT 'cash' CHECK(payment_method IN ('cash', 'card', 'cheque', 'bank_transfer', 'credit', 'mixed')),
-                        payment_status VARCHAR(20) DEFAULT 'paid' CHECK(payment_status IN ('paid', 'pending', 'partial', 'cancelled')),
-                        
-                        -- Sale Status
-                        sale_type VARCHAR(20) DEFAULT 'retail' CHECK(sale_type IN ('retail', 'wholesale', 'dealer')),
-                        sale_status VARCHAR(20) DEFAULT 'completed' CHECK(sale_status IN ('completed', 'hold', 'cancelled', 'refunded')),
-                        hold_reason TEXT,
-                        
-                        -- GST Invoice
-                        is_gst_invoice BOOLEAN DEFAULT 0,
-                        gst_invoice_number VARCHAR(100),
-                        
-                        -- Cashier Info
-                        cashier_id INTEGER NOT NULL,
-                        cashier_name VARCHAR(100) NOT NULL,
-                        
-                        -- Notes
-                        notes TEXT,
-                        
-                        -- Printing
-                        printed_count INTEGER DEFAULT 0,
-                        last_printed TIMESTAMP,
-                        
-                        -- Audit
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        
-                        FOREIGN KEY (customer_id) REFERENCES customers(id),
-                        FOREIGN KEY (cashier_id) REFERENCES users(id)
-                    )
-                    ''')
-                    
-                    # 13. SALE ITEMS
-                    cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS sale_items (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        sale_id INTEGER NOT NULL,
-                        product_id INTEGER NOT NULL,
-                        variant_id INTEGER,
-                        product_code VARCHAR(50) NOT NULL,
-                        product_name VARCHAR(200) NOT NULL,
-                        barcode VARCHAR(100),
-                        
-                        -- Quantity & Price
-                        quantity DECIMAL(15,3) NOT NULL,
-                        unit_price DECIMAL(15,2) NOT NULL,
-                        cost_price DECIMAL(15,2) NOT NULL,
-                        
-                        -- Discounts (Bargain)
-                        discount_percent DECIMAL(5,2) DEFAULT 0,
-                        discount_amount DECIMAL(15,2) DEFAULT 0,
-                        
-                        -- Tax
-                        gst_rate DECIMAL(5,2) DEFAULT 17.0,
-                        gst_amount DECIMAL(15,2) DEFAULT 0,
-                        
-                        -- Totals
-                        line_total DECIMAL(15,2) NOT NULL,
-                        line_profit DECIMAL(15,2) NOT NULL,
-                        
-                        -- Serial Numbers
-                        serial_numbers TEXT, -- JSON array
-                        
-                        -- Return Info
-                        returned_quantity DECIMAL(15,3) DEFAULT 0,
-                        return_reason TEXT,
-                        
-                        -- Audit
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        
-                        FOREIGN KEY (sale_id) REFERENCES sales(id) ON DELETE CASCADE,
-                        FOREIGN KEY (product_id) REFERENCES products(id),
-                        FOREIGN KEY (variant_id) REFERENCES product_variants(id)
-                    )
-                    ''')
-                    
-                    # 14. PAYMENTS (For mixed payments)
-                    cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS payments (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        sale_id INTEGER NOT NULL,
-                        payment_method VARCHAR(50) NOT NULL,
-                        amount DECIMAL(15,2) NOT NULL,
-                        
-                        -- Cash Details
-                        cash_received DECIMAL(15,2),
-                        cash_returned DECIMAL(15,2),
-                        
-                        -- Card Details
-                        card_last4 VARCHAR(4),
-                        card_type VARCHAR(20),
-                        bank_name VARCHAR(100),
-                        
-                        -- Cheque Details
-                        cheque_number VARCHAR(100),
-                        cheque_date DATE,
-                        bank_name_cheque VARCHAR(100),
-                        
-                        -- Bank Transfer
-                        transaction_id VARCHAR(100),
-                        bank_name_transfer VARCHAR(100),
-                        
-                        -- Status
-                        payment_status VARCHAR(20) DEFAULT 'completed',
-                        payment_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        notes TEXT,
-                        
-                        FOREIGN KEY (sale_id) REFERENCES sales(id) ON DELETE CASCADE
-                    )
-                    ''')
-                    
-                    # 14b. SALE_PAYMENTS (allocations of customer payments to sales)
-                    cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS sale_payments (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        sale_id INTEGER NOT NULL,
-                        customer_payment_id INTEGER NOT NULL,
-                        amount DECIMAL(15,2) NOT NULL,
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        FOREIGN KEY (sale_id) REFERENCES sales(id) ON DELETE CASCADE,
-                        FOREIGN KEY (customer_payment_id) REFERENCES customer_payments(id) ON DELETE CASCADE
-                    )
-                    ''')
-                    
-                    # 15. GST INVOICES (FBR Compliance)
-                    cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS gst_invoices (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        sale_id INTEGER NOT NULL,
-                        invoice_number VARCHAR(100) UNIQUE NOT NULL,
-                        gst_number VARCHAR(100),
-                        ntn_number VARCHAR(100),
-                        buyer_name VARCHAR(200),
-                        buyer_ntn VARCHAR(100),
-                        buyer_cnic VARCHAR(13),
-                        buyer_address TEXT,
-                        buyer_phone VARCHAR(20),
-                        invoice_date DATE NOT NULL,
-                        taxable_amount DECIMAL(15,2) NOT NULL,
-                        gst_amount DECIMAL(15,2) NOT NULL,
-                        total_amount DECIMAL(15,2) NOT NULL,
-                        is_filed BOOLEAN DEFAULT 0,
-                        filed_date DATE,
-                        qr_code_path VARCHAR(500),
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        FOREIGN KEY (sale_id) REFERENCES sales(id)
-                    )
-                    ''')
-                    
-                    # 16. CREDIT SALES (Udhaar System)
-                    cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS credit_sales (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        sale_id INTEGER NOT NULL,
-                        customer_id INTEGER NOT NULL,
-                        total_amount DECIMAL(15,2) NOT NULL,
-                        paid_amount DECIMAL(15,2) DEFAULT 0,
-                        remaining_amount DECIMAL(15,2) NOT NULL,
-                        due_date DATE NOT NULL,
-                        installment_count INTEGER DEFAULT 1,
-                        installment_amount DECIMAL(15,2),
-                        next_payment_date DATE,
-                        status VARCHAR(20) DEFAULT 'pending' CHECK(status IN ('pending', 'active', 'completed', 'overdue')),
-                        notes TEXT,
-                        created_by INTEGER NOT NULL,
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        FOREIGN KEY (sale_id) REFERENCES sales(id),
-                        FOREIGN KEY (customer_id) REFERENCES customers(id),
-                        FOREIGN KEY (created_by) REFERENCES users(id)
-                    )
-                    ''')
-                    
-                    # 17. CREDIT PAYMENTS
-                    cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS credit_payments (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        credit_sale_id INTEGER NOT NULL,
-                        amount DECIMAL(15,2) NOT NULL,
-                        payment_date DATE NOT NULL,
-                        payment_method VARCHAR(50),
-                        reference_number VARCHAR(100),
-                        collected_by INTEGER NOT NULL,
-                        notes TEXT,
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        FOREIGN KEY (credit_sale_id) REFERENCES credit_sales(id),
-                        FOREIGN KEY (collected_by) REFERENCES users(id)
-                    )
-                    ''')
-                    
-                    # 18. SUPPLIERS
-                    cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS suppliers (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        supplier_code VARCHAR(50) UNIQUE NOT NULL,
-                        company_name VARCHAR(200) NOT NULL,
-                        contact_person VARCHAR(100),
-                        phone VARCHAR(20),
-                        mobile VARCHAR(20),
-                        email VARCHAR(100),
-                        address TEXT,
-                        city VARCHAR(50),
-                        ntn_number VARCHAR(100),
-                        strn_number VARCHAR(100),
-                        payment_terms TEXT,
-                        credit_limit DECIMAL(15,2) DEFAULT 0,
-                        current_balance DECIMAL(15,2) DEFAULT 0,
-                        is_active BOOLEAN DEFAULT 1,
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                    )
-                    ''')
-                    
-                    # 19. PURCHASES
-                    cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS purchases (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        purchase_number VARCHAR(50) UNIQUE NOT NULL,
-                        purchase_date DATE NOT NULL,
-                        supplier_id INTEGER NOT NULL,
-                        total_items INTEGER DEFAULT 0,
-                        subtotal DECIMAL(15,2) DEFAULT 0,
-                        total_tax DECIMAL(15,2) DEFAULT 0,
-                        shipping_cost DECIMAL(15,2) DEFAULT 0,
-                        other_charges DECIMAL(15,2) DEFAULT 0,
-                        total_amount DECIMAL(15,2) NOT NULL,
-                        amount_paid DECIMAL(15,2) DEFAULT 0,
-                        balance_due DECIMAL(15,2) DEFAULT 0,
-                        payment_status VARCHAR(20) DEFAULT 'pending',
-                        received_by INTEGER,
-                        notes TEXT,
-                        created_by INTEGER NOT NULL,
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        FOREIGN KEY (supplier_id) REFERENCES suppliers(id),
-                        FOREIGN KEY (received_by) REFERENCES users(id),
-                        FOREIGN KEY (created_by) REFERENCES users(id)
-                    )
-                    ''')
-                    
-                    # 20. PURCHASE ITEMS
-                    cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS purchase_items (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        purchase_id INTEGER NOT NULL,
-                        product_id INTEGER NOT NULL,
-                        quantity DECIMAL(15,3) NOT NULL,
-                        unit_cost DECIMAL(15,2) NOT NULL,
-                        total_cost DECIMAL(15,2) NOT NULL,
-                        gst_rate DECIMAL(5,2) DEFAULT 17.0,
-                        gst_amount DECIMAL(15,2) DEFAULT 0,
-                        expiry_date DATE,
-                        batch_number VARCHAR(100),
-                        received_quantity DECIMAL(15,3) DEFAULT 0,
-                        notes TEXT,
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        FOREIGN KEY (purchase_id) REFERENCES purchases(id) ON DELETE CASCADE,
-                        FOREIGN KEY (product_id) REFERENCES products(id)
-                    )
-                    ''')
-                    
-                    # 21. STOCK MOVEMENTS
-                    cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS stock_movements (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        product_id INTEGER NOT NULL,
-                        movement_type VARCHAR(20) NOT NULL CHECK(movement_type IN ('purchase', 'sale', 'return', 'adjustment', 'damage', 'transfer', 'production')),
-                        quantity DECIMAL(15,3) NOT NULL,
-                        previous_quantity DECIMAL(15,3) NOT NULL,
-                        new_quantity DECIMAL(15,3) NOT NULL,
-                        unit_cost DECIMAL(15,2),
-                        total_cost DECIMAL(15,2),
-                        reference_id INTEGER,
-                        reference_type VARCHAR(50),
-                        reason TEXT,
-                        notes TEXT,
-                        created_by INTEGER NOT NULL,
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        FOREIGN KEY (product_id) REFERENCES products(id),
-                        FOREIGN KEY (created_by) REFERENCES users(id)
-                    )
-                    ''')
-                    
-                    # 22. INVENTORY LOCATIONS
-                    cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS inventory_locations (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        location_code VARCHAR(50) UNIQUE NOT NULL,
-                        location_name VARCHAR(100) NOT NULL,
-                        parent_location_id INTEGER,
-                        location_type VARCHAR(50) CHECK(location_type IN ('shelf', 'rack', 'room', 'warehouse')),
-                        capacity INTEGER,
-                        notes TEXT,
-                        is_active BOOLEAN DEFAULT 1,
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        FOREIGN KEY (parent_location_id) REFERENCES inventory_locations(id)
-                    )
-                    ''')
-                    
-                    # 23. PRODUCT LOCATIONS
-                    cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS product_locations (
-                        product_id INTEGER NOT NULL,
-                        location_id INTEGER NOT NULL,
-                        quantity DECIMAL(15,3) NOT NULL DEFAULT 0,
-                        reorder_level DECIMAL(15,3) DEFAULT 0,
-                        last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        PRIMARY KEY (product_id, location_id),
-                        FOREIGN KEY (product_id) REFERENCES products(id),
-                        FOREIGN KEY (location_id) REFERENCES inventory_locations(id)
-                    )
-                    ''')
-                    
-                    # 24. EXPENSES (Daily shop expenses)
-                    cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS expenses (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        expense_number VARCHAR(50) UNIQUE NOT NULL,
-                        expense_date DATE NOT NULL,
-                        category VARCHAR(100) NOT NULL,
-                        subcategory VARCHAR(100),
-                        amount DECIMAL(15,2) NOT NULL,
-                        payment_method VARCHAR(50),
-                        paid_to VARCHAR(200),
-                        reference_number VARCHAR(100),
-                        description TEXT,
-                        receipt_image VARCHAR(500),
-                        approved_by INTEGER,
-                        approved_at TIMESTAMP,
-                        created_by INTEGER NOT NULL,
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        FOREIGN KEY (approved_by) REFERENCES users(id),
-                        FOREIGN KEY (created_by) REFERENCES users(id)
-                    )
-                    ''')
-                    
-                    # 25. CASH REGISTER (Daily opening/closing)
-                    cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS cash_register (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        opening_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        closing_time TIMESTAMP,
-                        opening_balance DECIMAL(15,2) NOT NULL,
-                        closing_balance DECIMAL(15,2),
-                        expected_cash DECIMAL(15,2),
-                        actual_cash DECIMAL(15,2),
-                        cash_difference DECIMAL(15,2),
-                        user_id INTEGER NOT NULL,
-                        status VARCHAR(20) DEFAULT 'open' CHECK(status IN ('open', 'closed')),
-                        notes TEXT,
-                        FOREIGN KEY (user_id) REFERENCES users(id)
-                    )
-                    ''')
-                    
-                    # 26. CASH TRANSACTIONS
-                    cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS cash_transactions (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        register_id INTEGER NOT NULL,
-                        transaction_type VARCHAR(20) CHECK(transaction_type IN ('sale', 'expense', 'deposit', 'withdrawal')),
-                        amount DECIMAL(15,2) NOT NULL,
-                        reference_id INTEGER,
-                        reference_type VARCHAR(50),
-                        description TEXT,
-                        created_by INTEGER NOT NULL,
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        FOREIGN KEY (register_id) REFERENCES cash_register(id),
-                        FOREIGN KEY (created_by) REFERENCES users(id)
-                    )
-                    ''')
-                    
-                    # 27. BANK DEPOSITS
-                    cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS bank_deposits (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        deposit_date DATE NOT NULL,
-                        bank_name VARCHAR(100),
-                        account_number VARCHAR(100),
-                        amount DECIMAL(15,2) NOT NULL,
-                        deposit_slip_number VARCHAR(100),
-                        deposited_by INTEGER NOT NULL,
-                        verified_by INTEGER,
-                        notes TEXT,
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        FOREIGN KEY (deposited_by) REFERENCES users(id),
-                        FOREIGN KEY (verified_by) REFERENCES users(id)
-                    )
-                    ''')
-                    
-                    # 28. COMMISSIONS (Bhatta System)
-                    cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS commissions (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        user_id INTEGER NOT NULL,
-                        sale_id INTEGER NOT NULL,
-                        commission_type VARCHAR(20) CHECK(commission_type IN ('percentage', 'fixed')),
-                        commission_rate DECIMAL(5,2),
-                        commission_amount DECIMAL(15,2) NOT NULL,
-                        calculation_base DECIMAL(15,2),
-                        status VARCHAR(20) DEFAULT 'pending' CHECK(status IN ('pending', 'approved', 'paid')),
-                        paid_date DATE,
-                        notes TEXT,
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        FOREIGN KEY (user_id) REFERENCES users(id),
-                        FOREIGN KEY (sale_id) REFERENCES sales(id)
-                    )
-                    ''')
-                    
-                    # 29. WARRANTY CLAIMS
-                    cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS warranty_claims (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        sale_item_id INTEGER NOT NULL,
-                        claim_date DATE NOT NULL,
-                        issue_description TEXT,
-                        resolution TEXT,
-                        replacement_product_id INTEGER,
-                        claim_status VARCHAR(20) DEFAULT 'pending' CHECK(claim_status IN ('pending', 'approved', 'rejected', 'completed')),
-                        approved_by INTEGER,
-                        approved_at TIMESTAMP,
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        FOREIGN KEY (sale_item_id) REFERENCES sale_items(id),
-                        FOREIGN KEY (replacement_product_id) REFERENCES products(id),
-                        FOREIGN KEY (approved_by) REFERENCES users(id)
-                    )
-                    ''')
-                    
-                    # 30. LOYALTY PROGRAMS
-                    cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS loyalty_programs (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        program_name VARCHAR(100) NOT NULL,
-                        points_per_amount DECIMAL(10,2) DEFAULT 1,
-                        redemption_rate DECIMAL(10,2) DEFAULT 100,
-                        minimum_redemption_points INTEGER DEFAULT 100,
-                        start_date DATE NOT NULL,
-                        end_date DATE,
-                        is_active BOOLEAN DEFAULT 1,
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                    )
-                    ''')
-                    
-                    # 31. CUSTOMER LOYALTY
-                    cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS customer_loyalty (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        customer_id INTEGER NOT NULL,
-                        program_id INTEGER NOT NULL,
-                        total_points_earned INTEGER DEFAULT 0,
-                        points_redeemed INTEGER DEFAULT 0,
-                        current_points INTEGER DEFAULT 0,
-                        last_activity_date DATE,
-                        membership_level VARCHAR(50) DEFAULT 'regular',
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        UNIQUE(customer_id, program_id),
-                        FOREIGN KEY (customer_id) REFERENCES customers(id),
-                        FOREIGN KEY (program_id) REFERENCES loyalty_programs(id)
-                    )
-                    ''')
-                    
-                    # 32. AUDIT LOG
-                    cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS audit_log (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        user_id INTEGER,
-                        username VARCHAR(100),
-                        action VARCHAR(100) NOT NULL,
-                        table_name VARCHAR(100),
-                        record_id INTEGER,
-                        old_values TEXT,
-                        new_values TEXT,
-                        ip_address VARCHAR(45),
-                        user_agent TEXT,
-                        timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        FOREIGN KEY (user_id) REFERENCES users(id)
-                    )
-                    ''')
-                    
-                    # 33. USER SESSIONS
-                    cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS user_sessions (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        user_id INTEGER NOT NULL,
-                        session_token VARCHAR(255) UNIQUE NOT NULL,
-                        device_info TEXT,
-                        ip_address VARCHAR(45),
-                        login_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        last_activity TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        expiry_time TIMESTAMP NOT NULL,
-                        is_active BOOLEAN DEFAULT 1,
-                        FOREIGN KEY (user_id) REFERENCES users(id)
-                    )
-                    ''')
-                    
-                    # 34. BACKUP HISTORY
-                    cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS backup_history (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        backup_type VARCHAR(50) NOT NULL,
-                        file_path VARCHAR(500) NOT NULL,
-                        file_size INTEGER,
-                        record_count INTEGER,
-                        status VARCHAR(20) NOT NULL,
-                        notes TEXT,
-                        created_by INTEGER,
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        FOREIGN KEY (created_by) REFERENCES users(id)
-                    )
-                    ''')
-                    
-                    # 35. PRINTER CONFIGURATIONS
-                    cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS printer_configurations (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        printer_name VARCHAR(100) NOT NULL,
-                        printer_type VARCHAR(50) CHECK(printer_type IN ('thermal', 'laser', 'dot_matrix')),
-                        connection_type VARCHAR(50) CHECK(connection_type IN ('usb', 'network', 'bluetooth')),
-                        connection_string VARCHAR(500),
-                        paper_width INTEGER DEFAULT 80,
-                        char_per_line INTEGER DEFAULT 42,
-                        is_default BOOLEAN DEFAULT 0,
-                        is_active BOOLEAN DEFAULT 1,
-                        print_logo BOOLEAN DEFAULT 1,
-                        print_header BOOLEAN DEFAULT 1,
-                        print_footer BOOLEAN DEFAULT 1,
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                    )
-                    ''')
-                    
-                    # 36. SHOP_BRANCHES (Future expansion)
-                    cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS shop_branches (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        branch_code VARCHAR(50) UNIQUE NOT NULL,
-                        branch_name VARCHAR(200) NOT NULL,
-                        address TEXT NOT NULL,
-                        city VARCHAR(50) NOT NULL,
-                        phone VARCHAR(20),
-                        email VARCHAR(100),
-                        manager_id INTEGER,
-                        opening_time TIME,
-                        closing_time TIME,
-                        is_active BOOLEAN DEFAULT 1,
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        FOREIGN KEY (manager_id) REFERENCES users(id)
-                    )
-                    ''')
-                    
-                    # 37. DAILY_SUMMARY (For quick reports)
-                    cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS daily_summary (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        summary_date DATE NOT NULL,
-                        total_sales DECIMAL(15,2) DEFAULT 0,
-                        total_purchases DECIMAL(15,2) DEFAULT 0,
-                        total_expenses DECIMAL(15,2) DEFAULT 0,
-                        total_cash DECIMAL(15,2) DEFAULT 0,
-                        total_card DECIMAL(15,2) DEFAULT 0,
-                        total_credit DECIMAL(15,2) DEFAULT 0,
-                        customer_count INTEGER DEFAULT 0,
-                        invoice_count INTEGER DEFAULT 0,
-                        profit_amount DECIMAL(15,2) DEFAULT 0,
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        UNIQUE(summary_date)
-                    )
-                    ''')
-                    
-                    # 38. DATA_SYNC_LOG
-                    cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS data_sync_log (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        sync_type VARCHAR(50) CHECK(sync_type IN ('backup', 'restore', 'export', 'import')),
-                        file_path VARCHAR(500),
-                        file_size INTEGER,
-                        record_count INTEGER,
-                        status VARCHAR(20) CHECK(status IN ('success', 'failed', 'in_progress')),
-                        error_message TEXT,
-                        performed_by INTEGER,
-                        performed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        FOREIGN KEY (performed_by) REFERENCES users(id)
-                    )
-                    ''')
-                    
-                    # 39. USER_ACTIVITY_LOG
-                    cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS user_activity_log (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        user_id INTEGER NOT NULL,
-                        activity_type VARCHAR(100) NOT NULL,
-                        module VARCHAR(50),
-                        action_details TEXT,
-                        ip_address VARCHAR(45),
-                        user_agent TEXT,
-                        timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        FOREIGN KEY (user_id) REFERENCES users(id)
-                    )
-                    ''')
-                    
-                    # 40. NOTIFICATIONS
-                    cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS notifications (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        user_id INTEGER NOT NULL,
-                        notification_type VARCHAR(50) NOT NULL,
-                        title VARCHAR(200) NOT NULL,
-                        message TEXT NOT NULL,
-                        is_read BOOLEAN DEFAULT 0,
-                        action_url VARCHAR(500),
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        read_at TIMESTAMP,
-                        FOREIGN KEY (user_id) REFERENCES users(id)
-                    )
-                    ''')
-                    
-                    # 41. CUSTOMER PAYMENTS (Credit payments)
-                    cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS customer_payments (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        customer_id INTEGER NOT NULL,
-                        amount DECIMAL(15,2) NOT NULL,
-                        payment_method VARCHAR(50) CHECK(payment_method IN ('cash', 'card', 'cheque', 'bank_transfer', 'credit', 'mobile_payment')),
-                        payment_type VARCHAR(50) DEFAULT 'credit_payment' CHECK(payment_type IN ('credit_payment', 'advance_payment', 'installment_payment')),
-                        payment_date DATE NOT NULL,
-                        received_by INTEGER NOT NULL,
-                        notes TEXT,
-                        receipt_number VARCHAR(50),
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        FOREIGN KEY (customer_id) REFERENCES customers(id),
-                        FOREIGN KEY (received_by) REFERENCES users(id)
-                    )
-                    ''')
-                    
-                    # ==================== CREATE INDEXES FOR PERFORMANCE ====================
-                    
-                    logger.info("Creating indexes for performance...")
-                    
-                    # Sales indexes
-                    cursor.execute("CREATE INDEX IF NOT EXISTS idx_sales_date ON sales(invoice_date)")
-                    cursor.execute("CREATE INDEX IF NOT EXISTS idx_sales_customer ON sales(customer_id)")
-                    cursor.execute("CREATE INDEX IF NOT EXISTS idx_sales_cashier ON sales(cashier_id)")
-                    cursor.execute("CREATE INDEX IF NOT EXISTS idx_sales_status ON sales(sale_status)")
-                    cursor.execute("CREATE INDEX IF NOT EXISTS idx_sales_payment ON sales(payment_status)")
-                    
-                    # Sale items indexes
-                    cursor.execute("CREATE INDEX IF NOT EXISTS idx_sale_items_sale ON sale_items(sale_id)")
-                    cursor.execute("CREATE INDEX IF NOT EXISTS idx_sale_items_product ON sale_items(product_id)")
-                    
-                    # Product indexes
-                    cursor.execute("CREATE INDEX IF NOT EXISTS idx_products_category ON products(category_id)")
-                    cursor.execute("CREATE INDEX IF NOT EXISTS idx_products_code ON products(product_code)")
-                    cursor.execute("CREATE INDEX IF NOT EXISTS idx_products_barcode ON products(barcode)")
-                    cursor.execute("CREATE INDEX IF NOT EXISTS idx_products_active ON products(is_active)")
-                    cursor.execute("CREATE INDEX IF NOT EXISTS idx_products_stock ON products(current_stock)")
-                    
-                    # Customer indexes
-                    cursor.execute("CREATE INDEX IF NOT EXISTS idx_customers_phone ON customers(phone)")
-                    cursor.execute("CREATE INDEX IF NOT EXISTS idx_customers_cnic ON customers(cnic)")
-                    cursor.execute("CREATE INDEX IF NOT EXISTS idx_customers_type ON customers(customer_type)")
+                    # ==================== CREATE ALL TABLES AND INDEXES ====================
                     
-                    # Customer payments indexes
-                    cursor.execute("CREATE INDEX IF NOT EXISTS idx_customer_payments_customer ON customer_payments(customer_id)")
-                    cursor.execute("CREATE INDEX IF NOT EXISTS idx_customer_payments_date ON customer_payments(payment_date)")
-                    cursor.execute("CREATE INDEX IF NOT EXISTS idx_customer_payments_method ON customer_payments(payment_method)")
-                    cursor.execute("CREATE INDEX IF NOT EXISTS idx_customer_payments_received_by ON customer_payments(received_by)")
-                    
-                    # Stock movements indexes
-                    cursor.execute("CREATE INDEX IF NOT EXISTS idx_stock_movements_product ON stock_movements(product_id)")
-                    cursor.execute("CREATE INDEX IF NOT EXISTS idx_stock_movements_date ON stock_movements(created_at)")
-                    cursor.execute("CREATE INDEX IF NOT EXISTS idx_stock_movements_type ON stock_movements(movement_type)")
-                    
-                    # Credit sales indexes
-                    cursor.execute("CREATE INDEX IF NOT EXISTS idx_credit_sales_customer ON credit_sales(customer_id)")
-                    cursor.execute("CREATE INDEX IF NOT EXISTS idx_credit_sales_status ON credit_sales(status)")
-                    cursor.execute("CREATE INDEX IF NOT EXISTS idx_credit_sales_due ON credit_sales(due_date)")
-                    
-                    # GST invoices indexes
-                    cursor.execute("CREATE INDEX IF NOT EXISTS idx_gst_invoices_date ON gst_invoices(invoice_date)")
-                    cursor.execute("CREATE INDEX IF NOT EXISTS idx_gst_invoices_sale ON gst_invoices(sale_id)")
-                    
-                    # User indexes
-                    cursor.execute("CREATE INDEX IF NOT EXISTS idx_users_username ON users(username)")
-                    cursor.execute("CREATE INDEX IF NOT EXISTS idx_users_role ON users(role)")
-                    cursor.execute("CREATE INDEX IF NOT EXISTS idx_users_status ON users(status)")
+                    # Warm start: skip parsing the DDL if this exact schema is applied
+                    try:
+                        cursor.execute("SELECT hash FROM _schema_meta LIMIT 1")
+                        row = cursor.fetchone()
+                    except sqlite3.OperationalError:
+                        row = None  # _schema_meta not created yet
+                    
+                    schema_current = row is not None and row[0] == SCHEMA_HASH
+                    if schema_current:
+                        logger.info("Schema is up to date")
+                    else:
+                        # Only what sqlite_master lacks: tables now, indexes after
+                        # the seed rows. BEGIN opens the init transaction, which
+                        # stays open for the seeds and indexes.
+                        existing = existing_objects(cursor)
+                        if not existing:
+                            # New file: switch to incremental auto_vacuum so
+                            # optimize_database can free pages without a full
+                            # VACUUM. The WAL header is already written, so the
+                            # switch takes an (instant, empty) VACUUM
+                            cursor.execute("PRAGMA auto_vacuum = INCREMENTAL")
+                            cursor.execute("VACUUM")
+                        cursor.executescript(
+                            "BEGIN;\n"
+                            + "".join(f"{ddl};\n" for ddl in pending_statements(TABLE_DDL, existing))
+                            + f"{SCHEMA_META_DDL};"
+                        )
                     
                     # ==================== INSERT DEFAULT DATA ====================
                     
                     logger.info("Inserting default data...")
                     
-                    # Insert default admin user (username: admin, password: admin123)
-                    cursor.execute("SELECT COUNT(*) FROM users WHERE username = 'admin'")
-                    if cursor.fetchone()[0] == 0:
-                        # Use proper password hashing with salt (format: sha256$salt$hash)
-                        salt = secrets.token_hex(16)
-                        password = 'admin123'
-                        hash_obj = hashlib.sha256(f"{password}{salt}".encode())
-                        password_hash = f"sha256${salt}${hash_obj.hexdigest()}"
-                        cursor.execute('''
-                            INSERT INTO users (username, password_hash, full_name, role, permissions)
-                            VALUES (?, ?, ?, ?, ?)
-                        ''', (
-                            'admin',
-                            password_hash,
-                            'System Administrator',
-                            'malik',
-                            json.dumps({'all': True})
-                        ))
-                    
-                    # Insert default shop settings
-                    cursor.execute("SELECT COUNT(*) FROM shop_settings")
-                    if cursor.fetchone()[0] == 0:
-                        cursor.execute('''
-                            INSERT INTO shop_settings (shop_name, shop_address, shop_city, shop_phone)
-                            VALUES (?, ?, ?, ?)
-                        ''', (
-                            'Auto Accessories & Car Decoration Shop',
-                            'Main Market, Lahore',
-                            'Lahore',
-                            '+92 300 1234567'
-                        ))
+                    # Insert default admin user (username: admin, password: admin123).
+                    # The row goes in with an empty hash; the deliberately slow
+                    # password hash only runs if the insert was not ignored.
+                    cursor.execute('''
+                        INSERT OR IGNORE INTO users (username, password_hash, full_name, role, permissions)
+                        VALUES (?, '', ?, ?, ?)
+                    ''', (
+                        'admin',
+                        'System Administrator',
+                        'malik',
+                        json.dumps({'all': True})
+                    ))
+                    if cursor.rowcount == 1:
+                        password_hash, _ = self.hash_password('admin123')
+                        cursor.execute(
+                            "UPDATE users SET password_hash = ? WHERE id = ?",
+                            (password_hash, cursor.lastrowid)
+                        )
+                    
+                    # Insert default shop settings (single row, only if the table is empty)
+                    cursor.execute('''
+                        INSERT INTO shop_settings (shop_name, shop_address, shop_city, shop_phone)
+                        SELECT ?, ?, ?, ?
+                        WHERE NOT EXISTS (SELECT 1 FROM shop_settings)
+                    ''', (
+                        'Auto Accessories & Car Decoration Shop',
+                        'Main Market, Lahore',
+                        'Lahore',
+                        '+92 300 1234567'
+                    ))
                     
                     # Insert default price groups (Gola System)
                     default_groups = [
@@ -1266,11 +837,10 @@ class DatabaseManager:
                         ('CORPORATE', 'Corporate Clients', 'Price for corporate clients', 5, 0)
                     ]
                     
-                    for group in default_groups:
-                        cursor.execute('''
-                            INSERT OR IGNORE INTO price_groups (group_code, group_name, description, discount_percent, is_default)
-                            VALUES (?, ?, ?, ?, ?)
-                        ''', group)
+                    cursor.executemany('''
+                        INSERT OR IGNORE INTO price_groups (group_code, group_name, description, discount_percent, is_default)
+                        VALUES (?, ?, ?, ?, ?)
+                    ''', default_groups)
                     
                     # Insert default categories for auto accessories
                     default_categories = [
@@ -1288,11 +858,10 @@ class DatabaseManager:
                         (None, 'ACC', 'Accessories', 'General accessories', 12),
                     ]
                     
-                    for cat in default_categories:
-                        cursor.execute('''
-                            INSERT OR IGNORE INTO categories (parent_id, category_code, name, description, display_order)
-                            VALUES (?, ?, ?, ?, ?)
-                        ''', cat)
+                    cursor.executemany('''
+                        INSERT OR IGNORE INTO categories (parent_id, category_code, name, description, display_order)
+                        VALUES (?, ?, ?, ?, ?)
+                    ''', default_categories)
                     
                     # Insert default expense categories
                     default_expense_categories = ['Rent', 'Electricity', 'Water', 'Internet', 'Salary', 
@@ -1305,17 +874,148 @@ class DatabaseManager:
                         VALUES (?)
                     ''', (today,))
                     
+                    # Indexes last, so the seed rows are not indexed row by row.
+                    # Executed one by one: executescript would COMMIT the init
+                    # transaction before running.
+                    if not schema_current:
+                        for statement in pending_statements(INDEX_DDL + BACKFILL_SQL, existing):
+                            cursor.execute(statement)
+                        cursor.execute("DELETE FROM _schema_meta")
+                        cursor.execute("INSERT INTO _schema_meta (hash) VALUES (?)", (SCHEMA_HASH,))
+                    
+                    # Planner statistics: full ANALYZE the first time, then
+                    # let PRAGMA optimize refresh only what has drifted
+                    cursor.execute("SELECT EXISTS(SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1')")
+                    cursor.execute("PRAGMA optimize" if cursor.fetchone()[0] else "ANALYZE")
+                    
                     logger.info("Database initialization completed successfully!")
                     self.initialized = True
+                    self.initialized_event.set()
+                
+                self._start_maintenance()
                     
             except Exception as e:
                 logger.error(f"Failed to initialize database: {e}")
                 raise
     
+    def archive_audit_log(self, keep_months: Optional[int] = None) -> int:
+        """
+        Move old audit_log rows into per-month archive files.
+        
+        Each month is copied into database/archive/audit_YYYYMM.db through
+        ATTACH and committed before anything is deleted from the main
+        database, so an interrupted run only leaves rows to copy again.
+        The newest row always stays, so rowids are never reused.
+        
+        Args:
+            keep_months: Whole months to keep in the main database
+            
+        Returns:
+            Number of rows removed from the main audit_log
+        """
+        if keep_months is None:
+            keep_months = self.audit_keep_months
+        
+        today = datetime.now().date()
+        year, month = divmod(today.year * 12 + today.month - 1 - keep_months, 12)
+        cutoff = f"{year:04d}-{month + 1:02d}-01"
+        
+        conn = self.get_connection()
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+            
+            max_id = conn.execute("SELECT MAX(id) FROM audit_log").fetchone()[0]
+            if max_id is None:
+                return 0
+            
+            months = [
+                row[0] for row in conn.execute(
+                    "SELECT DISTINCT strftime('%Y%m', timestamp) FROM audit_log WHERE timestamp < ? AND id < ?",
+                    (cutoff, max_id)
+                )
+            ]
+            if not months:
+                return 0
+            
+            self.audit_archive_dir.mkdir(parents=True, exist_ok=True)
+            for archive_month in months:
+                conn.execute("ATTACH DATABASE ? AS archive", (str(self.audit_archive_dir / f"audit_{archive_month}.db"),))
+                try:
+                    conn.execute(AUDIT_ARCHIVE_DDL)
+                    conn.execute(
+                        f"INSERT OR IGNORE INTO archive.audit_log ({AUDIT_COLUMNS}) "
+                        f"SELECT {AUDIT_COLUMNS} FROM main.audit_log "
+                        "WHERE timestamp < ? AND id < ? AND strftime('%Y%m', timestamp) = ?",
+                        (cutoff, max_id, archive_month)
+                    )
+                    conn.commit()
+                except Exception:
+                    conn.rollback()  # DETACH is not allowed inside a transaction
+                    raise
+                finally:
+                    conn.execute("DETACH DATABASE archive")
+            
+            deleted = conn.execute(
+                "DELETE FROM audit_log WHERE timestamp < ? AND id < ?",
+                (cutoff, max_id)
+            ).rowcount
+            conn.commit()
+            
+            logger.info(f"Archived {deleted} audit log rows older than {cutoff}")
+            return deleted
+            
+        except Exception:
+            if conn.in_transaction:
+                conn.rollback()
+            raise
+        finally:
+            self.return_connection(conn)
+    
+    def _log_backup(self, backup_type: str, file_path: str, file_size: Optional[int], notes: str):
+        """Record a successful backup/restore in backup_history (one autocommitted row)."""
+        conn = self.get_connection()
+        try:
+            with conn:
+                conn.execute(BACKUP_HISTORY_SQL, (backup_type, file_path, file_size, notes))
+        finally:
+            self.return_connection(conn)
+    
+    @staticmethod
+    def _copy_audit_archives(src_dir: Path, dst_dir: Path):
+        """
+        Copy every audit_YYYYMM.db from src_dir into the existing dst_dir.
+        
+        Goes through the backup API so a file archive_audit_log is writing
+        to is copied as a consistent snapshot.
+        """
+        if not src_dir.is_dir():
+            return
+        
+        for archive_file in sorted(src_dir.glob('audit_*.db')):
+            source = sqlite3.connect(f"{archive_file.resolve().as_uri()}?mode=ro", uri=True)
+            try:
+                target = sqlite3.connect(str(dst_dir / archive_file.name))
+                try:
+                    source.backup(target)
+                finally:
+                    target.close()
+            finally:
+                source.close()
+    
+    @staticmethod
+    def _backup_audit_dir(backup_file: Path) -> Path:
+        """Directory holding the audit archives taken with backup_file."""
+        return backup_file.with_name(f"{backup_file.stem}_audit")
+    
     def backup_database(self, backup_name: Optional[str] = None) -> str:
         """
         Create a backup of the database.
         
+        Audit rows already moved out by archive_audit_log are copied too,
+        into a <backup name>_audit directory next to the backup file
+        (created even when there is nothing archived yet).
+        
         Args:
             backup_name: Custom backup name (optional)
             
@@ -1333,27 +1033,34 @@ class DatabaseManager:
                 timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
                 backup_file = self.backup_dir / f"backup_{timestamp}.db"
             
-            # Close all connections
-            with self.pool_lock:
-                for conn in self.connection_pool:
-                    conn.close()
-                self.connection_pool.clear()
+            # Online backup: copies a consistent snapshot (including WAL
+            # contents) page by page while other connections keep working.
+            # A same-named backup is replaced, not written into: it may be
+            # in WAL mode with another page size, which backup() can't change
+            backup_file.unlink(missing_ok=True)
+            source = self.create_new_connection(readonly=True)
+            try:
+                target = sqlite3.connect(str(backup_file))
+                try:
+                    source.backup(target, pages=1024)
+                finally:
+                    target.close()
+            finally:
+                source.close()
             
-            # Copy database file
-            shutil.copy2(self.db_path, backup_file)
+            audit_dir = self._backup_audit_dir(backup_file)
+            if audit_dir.exists():
+                shutil.rmtree(audit_dir)
+            audit_dir.mkdir()
+            self._copy_audit_archives(self.audit_archive_dir, audit_dir)
             
             # Log backup
-            with self.get_cursor() as cursor:
-                cursor.execute('''
-                    INSERT INTO backup_history (backup_type, file_path, file_size, status, notes)
-                    VALUES (?, ?, ?, ?, ?)
-                ''', (
-                    'manual' if backup_name else 'auto',
-                    str(backup_file),
-                    backup_file.stat().st_size,
-                    'success',
-                    'Database backup'
-                ))
+            self._log_backup(
+                'manual' if backup_name else 'auto',
+                str(backup_file),
+                backup_file.stat().st_size,
+                'Database backup'
+            )
             
             logger.info(f"Backup created: {backup_file}")
             return str(backup_file)
@@ -1362,10 +1069,22 @@ class DatabaseManager:
             logger.error(f"Backup failed: {e}")
             raise
     
+    @staticmethod
+    def _forget_cached_users():
+        """Clear core.auth's login cache if it has been loaded."""
+        # Importing core.auth here would build its AuthenticationManager
+        # (and the default database) just to empty a cache that can't exist
+        auth = sys.modules.get("core.auth")
+        if auth is not None:
+            auth.invalidate_user_cache()
+    
     def restore_database(self, backup_path: str) -> bool:
         """
         Restore database from backup.
         
+        Audit archives saved with the backup replace the live archive
+        directory; backups taken before archives were copied leave it as is.
+        
         Args:
             backup_path: Path to backup file
             
@@ -1377,29 +1096,62 @@ class DatabaseManager:
             if not backup_file.exists():
                 raise FileNotFoundError(f"Backup file not found: {backup_path}")
             
-            # Close all connections
-            with self.pool_lock:
-                for conn in self.connection_pool:
-                    conn.close()
-                self.connection_pool.clear()
-            
             # Create backup of current database
             current_backup = self.backup_database(f"pre_restore_{datetime.now().strftime('%Y%m%d_%H%M%S')}")
             
-            # Restore from backup
-            shutil.copy2(backup_file, self.db_path)
+            # No checkpoint or archiving pass while the files are replaced
+            self._stop_maintenance()
+            try:
+                source = sqlite3.connect(f"{backup_file.resolve().as_uri()}?mode=ro", uri=True)
+                try:
+                    source_page_size = source.execute("PRAGMA page_size").fetchone()[0]
+                    with self.get_cursor(readonly=True) as cursor:
+                        same_page_size = cursor.execute("PRAGMA page_size").fetchone()[0] == source_page_size
+                
+                    if same_page_size:
+                        # Online backup API: pages are written through SQLite into
+                        # the live database, so the pool and thread readers stay
+                        # open and simply see the restored data
+                        target = self.create_new_connection()
+                        try:
+                            source.backup(target, pages=1024)
+                            target.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+                        finally:
+                            target.close()
+                finally:
+                    source.close()
+                
+                if not same_page_size:
+                    # A WAL database can't change page size through the backup
+                    # API (older backups use 4096-byte pages, new files 8192), so
+                    # close every connection and replace the file instead,
+                    # dropping the WAL files that belong to the old one
+                    self.close_all_connections()
+                    for path in (Path(f"{self.db_path}-wal"), Path(f"{self.db_path}-shm")):
+                        if path.exists():
+                            os.remove(path)
+                    fast_copy(backup_file, self.db_path)
+                
+                # Archives written since the backup are in the pre-restore backup
+                audit_dir = self._backup_audit_dir(backup_file)
+                if audit_dir.is_dir():
+                    if self.audit_archive_dir.exists():
+                        shutil.rmtree(self.audit_archive_dir)
+                    self.audit_archive_dir.mkdir(parents=True)
+                    self._copy_audit_archives(audit_dir, self.audit_archive_dir)
+            finally:
+                self._start_maintenance()
+            
+            # Cached logins describe users from the replaced database
+            self._forget_cached_users()
             
             # Log restore
-            with self.get_cursor() as cursor:
-                cursor.execute('''
-                    INSERT INTO backup_history (backup_type, file_path, status, notes)
-                    VALUES (?, ?, ?, ?)
-                ''', (
-                    'restore',
-                    str(backup_file),
-                    'success',
-                    f'Database restored from backup. Previous backup: {current_backup}'
-                ))
+            self._log_backup(
+                'restore',
+                str(backup_file),
+                None,
+                f'Database restored from backup. Previous backup: {current_backup}'
+            )
             
             logger.info(f"Database restored from: {backup_path}")
             return True
@@ -1422,10 +1174,11 @@ class DatabaseManager:
             # 2. Close all connections
             self.close_all_connections()
             
-            # 3. Delete database file
-            if self.db_path.exists():
-                os.remove(self.db_path)
-                logger.info(f"Deleted database file: {self.db_path}")
+            # 3. Delete database file (and its WAL/shared-memory files)
+            for path in (self.db_path, Path(f"{self.db_path}-wal"), Path(f"{self.db_path}-shm")):
+                if path.exists():
+                    os.remove(path)
+                    logger.info(f"Deleted database file: {path}")
                 
             # 4. Reset initialization flag
             self.initialized = False
@@ -1433,17 +1186,11 @@ class DatabaseManager:
             # 5. Re-initialize database (creates tables and default admin/settings)
             self.initialize_database()
             
-            # 6. Log the reset (in the new DB)
-            with self.get_cursor() as cursor:
-                cursor.execute('''
-                    INSERT INTO backup_history (backup_type, file_path, status, notes)
-                    VALUES (?, ?, ?, ?)
-                ''', (
-                    'system',
-                    'N/A',
-                    'success',
-                    'Factory Reset performed'
-                ))
+            # 6. Forget logins cached from the deleted database
+            self._forget_cached_users()
+            
+            # 7. Log the reset (in the new DB)
+            self._log_backup('system', 'N/A', None, 'Factory Reset performed')
                 
             logger.info("Factory reset completed successfully")
             return True
@@ -1473,42 +1220,59 @@ class DatabaseManager:
         }
         
         try:
-            with self.get_cursor() as cursor:
+            with self.get_cursor(readonly=True) as cursor:
                 # Get table information
                 cursor.execute("SELECT name FROM sqlite_master WHERE type='table' ORDER BY name")
                 tables = [row[0] for row in cursor.fetchall()]
                 info['tables'] = tables
                 
-                # Get row counts for major tables
-                for table in ['users', 'products', 'customers', 'sales', 'sale_items']:
-                    if table in tables:
-                        cursor.execute(f"SELECT COUNT(*) FROM {table}")
-                        info['statistics'][table] = cursor.fetchone()[0]
-                
-                # Get database size
-                cursor.execute("PRAGMA page_count")
-                page_count = cursor.fetchone()[0]
-                cursor.execute("PRAGMA page_size")
-                page_size = cursor.fetchone()[0]
-                info['size_mb'] = (page_count * page_size) / (1024 * 1024)
+                # Get row counts for major tables and the database size in
+                # one statement
+                counted = [table for table in STATISTICS_TABLES if table in tables]
+                columns = ''.join(f"(SELECT COUNT(*) FROM {table}), " for table in counted)
+                cursor.execute(
+                    f"SELECT {columns}page_count * page_size "
+                    f"FROM pragma_page_count(), pragma_page_size()"
+                )
+                *counts, size = cursor.fetchone()
+                info['statistics'] = dict(zip(counted, counts))
+                info['size_mb'] = size / (1024 * 1024)
                 
         except Exception as e:
             logger.error(f"Failed to get database info: {e}")
         
         return info
     
-    def optimize_database(self):
-        """Optimize database performance."""
+    def optimize_database(self, full: bool = False):
+        """
+        Optimize database performance.
+        
+        The default pass only frees pages and refreshes stale statistics, so
+        it is quick and does not hold the database for long. full=True runs
+        VACUUM/REINDEX/ANALYZE, which rewrite the whole file and block every
+        other connection meanwhile.
+        
+        Args:
+            full: Rebuild the database file and every index
+        """
         try:
             with self.get_cursor() as cursor:
-                # Vacuum to defragment
-                cursor.execute("VACUUM")
-                
-                # Rebuild indexes
-                cursor.execute("REINDEX")
-                
-                # Update statistics
-                cursor.execute("ANALYZE")
+                if full:
+                    # Vacuum to defragment; databases created before
+                    # auto_vacuum was set switch to incremental here
+                    cursor.execute("PRAGMA auto_vacuum = INCREMENTAL")
+                    cursor.execute("VACUUM")
+                    
+                    # Rebuild indexes
+                    cursor.execute("REINDEX")
+                    
+                    # Update statistics
+                    cursor.execute("ANALYZE")
+                else:
+                    # Return up to 1000 free pages to the OS (no-op without
+                    # auto_vacuum), then re-analyze only tables that need it
+                    cursor.execute("PRAGMA incremental_vacuum(1000)").fetchall()
+                    cursor.execute("PRAGMA optimize")
                 
                 logger.info("Database optimization completed")
                 
@@ -1532,14 +1296,12 @@ class DatabaseManager:
             raise
     
     def close_all_connections(self):
-        """Close all database connections."""
+        """Close all database connections (pool, thread readers and the writer thread's)."""
+        # Stopped first so it cannot reopen a pooled connection behind us
+        self._stop_maintenance()
+        self._stop_writer()
         with self.pool_lock:
-            for conn in self.connection_pool:
-                try:
-                    conn.close()
-                except:
-                    pass
-            self.connection_pool.clear()
+            self._close_pooled_connections()
             logger.info("All database connections closed")
     
     def __del__(self):
@@ -1549,6 +1311,7 @@ class DatabaseManager:
 
 # Singleton instance
 _db_instance = None
+_db_instance_lock = threading.RLock()
 
 def get_database_manager(app_data_path: Optional[Path] = None) -> DatabaseManager:
     """
@@ -1562,31 +1325,65 @@ def get_database_manager(app_data_path: Optional[Path] = None) -> DatabaseManage
     """
     import os
     global _db_instance
-    if _db_instance is None:
-        # If app_data_path not provided, prefer a workspace-local DB when
-        # running in development or when a repo `data/database/pos_main.db`
-        # already exists. This makes local development use the repo data
-        # folder instead of the user's %APPDATA% by default.
-        if app_data_path is None:
-            try:
-                repo_root = Path(__file__).resolve().parents[3]
-                dev_db = repo_root / 'data' / 'database' / 'pos_main.db'
-                if os.environ.get('ENV') == 'development' and dev_db.exists():
-                    app_data_path = repo_root / 'data'
-                elif dev_db.exists():
-                    # If the repo provides a database file, prefer it to avoid
-                    # confusing multiple DB locations.
-                    app_data_path = repo_root / 'data'
-                else:
+    if _db_instance is not None:
+        return _db_instance
+    
+    # Double-checked so concurrent first callers build (and initialize) one manager
+    with _db_instance_lock:
+        if _db_instance is None:
+            # If app_data_path not provided, prefer a workspace-local DB when
+            # running in development or when a repo `data/database/pos_main.db`
+            # already exists. This makes local development use the repo data
+            # folder instead of the user's %APPDATA% by default.
+            if app_data_path is None:
+                try:
+                    repo_root = Path(__file__).resolve().parents[3]
+                    dev_db = repo_root / 'data' / 'database' / 'pos_main.db'
+                    if os.environ.get('ENV') == 'development' and dev_db.exists():
+                        app_data_path = repo_root / 'data'
+                    elif dev_db.exists():
+                        # If the repo provides a database file, prefer it to avoid
+                        # confusing multiple DB locations.
+                        app_data_path = repo_root / 'data'
+                    else:
+                        app_data_path = None
+                except Exception:
                     app_data_path = None
-            except Exception:
-                app_data_path = None
 
-        _db_instance = DatabaseManager(app_data_path)
-        _db_instance.initialize_database()
+            # Published only once initialized, for the unlocked fast path
+            manager = DatabaseManager(app_data_path)
+            manager.initialize_database()
+            # Scripts and tests exit without the FastAPI shutdown hook
+            atexit.register(manager.close_all_connections)
+            _db_instance = manager
     return _db_instance
 
 
+async def get_db_cursor() -> AsyncGenerator[sqlite3.Cursor, None]:
+    """
+    FastAPI dependency yielding one cursor for the whole request.
+    
+    The transaction commits once the endpoint has returned, or rolls back
+    if it raised, so a handler and its helpers share a single connection.
+    
+    Yields:
+        SQLite cursor
+    """
+    with get_database_manager().get_cursor() as cursor:
+        yield cursor
+
+
+async def get_db_read_cursor() -> AsyncGenerator[sqlite3.Cursor, None]:
+    """
+    FastAPI dependency yielding one read-only cursor for the whole request.
+    
+    Yields:
+        SQLite cursor on the event-loop thread's read-only connection
+    """
+    with get_database_manager().get_cursor(readonly=True) as cursor:
+        yield cursor
+
+
 # ==================== TEST THE DATABASE MANAGER ====================
 
 if __name__ == "__main__":
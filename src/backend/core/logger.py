@@ -3,22 +3,67 @@
 LOGGING SYSTEM FOR AUDIT TRAILS AND DEBUGGING
 """
 
+import asyncio
+import atexit
 import logging
 import logging.handlers
+import queue
 import sys
-import json
+import threading
+import orjson
 from pathlib import Path
 from datetime import datetime
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 import traceback
 
+def _dumps(value: Any) -> str:
+    """Serialize a value to a JSON string with orjson (non-native types via str)."""
+    return orjson.dumps(value, default=str, option=orjson.OPT_NON_STR_KEYS).decode()
+
+# Loggers whose records go only to their own log file
+LOG_CHANNELS = ('audit', 'security', 'database')
+
+class ChannelQueueListener(logging.handlers.QueueListener):
+    """
+    QueueListener that routes channel loggers (audit, security, database)
+    to their own handler and every other record to the general handlers.
+    """
+    
+    def __init__(self, queue, handlers: List[logging.Handler], channel_handlers: Dict[str, logging.Handler]):
+        super().__init__(queue, *handlers, respect_handler_level=True)
+        self.channel_handlers = channel_handlers
+    
+    def handle(self, record: logging.LogRecord):
+        record = self.prepare(record)
+        channel_handler = self.channel_handlers.get(record.name)
+        for handler in (channel_handler,) if channel_handler else self.handlers:
+            if record.levelno >= handler.level:
+                handler.handle(record)
+
+_log_listener: Optional[ChannelQueueListener] = None
+
+def _stop_log_listener():
+    """Stop the log listener thread, flushing queued records to the handlers."""
+    global _log_listener
+    
+    if _log_listener is not None:
+        _log_listener.stop()
+        for handler in [*_log_listener.handlers, *_log_listener.channel_handlers.values()]:
+            handler.close()
+        _log_listener = None
+
 def setup_logging(log_dir: Optional[Path] = None):
     """
     Setup comprehensive logging system.
     
+    Loggers only enqueue records; a QueueListener thread does the console
+    and file I/O, so logging never blocks a request (or a held DB lock).
+    
     Args:
         log_dir: Directory to store log files
     """
+    global _log_listener
+    
     if log_dir is None:
         # Default to app data directory
         if sys.platform == "win32":
@@ -34,8 +79,13 @@ def setup_logging(log_dir: Optional[Path] = None):
     logger = logging.getLogger()
     logger.setLevel(logging.INFO)
     
-    # Clear existing handlers
+    # Clear existing handlers (and any listener from an earlier call)
+    _stop_log_listener()
     logger.handlers.clear()
+    for channel in LOG_CHANNELS:
+        logging.getLogger(channel).handlers.clear()
+    handlers = []
+    channel_handlers = {}
     
     # Console handler (for development)
     console_handler = logging.StreamHandler(sys.stdout)
@@ -44,7 +94,7 @@ def setup_logging(log_dir: Optional[Path] = None):
         '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
     )
     console_handler.setFormatter(console_format)
-    logger.addHandler(console_handler)
+    handlers.append(console_handler)
     
     # Main application log (daily rotation)
     # Use delayed file opening to avoid holding the file across process forks
@@ -78,37 +128,94 @@ def setup_logging(log_dir: Optional[Path] = None):
         datefmt='%Y-%m-%d %H:%M:%S'
     )
     app_log_handler.setFormatter(app_format)
-    logger.addHandler(app_log_handler)
+    handlers.append(app_log_handler)
     
     # Error log
     error_handler = logging.FileHandler(log_dir / "errors.log")
     error_handler.setLevel(logging.ERROR)
     error_handler.setFormatter(app_format)
-    logger.addHandler(error_handler)
+    handlers.append(error_handler)
     
     # Audit log handler
     audit_handler = logging.FileHandler(log_dir / "audit.log")
     audit_handler.setLevel(logging.INFO)
     audit_format = logging.Formatter('%(asctime)s - AUDIT - %(message)s')
     audit_handler.setFormatter(audit_format)
-    audit_handler.addFilter(lambda record: record.name == 'audit')
-    logger.addHandler(audit_handler)
+    channel_handlers['audit'] = audit_handler
     
     # Security log handler
     security_handler = logging.FileHandler(log_dir / "security.log")
     security_handler.setLevel(logging.INFO)
     security_format = logging.Formatter('%(asctime)s - SECURITY - %(message)s')
     security_handler.setFormatter(security_format)
-    security_handler.addFilter(lambda record: record.name == 'security')
-    logger.addHandler(security_handler)
+    channel_handlers['security'] = security_handler
     
     # Database log handler
     db_handler = logging.FileHandler(log_dir / "database.log")
     db_handler.setLevel(logging.INFO)
     db_format = logging.Formatter('%(asctime)s - DATABASE - %(message)s')
     db_handler.setFormatter(db_format)
-    db_handler.addFilter(lambda record: record.name == 'database')
-    logger.addHandler(db_handler)
+    channel_handlers['database'] = db_handler
+    
+    # Route everything through one queue drained by a background thread.
+    # Channel loggers don't propagate, so their records are routed straight
+    # to their own file instead of being filtered out by every handler
+    log_queue = queue.SimpleQueue()
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    logger.addHandler(queue_handler)
+    for channel in LOG_CHANNELS:
+        channel_logger = logging.getLogger(channel)
+        channel_logger.propagate = False
+        channel_logger.addHandler(queue_handler)
+    _log_listener = ChannelQueueListener(log_queue, handlers, channel_handlers)
+    _log_listener.start()
+
+atexit.register(_stop_log_listener)
+
+AUDIT_INSERT_SQL = (
+    "INSERT INTO audit_log (user_id, action, table_name, record_id, old_values, new_values, ip_address, user_agent) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+)
+
+def _write_audit_entries(entries: List[tuple]):
+    """
+    Persist audit entries to the database and the audit log file.
+    
+    Args:
+        entries: Tuples of (user_id, action, table_name, record_id,
+                 old_values, new_values, ip_address, user_agent)
+    """
+    from core.database import get_database_manager
+    
+    db_manager = get_database_manager()
+    
+    rows = [
+        (
+            user_id,
+            action,
+            table_name,
+            record_id,
+            _dumps(old_values) if old_values else None,
+            _dumps(new_values) if new_values else None,
+            ip_address,
+            user_agent
+        )
+        for user_id, action, table_name, record_id, old_values, new_values, ip_address, user_agent in entries
+    ]
+    
+    with db_manager.get_cursor() as cursor:
+        cursor.executemany(AUDIT_INSERT_SQL, rows)
+    
+    # Also log to audit log file
+    audit_logger = logging.getLogger('audit')
+    for user_id, action, table_name, record_id, _, _, ip_address, _ in entries:
+        audit_logger.info(
+            f"User:{user_id or 'System'} | "
+            f"Action:{action} | "
+            f"Table:{table_name or 'N/A'} | "
+            f"Record:{record_id or 'N/A'} | "
+            f"IP:{ip_address or 'N/A'}"
+        )
 
 def audit_log(
     user_id: Optional[int],
@@ -134,39 +241,101 @@ def audit_log(
         user_agent: Client user agent
     """
     try:
-        from core.database import get_database_manager
-        
-        db_manager = get_database_manager()
-        
-        with db_manager.get_cursor() as cursor:
-            cursor.execute('''
-                INSERT INTO audit_log 
-                (user_id, action, table_name, record_id, old_values, new_values, ip_address, user_agent)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                user_id,
-                action,
-                table_name,
-                record_id,
-                json.dumps(old_values, default=str) if old_values else None,
-                json.dumps(new_values, default=str) if new_values else None,
-                ip_address,
-                user_agent
-            ))
-        
-        # Also log to audit log file
-        audit_logger = logging.getLogger('audit')
-        audit_logger.info(
-            f"User:{user_id or 'System'} | "
-            f"Action:{action} | "
-            f"Table:{table_name or 'N/A'} | "
-            f"Record:{record_id or 'N/A'} | "
-            f"IP:{ip_address or 'N/A'}"
-        )
+        _write_audit_entries([
+            (user_id, action, table_name, record_id, old_values, new_values, ip_address, user_agent)
+        ])
         
     except Exception as e:
         logging.error(f"Failed to log audit trail: {e}")
 
+# ==================== BACKGROUND AUDIT WRITER ====================
+
+AUDIT_QUEUE_MAXSIZE = 10_000
+AUDIT_BATCH_SIZE = 500
+
+# Thread-safe queue so sync handlers running in the threadpool can queue too
+_audit_queue: "queue.Queue[Optional[tuple]]" = queue.Queue(maxsize=AUDIT_QUEUE_MAXSIZE)
+_audit_writer_thread: Optional[threading.Thread] = None
+
+def queue_audit_log(
+    user_id: Optional[int],
+    action: str,
+    table_name: Optional[str],
+    record_id: Optional[int],
+    old_values: Optional[Dict],
+    new_values: Optional[Dict],
+    ip_address: Optional[str],
+    user_agent: Optional[str]
+):
+    """
+    Queue an audit entry for the background writer.
+    
+    Falls back to a direct audit_log write when the writer is not
+    running (e.g. scripts) or the queue is full.
+    
+    Args:
+        Same as audit_log
+    """
+    entry = (user_id, action, table_name, record_id, old_values, new_values, ip_address, user_agent)
+    
+    if _audit_writer_thread is not None and _audit_writer_thread.is_alive():
+        try:
+            _audit_queue.put_nowait(entry)
+            return
+        except queue.Full:
+            pass
+    
+    audit_log(*entry)
+
+def _audit_writer():
+    """Drain the audit queue in batches, one executemany per batch, until a None sentinel."""
+    running = True
+    while running:
+        entries = [_audit_queue.get()]
+        while len(entries) < AUDIT_BATCH_SIZE:
+            try:
+                entries.append(_audit_queue.get_nowait())
+            except queue.Empty:
+                break
+        
+        if None in entries:
+            running = False
+            entries = [entry for entry in entries if entry is not None]
+            # Flush whatever was queued behind the sentinel as well
+            while True:
+                try:
+                    entries.append(_audit_queue.get_nowait())
+                except queue.Empty:
+                    break
+        
+        if entries:
+            try:
+                _write_audit_entries(entries)
+            except Exception as e:
+                logging.error(f"Failed to log audit trail ({len(entries)} entries): {e}")
+
+def start_audit_writer():
+    """Start the background audit writer thread."""
+    global _audit_writer_thread
+    
+    if _audit_writer_thread is not None and _audit_writer_thread.is_alive():
+        return
+    
+    _audit_writer_thread = threading.Thread(target=_audit_writer, name="audit-writer", daemon=True)
+    _audit_writer_thread.start()
+
+async def stop_audit_writer():
+    """Stop the background audit writer and flush anything still queued."""
+    global _audit_writer_thread
+    
+    if _audit_writer_thread is None:
+        return
+    
+    thread, _audit_writer_thread = _audit_writer_thread, None
+    # A full queue would block the sentinel put, so wait off the event loop
+    await asyncio.to_thread(_audit_queue.put, None)
+    await asyncio.to_thread(thread.join)
+
 def security_log(event: str, details: Dict[str, Any], ip_address: Optional[str] = None):
     """
     Log security-related events.
@@ -178,7 +347,7 @@ def security_log(event: str, details: Dict[str, Any], ip_address: Optional[str]
     """
     try:
         security_logger = logging.getLogger('security')
-        log_message = f"Event:{event} | Details:{json.dumps(details)}"
+        log_message = f"Event:{event} | Details:{_dumps(details)}"
         if ip_address:
             log_message += f" | IP:{ip_address}"
         security_logger.info(log_message)
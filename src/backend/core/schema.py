@@ -0,0 +1,1113 @@
+# src/backend/core/schema.py
+"""
+DATABASE SCHEMA
+- Table, index and data-fix statements applied by DatabaseManager
+- Schema fingerprint stored in _schema_meta
+- Only objects missing from sqlite_master are (re)created
+"""
+
+import re
+import hashlib
+from typing import Iterable, List, Set
+
+# ==================== TABLES ====================
+
+# Missing tables are created in one executescript batch by
+# initialize_database. IF NOT EXISTS keeps reruns idempotent.
+TABLE_DDL = (
+    # 1. USERS TABLE (With Pakistani roles)
+    '''
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT UNIQUE NOT NULL,
+            password_hash TEXT NOT NULL,
+            full_name TEXT NOT NULL,
+            role TEXT NOT NULL CHECK(role IN ('malik', 'munshi', 'shop_boy', 'stock_boy')),
+            phone TEXT,
+            address TEXT,
+            cnic TEXT,
+            salary DECIMAL(15,2) DEFAULT 0,
+            commission_rate DECIMAL(5,2) DEFAULT 0,
+            status TEXT DEFAULT 'active' CHECK(status IN ('active', 'inactive', 'suspended')),
+            last_login TIMESTAMP,
+            login_attempts INTEGER DEFAULT 0,
+            locked_until TIMESTAMP,
+            password_changed_at TIMESTAMP, -- Track when password was last changed
+            permissions TEXT, -- JSON permissions
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''',
+
+    # 2. SHOP SETTINGS
+    '''
+        CREATE TABLE IF NOT EXISTS shop_settings (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            shop_name TEXT NOT NULL DEFAULT 'Auto Accessories Shop',
+            shop_address TEXT NOT NULL,
+            shop_city TEXT NOT NULL,
+            shop_phone TEXT NOT NULL,
+            shop_email TEXT,
+            owner_name TEXT,
+            owner_phone TEXT,
+            owner_cnic TEXT,
+            ntn_number TEXT,
+            strn_number TEXT,
+            gst_number TEXT,
+            invoice_prefix TEXT DEFAULT 'INV',
+            invoice_start_number INTEGER DEFAULT 1000,
+            receipt_footer TEXT,
+            logo_path TEXT,
+            currency_symbol TEXT DEFAULT '₹',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''',
+
+    # 3. CATEGORIES (For auto parts)
+    '''
+        CREATE TABLE IF NOT EXISTS categories (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            parent_id INTEGER,
+            category_code TEXT UNIQUE NOT NULL,
+            name TEXT NOT NULL,
+            description TEXT,
+            image_path TEXT,
+            display_order INTEGER DEFAULT 0,
+            for_vehicle_type TEXT, -- 'car', 'bike', 'rickshaw', 'truck'
+            is_active BOOLEAN DEFAULT 1,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (parent_id) REFERENCES categories(id) ON DELETE SET NULL
+        )
+    ''',
+
+    # 4. BRANDS
+    '''
+        CREATE TABLE IF NOT EXISTS brands (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            brand_code TEXT UNIQUE NOT NULL,
+            name TEXT NOT NULL,
+            country TEXT,
+            description TEXT,
+            logo_path TEXT,
+            is_active BOOLEAN DEFAULT 1,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''',
+
+    # 5. PRODUCTS (Core table)
+    '''
+        CREATE TABLE IF NOT EXISTS products (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            product_code TEXT UNIQUE NOT NULL,
+            barcode TEXT UNIQUE,
+            name TEXT NOT NULL,
+            description TEXT,
+            category_id INTEGER NOT NULL,
+            brand_id INTEGER,
+            unit TEXT DEFAULT 'pcs',
+
+            -- Pakistani Pricing (Gola System)
+            cost_price DECIMAL(15,2) NOT NULL,
+            retail_price DECIMAL(15,2) NOT NULL,
+            wholesale_price DECIMAL(15,2),
+            dealer_price DECIMAL(15,2),
+            min_sale_price DECIMAL(15,2), -- Minimum allowed price
+
+            -- Stock Management
+            current_stock DECIMAL(15,3) NOT NULL DEFAULT 0,
+            min_stock DECIMAL(15,3) NOT NULL DEFAULT 5,
+            max_stock DECIMAL(15,3),
+            reorder_level DECIMAL(15,3),
+
+            -- Pakistani Tax
+            gst_rate DECIMAL(5,2) DEFAULT 17.0,
+            is_gst_applicable BOOLEAN DEFAULT 1,
+            hsc_code TEXT,
+
+            -- Product Details
+            for_vehicle_type TEXT, -- Specific vehicle type
+            model_compatibility TEXT, -- JSON array of compatible models
+            warranty_days INTEGER DEFAULT 180, -- 6 months default
+            has_serial BOOLEAN DEFAULT 0, -- Serial number tracking
+
+            -- Images
+            image_path TEXT,
+
+            -- Status
+            is_active BOOLEAN DEFAULT 1,
+            is_service BOOLEAN DEFAULT 0, -- Service vs product
+
+            -- Audit
+            created_by INTEGER,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            last_stock_update TIMESTAMP,
+
+            FOREIGN KEY (category_id) REFERENCES categories(id),
+            FOREIGN KEY (brand_id) REFERENCES brands(id),
+            FOREIGN KEY (created_by) REFERENCES users(id)
+        )
+    ''',
+
+    # 6. PRODUCT VARIANTS (Size, Color, etc.)
+    '''
+        CREATE TABLE IF NOT EXISTS product_variants (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            product_id INTEGER NOT NULL,
+            variant_code TEXT NOT NULL,
+            variant_name TEXT NOT NULL,
+            barcode TEXT UNIQUE,
+            cost_price DECIMAL(15,2),
+            sale_price DECIMAL(15,2),
+            current_stock DECIMAL(15,3) DEFAULT 0,
+            min_stock DECIMAL(15,3) DEFAULT 0,
+            image_path TEXT,
+            is_active BOOLEAN DEFAULT 1,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (product_id) REFERENCES products(id) ON DELETE CASCADE,
+            UNIQUE(product_id, variant_code)
+        )
+    ''',
+
+    # 7. SERIAL NUMBERS (For expensive items)
+    '''
+        CREATE TABLE IF NOT EXISTS serial_numbers (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            product_id INTEGER NOT NULL,
+            serial_number TEXT UNIQUE NOT NULL,
+            purchase_id INTEGER,
+            purchase_item_id INTEGER,
+            sale_id INTEGER,
+            sale_item_id INTEGER,
+            status TEXT DEFAULT 'in_stock' CHECK(status IN ('in_stock', 'sold', 'returned', 'damaged')),
+            purchase_date DATE,
+            sale_date DATE,
+            warranty_start DATE,
+            warranty_end DATE,
+            notes TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (product_id) REFERENCES products(id),
+            FOREIGN KEY (purchase_id) REFERENCES purchases(id),
+            FOREIGN KEY (sale_id) REFERENCES sales(id)
+        )
+    ''',
+
+    # 8. CUSTOMERS
+    '''
+        CREATE TABLE IF NOT EXISTS customers (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            customer_code TEXT UNIQUE NOT NULL,
+            full_name TEXT NOT NULL,
+            phone TEXT UNIQUE NOT NULL,
+            phone2 TEXT,
+            email TEXT,
+            cnic TEXT UNIQUE,
+            address TEXT,
+            city TEXT,
+            area TEXT, -- Mohalla
+            customer_type TEXT DEFAULT 'retail' CHECK(customer_type IN ('retail', 'wholesale', 'dealer', 'corporate')),
+
+            -- Pakistani Credit System (Udhaar)
+            credit_limit DECIMAL(15,2) DEFAULT 0,
+            current_balance DECIMAL(15,2) DEFAULT 0,
+            credit_days INTEGER DEFAULT 30,
+            is_credit_allowed BOOLEAN DEFAULT 0,
+
+            -- Loyalty
+            loyalty_points INTEGER DEFAULT 0,
+            total_purchases DECIMAL(15,2) DEFAULT 0,
+            last_purchase_date DATE,
+
+            -- Status
+            status TEXT DEFAULT 'active' CHECK(status IN ('active', 'inactive', 'blacklisted')),
+            notes TEXT,
+
+            -- Audit
+            created_by INTEGER,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+
+            FOREIGN KEY (created_by) REFERENCES users(id)
+        )
+    ''',
+
+    # 9. CUSTOMER VEHICLES
+    '''
+        CREATE TABLE IF NOT EXISTS customer_vehicles (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            customer_id INTEGER NOT NULL,
+            vehicle_type TEXT NOT NULL CHECK(vehicle_type IN ('car', 'bike', 'rickshaw', 'truck', 'other')),
+            make TEXT, -- Honda, Toyota, Suzuki
+            model TEXT,
+            year INTEGER,
+            registration_number TEXT,
+            chassis_number TEXT,
+            engine_number TEXT,
+            color TEXT,
+            purchase_date DATE,
+            last_service_date DATE,
+            next_service_date DATE,
+            notes TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (customer_id) REFERENCES customers(id) ON DELETE CASCADE
+        )
+    ''',
+
+    # 10. PRICE GROUPS (Gola System)
+    '''
+        CREATE TABLE IF NOT EXISTS price_groups (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            group_code TEXT UNIQUE NOT NULL,
+            group_name TEXT NOT NULL,
+            description TEXT,
+            discount_percent DECIMAL(5,2) DEFAULT 0,
+            is_default BOOLEAN DEFAULT 0,
+            is_active BOOLEAN DEFAULT 1,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''',
+
+    # 11. CUSTOMER PRICE GROUPS
+    '''
+        CREATE TABLE IF NOT EXISTS customer_price_groups (
+            customer_id INTEGER NOT NULL,
+            price_group_id INTEGER NOT NULL,
+            effective_date DATE DEFAULT CURRENT_DATE,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (customer_id, price_group_id),
+            FOREIGN KEY (customer_id) REFERENCES customers(id),
+            FOREIGN KEY (price_group_id) REFERENCES price_groups(id)
+        ) WITHOUT ROWID
+    ''',
+
+    # 12. SALES (Main sales table)
+    '''
+        CREATE TABLE IF NOT EXISTS sales (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            invoice_number TEXT UNIQUE NOT NULL,
+            invoice_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+
+            -- Customer Info
+            customer_id INTEGER,
+            customer_name TEXT,
+            customer_phone TEXT,
+            customer_cnic TEXT,
+
+            -- Vehicle Info (for auto shops)
+            vehicle_type TEXT,
+            vehicle_make TEXT,
+            vehicle_model TEXT,
+            vehicle_registration TEXT,
+
+            -- Totals
+            total_items INTEGER NOT NULL DEFAULT 0,
+            total_quantity DECIMAL(15,3) NOT NULL DEFAULT 0,
+            subtotal DECIMAL(15,2) NOT NULL DEFAULT 0,
+            discount_amount DECIMAL(15,2) NOT NULL DEFAULT 0,
+            discount_percent DECIMAL(5,2) DEFAULT 0,
+
+            -- Pakistani Taxes
+            gst_amount DECIMAL(15,2) NOT NULL DEFAULT 0,
+            gst_rate DECIMAL(5,2) DEFAULT 17.0,
+            additional_tax DECIMAL(15,2) DEFAULT 0,
+            withholding_tax DECIMAL(15,2) DEFAULT 0,
+
+            -- Final Amounts
+            shipping_charge DECIMAL(15,2) DEFAULT 0,
+            round_off DECIMAL(10,2) DEFAULT 0,
+            grand_total DECIMAL(15,2) NOT NULL DEFAULT 0,
+            amount_paid DECIMAL(15,2) NOT NULL DEFAULT 0,
+            balance_due DECIMAL(15,2) NOT NULL DEFAULT 0,
+
+            -- Payment Info (Pakistani methods)
+            payment_method TEXT DEFAULT 'cash' CHECK(payment_method IN ('cash', 'card', 'cheque', 'bank_transfer', 'credit', 'mixed')),
+            payment_status TEXT DEFAULT 'paid' CHECK(payment_status IN ('paid', 'pending', 'partial', 'cancelled')),
+
+            -- Sale Status
+            sale_type TEXT DEFAULT 'retail' CHECK(sale_type IN ('retail', 'wholesale', 'dealer')),
+            sale_status TEXT DEFAULT 'completed' CHECK(sale_status IN ('completed', 'hold', 'cancelled', 'refunded')),
+            hold_reason TEXT,
+
+            -- GST Invoice
+            is_gst_invoice BOOLEAN DEFAULT 0,
+            gst_invoice_number TEXT,
+
+            -- Cashier Info
+            cashier_id INTEGER NOT NULL,
+            cashier_name TEXT NOT NULL,
+
+            -- Notes
+            notes TEXT,
+
+            -- Printing
+            printed_count INTEGER DEFAULT 0,
+            last_printed TIMESTAMP,
+
+            -- Audit
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+
+            FOREIGN KEY (customer_id) REFERENCES customers(id),
+            FOREIGN KEY (cashier_id) REFERENCES users(id)
+        )
+    ''',
+
+    # 13. SALE ITEMS
+    '''
+        CREATE TABLE IF NOT EXISTS sale_items (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            sale_id INTEGER NOT NULL,
+            product_id INTEGER NOT NULL,
+            variant_id INTEGER,
+            product_code TEXT NOT NULL,
+            product_name TEXT NOT NULL,
+            barcode TEXT,
+
+            -- Quantity & Price
+            quantity DECIMAL(15,3) NOT NULL,
+            unit_price DECIMAL(15,2) NOT NULL,
+            cost_price DECIMAL(15,2) NOT NULL,
+
+            -- Discounts (Bargain)
+            discount_percent DECIMAL(5,2) DEFAULT 0,
+            discount_amount DECIMAL(15,2) DEFAULT 0,
+
+            -- Tax
+            gst_rate DECIMAL(5,2) DEFAULT 17.0,
+            gst_amount DECIMAL(15,2) DEFAULT 0,
+
+            -- Totals
+            line_total DECIMAL(15,2) NOT NULL,
+            line_profit DECIMAL(15,2) NOT NULL,
+
+            -- Serial Numbers
+            serial_numbers TEXT, -- Legacy JSON array; serials link back via serial_numbers.sale_item_id
+
+            -- Return Info
+            returned_quantity DECIMAL(15,3) DEFAULT 0,
+            return_reason TEXT,
+
+            -- Audit
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+
+            FOREIGN KEY (sale_id) REFERENCES sales(id) ON DELETE CASCADE,
+            FOREIGN KEY (product_id) REFERENCES products(id),
+            FOREIGN KEY (variant_id) REFERENCES product_variants(id)
+        )
+    ''',
+
+    # 14. PAYMENTS (For mixed payments)
+    '''
+        CREATE TABLE IF NOT EXISTS payments (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            sale_id INTEGER NOT NULL,
+            payment_method TEXT NOT NULL,
+            amount DECIMAL(15,2) NOT NULL,
+
+            -- Cash Details
+            cash_received DECIMAL(15,2),
+            cash_returned DECIMAL(15,2),
+
+            -- Card Details
+            card_last4 TEXT,
+            card_type TEXT,
+            bank_name TEXT,
+
+            -- Cheque Details
+            cheque_number TEXT,
+            cheque_date DATE,
+            bank_name_cheque TEXT,
+
+            -- Bank Transfer
+            transaction_id TEXT,
+            bank_name_transfer TEXT,
+
+            -- Status
+            payment_status TEXT DEFAULT 'completed',
+            payment_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            notes TEXT,
+
+            FOREIGN KEY (sale_id) REFERENCES sales(id) ON DELETE CASCADE
+        )
+    ''',
+
+    # 14b. SALE_PAYMENTS (allocations of customer payments to sales)
+    '''
+        CREATE TABLE IF NOT EXISTS sale_payments (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            sale_id INTEGER NOT NULL,
+            customer_payment_id INTEGER NOT NULL,
+            amount DECIMAL(15,2) NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (sale_id) REFERENCES sales(id) ON DELETE CASCADE,
+            FOREIGN KEY (customer_payment_id) REFERENCES customer_payments(id) ON DELETE CASCADE
+        )
+    ''',
+
+    # 15. GST INVOICES (FBR Compliance)
+    '''
+        CREATE TABLE IF NOT EXISTS gst_invoices (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            sale_id INTEGER NOT NULL,
+            invoice_number TEXT UNIQUE NOT NULL,
+            gst_number TEXT,
+            ntn_number TEXT,
+            buyer_name TEXT,
+            buyer_ntn TEXT,
+            buyer_cnic TEXT CHECK(length(buyer_cnic) IN (0, 13)),
+            buyer_address TEXT,
+            buyer_phone TEXT,
+            invoice_date DATE NOT NULL,
+            taxable_amount DECIMAL(15,2) NOT NULL,
+            gst_amount DECIMAL(15,2) NOT NULL,
+            total_amount DECIMAL(15,2) NOT NULL,
+            is_filed BOOLEAN DEFAULT 0,
+            filed_date DATE,
+            qr_code_path TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (sale_id) REFERENCES sales(id)
+        )
+    ''',
+
+    # 16. CREDIT SALES (Udhaar System)
+    '''
+        CREATE TABLE IF NOT EXISTS credit_sales (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            sale_id INTEGER NOT NULL,
+            customer_id INTEGER NOT NULL,
+            total_amount DECIMAL(15,2) NOT NULL,
+            paid_amount DECIMAL(15,2) DEFAULT 0,
+            remaining_amount DECIMAL(15,2) NOT NULL,
+            due_date DATE NOT NULL,
+            installment_count INTEGER DEFAULT 1,
+            installment_amount DECIMAL(15,2),
+            next_payment_date DATE,
+            status TEXT DEFAULT 'pending' CHECK(status IN ('pending', 'active', 'completed', 'overdue')),
+            notes TEXT,
+            created_by INTEGER NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (sale_id) REFERENCES sales(id),
+            FOREIGN KEY (customer_id) REFERENCES customers(id),
+            FOREIGN KEY (created_by) REFERENCES users(id)
+        )
+    ''',
+
+    # 17. CREDIT PAYMENTS
+    '''
+        CREATE TABLE IF NOT EXISTS credit_payments (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            credit_sale_id INTEGER NOT NULL,
+            amount DECIMAL(15,2) NOT NULL,
+            payment_date DATE NOT NULL,
+            payment_method TEXT,
+            reference_number TEXT,
+            collected_by INTEGER NOT NULL,
+            notes TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (credit_sale_id) REFERENCES credit_sales(id),
+            FOREIGN KEY (collected_by) REFERENCES users(id)
+        )
+    ''',
+
+    # 18. SUPPLIERS
+    '''
+        CREATE TABLE IF NOT EXISTS suppliers (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            supplier_code TEXT UNIQUE NOT NULL,
+            company_name TEXT NOT NULL,
+            contact_person TEXT,
+            phone TEXT,
+            mobile TEXT,
+            email TEXT,
+            address TEXT,
+            city TEXT,
+            ntn_number TEXT,
+            strn_number TEXT,
+            payment_terms TEXT,
+            credit_limit DECIMAL(15,2) DEFAULT 0,
+            current_balance DECIMAL(15,2) DEFAULT 0,
+            is_active BOOLEAN DEFAULT 1,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''',
+
+    # 19. PURCHASES
+    '''
+        CREATE TABLE IF NOT EXISTS purchases (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            purchase_number TEXT UNIQUE NOT NULL,
+            purchase_date DATE NOT NULL,
+            supplier_id INTEGER NOT NULL,
+            total_items INTEGER DEFAULT 0,
+            subtotal DECIMAL(15,2) DEFAULT 0,
+            total_tax DECIMAL(15,2) DEFAULT 0,
+            shipping_cost DECIMAL(15,2) DEFAULT 0,
+            other_charges DECIMAL(15,2) DEFAULT 0,
+            total_amount DECIMAL(15,2) NOT NULL,
+            amount_paid DECIMAL(15,2) DEFAULT 0,
+            balance_due DECIMAL(15,2) DEFAULT 0,
+            payment_status TEXT DEFAULT 'pending',
+            received_by INTEGER,
+            notes TEXT,
+            created_by INTEGER NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (supplier_id) REFERENCES suppliers(id),
+            FOREIGN KEY (received_by) REFERENCES users(id),
+            FOREIGN KEY (created_by) REFERENCES users(id)
+        )
+    ''',
+
+    # 20. PURCHASE ITEMS
+    '''
+        CREATE TABLE IF NOT EXISTS purchase_items (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            purchase_id INTEGER NOT NULL,
+            product_id INTEGER NOT NULL,
+            quantity DECIMAL(15,3) NOT NULL,
+            unit_cost DECIMAL(15,2) NOT NULL,
+            total_cost DECIMAL(15,2) NOT NULL,
+            gst_rate DECIMAL(5,2) DEFAULT 17.0,
+            gst_amount DECIMAL(15,2) DEFAULT 0,
+            expiry_date DATE,
+            batch_number TEXT,
+            received_quantity DECIMAL(15,3) DEFAULT 0,
+            notes TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (purchase_id) REFERENCES purchases(id) ON DELETE CASCADE,
+            FOREIGN KEY (product_id) REFERENCES products(id)
+        )
+    ''',
+
+    # 21. STOCK MOVEMENTS
+    '''
+        CREATE TABLE IF NOT EXISTS stock_movements (
+            id INTEGER PRIMARY KEY,  -- Append-only log: no AUTOINCREMENT/sqlite_sequence write per row
+            product_id INTEGER NOT NULL,
+            movement_type TEXT NOT NULL,  -- Validated against utils.validators.STOCK_MOVEMENT_TYPES
+            quantity DECIMAL(15,3) NOT NULL,
+            previous_quantity DECIMAL(15,3) NOT NULL,
+            new_quantity DECIMAL(15,3) NOT NULL,
+            unit_cost DECIMAL(15,2),
+            total_cost DECIMAL(15,2),
+            reference_id INTEGER,
+            reference_type TEXT,
+            reason TEXT,
+            notes TEXT,
+            created_by INTEGER NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (product_id) REFERENCES products(id),
+            FOREIGN KEY (created_by) REFERENCES users(id)
+        )
+    ''',
+
+    # 22. INVENTORY LOCATIONS
+    '''
+        CREATE TABLE IF NOT EXISTS inventory_locations (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            location_code TEXT UNIQUE NOT NULL,
+            location_name TEXT NOT NULL,
+            parent_location_id INTEGER,
+            location_type TEXT CHECK(location_type IN ('shelf', 'rack', 'room', 'warehouse')),
+            capacity INTEGER,
+            notes TEXT,
+            is_active BOOLEAN DEFAULT 1,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (parent_location_id) REFERENCES inventory_locations(id)
+        )
+    ''',
+
+    # 23. PRODUCT LOCATIONS
+    '''
+        CREATE TABLE IF NOT EXISTS product_locations (
+            product_id INTEGER NOT NULL,
+            location_id INTEGER NOT NULL,
+            quantity DECIMAL(15,3) NOT NULL DEFAULT 0,
+            reorder_level DECIMAL(15,3) DEFAULT 0,
+            last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (product_id, location_id),
+            FOREIGN KEY (product_id) REFERENCES products(id),
+            FOREIGN KEY (location_id) REFERENCES inventory_locations(id)
+        ) WITHOUT ROWID
+    ''',
+
+    # 24. EXPENSES (Daily shop expenses)
+    '''
+        CREATE TABLE IF NOT EXISTS expenses (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            expense_number TEXT UNIQUE NOT NULL,
+            expense_date DATE NOT NULL,
+            category TEXT NOT NULL,
+            subcategory TEXT,
+            amount DECIMAL(15,2) NOT NULL,
+            payment_method TEXT,
+            paid_to TEXT,
+            reference_number TEXT,
+            description TEXT,
+            receipt_image TEXT,
+            approved_by INTEGER,
+            approved_at TIMESTAMP,
+            created_by INTEGER NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (approved_by) REFERENCES users(id),
+            FOREIGN KEY (created_by) REFERENCES users(id)
+        )
+    ''',
+
+    # 25. CASH REGISTER (Daily opening/closing)
+    '''
+        CREATE TABLE IF NOT EXISTS cash_register (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            opening_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            closing_time TIMESTAMP,
+            opening_balance DECIMAL(15,2) NOT NULL,
+            closing_balance DECIMAL(15,2),
+            expected_cash DECIMAL(15,2),
+            actual_cash DECIMAL(15,2),
+            cash_difference DECIMAL(15,2),
+            user_id INTEGER NOT NULL,
+            status TEXT DEFAULT 'open' CHECK(status IN ('open', 'closed')),
+            notes TEXT,
+            FOREIGN KEY (user_id) REFERENCES users(id)
+        )
+    ''',
+
+    # 26. CASH TRANSACTIONS
+    '''
+        CREATE TABLE IF NOT EXISTS cash_transactions (
+            id INTEGER PRIMARY KEY,
+            register_id INTEGER NOT NULL,
+            transaction_type TEXT CHECK(transaction_type IN ('sale', 'expense', 'deposit', 'withdrawal')),
+            amount DECIMAL(15,2) NOT NULL,
+            reference_id INTEGER,
+            reference_type TEXT,
+            description TEXT,
+            created_by INTEGER NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (register_id) REFERENCES cash_register(id),
+            FOREIGN KEY (created_by) REFERENCES users(id)
+        )
+    ''',
+
+    # 27. BANK DEPOSITS
+    '''
+        CREATE TABLE IF NOT EXISTS bank_deposits (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            deposit_date DATE NOT NULL,
+            bank_name TEXT,
+            account_number TEXT,
+            amount DECIMAL(15,2) NOT NULL,
+            deposit_slip_number TEXT,
+            deposited_by INTEGER NOT NULL,
+            verified_by INTEGER,
+            notes TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (deposited_by) REFERENCES users(id),
+            FOREIGN KEY (verified_by) REFERENCES users(id)
+        )
+    ''',
+
+    # 28. COMMISSIONS (Bhatta System)
+    '''
+        CREATE TABLE IF NOT EXISTS commissions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            sale_id INTEGER NOT NULL,
+            commission_type TEXT CHECK(commission_type IN ('percentage', 'fixed')),
+            commission_rate DECIMAL(5,2),
+            commission_amount DECIMAL(15,2) NOT NULL,
+            calculation_base DECIMAL(15,2),
+            status TEXT DEFAULT 'pending' CHECK(status IN ('pending', 'approved', 'paid')),
+            paid_date DATE,
+            notes TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users(id),
+            FOREIGN KEY (sale_id) REFERENCES sales(id)
+        )
+    ''',
+
+    # 29. WARRANTY CLAIMS
+    '''
+        CREATE TABLE IF NOT EXISTS warranty_claims (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            sale_item_id INTEGER NOT NULL,
+            claim_date DATE NOT NULL,
+            issue_description TEXT,
+            resolution TEXT,
+            replacement_product_id INTEGER,
+            claim_status TEXT DEFAULT 'pending' CHECK(claim_status IN ('pending', 'approved', 'rejected', 'completed')),
+            approved_by INTEGER,
+            approved_at TIMESTAMP,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (sale_item_id) REFERENCES sale_items(id),
+            FOREIGN KEY (replacement_product_id) REFERENCES products(id),
+            FOREIGN KEY (approved_by) REFERENCES users(id)
+        )
+    ''',
+
+    # 30. LOYALTY PROGRAMS
+    '''
+        CREATE TABLE IF NOT EXISTS loyalty_programs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            program_name TEXT NOT NULL,
+            points_per_amount DECIMAL(10,2) DEFAULT 1,
+            redemption_rate DECIMAL(10,2) DEFAULT 100,
+            minimum_redemption_points INTEGER DEFAULT 100,
+            start_date DATE NOT NULL,
+            end_date DATE,
+            is_active BOOLEAN DEFAULT 1,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''',
+
+    # 31. CUSTOMER LOYALTY
+    '''
+        CREATE TABLE IF NOT EXISTS customer_loyalty (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            customer_id INTEGER NOT NULL,
+            program_id INTEGER NOT NULL,
+            total_points_earned INTEGER DEFAULT 0,
+            points_redeemed INTEGER DEFAULT 0,
+            current_points INTEGER DEFAULT 0,
+            last_activity_date DATE,
+            membership_level TEXT DEFAULT 'regular',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE(customer_id, program_id),
+            FOREIGN KEY (customer_id) REFERENCES customers(id),
+            FOREIGN KEY (program_id) REFERENCES loyalty_programs(id)
+        )
+    ''',
+
+    # 32. AUDIT LOG
+    '''
+        CREATE TABLE IF NOT EXISTS audit_log (
+            id INTEGER PRIMARY KEY,
+            user_id INTEGER,
+            username TEXT,
+            action TEXT NOT NULL,
+            table_name TEXT,
+            record_id INTEGER,
+            old_values TEXT,
+            new_values TEXT,
+            ip_address TEXT,
+            user_agent TEXT,
+            timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users(id)
+        )
+    ''',
+
+    # 33. USER SESSIONS
+    '''
+        CREATE TABLE IF NOT EXISTS user_sessions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            session_token TEXT UNIQUE NOT NULL,
+            device_info TEXT,
+            ip_address TEXT,
+            login_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            last_activity TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            expiry_time TIMESTAMP NOT NULL,
+            is_active BOOLEAN DEFAULT 1,
+            FOREIGN KEY (user_id) REFERENCES users(id)
+        )
+    ''',
+
+    # 34. BACKUP HISTORY
+    '''
+        CREATE TABLE IF NOT EXISTS backup_history (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            backup_type TEXT NOT NULL,
+            file_path TEXT NOT NULL,
+            file_size INTEGER,
+            record_count INTEGER,
+            status TEXT NOT NULL,
+            notes TEXT,
+            created_by INTEGER,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (created_by) REFERENCES users(id)
+        )
+    ''',
+
+    # 35. PRINTER CONFIGURATIONS
+    '''
+        CREATE TABLE IF NOT EXISTS printer_configurations (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            printer_name TEXT NOT NULL,
+            printer_type TEXT CHECK(printer_type IN ('thermal', 'laser', 'dot_matrix')),
+            connection_type TEXT CHECK(connection_type IN ('usb', 'network', 'bluetooth')),
+            connection_string TEXT,
+            paper_width INTEGER DEFAULT 80,
+            char_per_line INTEGER DEFAULT 42,
+            is_default BOOLEAN DEFAULT 0,
+            is_active BOOLEAN DEFAULT 1,
+            print_logo BOOLEAN DEFAULT 1,
+            print_header BOOLEAN DEFAULT 1,
+            print_footer BOOLEAN DEFAULT 1,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''',
+
+    # 36. SHOP_BRANCHES (Future expansion)
+    '''
+        CREATE TABLE IF NOT EXISTS shop_branches (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            branch_code TEXT UNIQUE NOT NULL,
+            branch_name TEXT NOT NULL,
+            address TEXT NOT NULL,
+            city TEXT NOT NULL,
+            phone TEXT,
+            email TEXT,
+            manager_id INTEGER,
+            opening_time TIME,
+            closing_time TIME,
+            is_active BOOLEAN DEFAULT 1,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (manager_id) REFERENCES users(id)
+        )
+    ''',
+
+    # 37. DAILY_SUMMARY (For quick reports)
+    '''
+        CREATE TABLE IF NOT EXISTS daily_summary (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            summary_date DATE NOT NULL,
+            total_sales DECIMAL(15,2) DEFAULT 0,
+            total_purchases DECIMAL(15,2) DEFAULT 0,
+            total_expenses DECIMAL(15,2) DEFAULT 0,
+            total_cash DECIMAL(15,2) DEFAULT 0,
+            total_card DECIMAL(15,2) DEFAULT 0,
+            total_credit DECIMAL(15,2) DEFAULT 0,
+            customer_count INTEGER DEFAULT 0,
+            invoice_count INTEGER DEFAULT 0,
+            profit_amount DECIMAL(15,2) DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE(summary_date)
+        )
+    ''',
+
+    # 38. DATA_SYNC_LOG
+    '''
+        CREATE TABLE IF NOT EXISTS data_sync_log (
+            id INTEGER PRIMARY KEY,
+            sync_type TEXT CHECK(sync_type IN ('backup', 'restore', 'export', 'import')),
+            file_path TEXT,
+            file_size INTEGER,
+            record_count INTEGER,
+            status TEXT CHECK(status IN ('success', 'failed', 'in_progress')),
+            error_message TEXT,
+            performed_by INTEGER,
+            performed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (performed_by) REFERENCES users(id)
+        )
+    ''',
+
+    # 39. USER_ACTIVITY_LOG
+    '''
+        CREATE TABLE IF NOT EXISTS user_activity_log (
+            id INTEGER PRIMARY KEY,
+            user_id INTEGER NOT NULL,
+            activity_type TEXT NOT NULL,
+            module TEXT,
+            action_details TEXT,
+            ip_address TEXT,
+            user_agent TEXT,
+            timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users(id)
+        )
+    ''',
+
+    # 40. NOTIFICATIONS
+    '''
+        CREATE TABLE IF NOT EXISTS notifications (
+            id INTEGER PRIMARY KEY,
+            user_id INTEGER NOT NULL,
+            notification_type TEXT NOT NULL,
+            title TEXT NOT NULL,
+            message TEXT NOT NULL,
+            is_read BOOLEAN DEFAULT 0,
+            action_url TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            read_at TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users(id)
+        )
+    ''',
+
+    # 41. CUSTOMER PAYMENTS (Credit payments)
+    '''
+        CREATE TABLE IF NOT EXISTS customer_payments (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            customer_id INTEGER NOT NULL,
+            amount DECIMAL(15,2) NOT NULL,
+            payment_method TEXT CHECK(payment_method IN ('cash', 'card', 'cheque', 'bank_transfer', 'credit', 'mobile_payment')),
+            payment_type TEXT DEFAULT 'credit_payment' CHECK(payment_type IN ('credit_payment', 'advance_payment', 'installment_payment')),
+            payment_date DATE NOT NULL,
+            received_by INTEGER NOT NULL,
+            notes TEXT,
+            receipt_number TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (customer_id) REFERENCES customers(id),
+            FOREIGN KEY (received_by) REFERENCES users(id)
+        )
+    ''',
+)
+
+# ==================== CREATE INDEXES FOR PERFORMANCE ====================
+
+# Built after the default rows are seeded, in the same transaction
+INDEX_DDL = (
+    # Sales indexes
+    "CREATE INDEX IF NOT EXISTS idx_sales_date ON sales(invoice_date)",
+    "CREATE INDEX IF NOT EXISTS idx_sales_created ON sales(created_at)",
+    "CREATE INDEX IF NOT EXISTS idx_sales_customer_date ON sales(customer_id, invoice_date)",
+    "CREATE INDEX IF NOT EXISTS idx_sales_cashier ON sales(cashier_id)",
+    "CREATE INDEX IF NOT EXISTS idx_sales_status ON sales(sale_status)",
+    "CREATE INDEX IF NOT EXISTS idx_sales_payment ON sales(payment_status)",
+
+    # Sale items indexes
+    "CREATE INDEX IF NOT EXISTS idx_sale_items_sale_product ON sale_items(sale_id, product_id)",
+    "CREATE INDEX IF NOT EXISTS idx_sale_items_product_sale ON sale_items(product_id, sale_id)",
+
+    # Product indexes
+    "CREATE INDEX IF NOT EXISTS idx_products_category ON products(category_id)",
+    "CREATE INDEX IF NOT EXISTS idx_products_active ON products(is_active)",
+    "CREATE INDEX IF NOT EXISTS idx_products_stock ON products(current_stock)",
+    "CREATE INDEX IF NOT EXISTS idx_products_category_active ON products(category_id) WHERE is_active = 1",
+
+    # Serial number indexes
+    "CREATE INDEX IF NOT EXISTS idx_serial_numbers_product_status ON serial_numbers(product_id, status)",
+    "CREATE INDEX IF NOT EXISTS idx_serial_numbers_sale_item ON serial_numbers(sale_item_id)",
+
+    # Customer indexes
+    "CREATE INDEX IF NOT EXISTS idx_customers_type ON customers(customer_type)",
+
+    # Customer payments indexes
+    "CREATE INDEX IF NOT EXISTS idx_customer_payments_customer ON customer_payments(customer_id)",
+    "CREATE INDEX IF NOT EXISTS idx_customer_payments_date ON customer_payments(payment_date)",
+    "CREATE INDEX IF NOT EXISTS idx_customer_payments_method ON customer_payments(payment_method)",
+    "CREATE INDEX IF NOT EXISTS idx_customer_payments_received_by ON customer_payments(received_by)",
+
+    # Stock movements indexes
+    "CREATE INDEX IF NOT EXISTS idx_stock_movements_product_date ON stock_movements(product_id, created_at)",
+    "CREATE INDEX IF NOT EXISTS idx_stock_movements_date ON stock_movements(created_at)",
+    "CREATE INDEX IF NOT EXISTS idx_stock_movements_type ON stock_movements(movement_type)",
+
+    # Credit sales indexes
+    "CREATE INDEX IF NOT EXISTS idx_credit_sales_customer ON credit_sales(customer_id)",
+    "CREATE INDEX IF NOT EXISTS idx_credit_sales_status_due ON credit_sales(status, due_date)",
+    "CREATE INDEX IF NOT EXISTS idx_credit_sales_due ON credit_sales(due_date)",
+
+    # GST invoices indexes
+    "CREATE INDEX IF NOT EXISTS idx_gst_invoices_date ON gst_invoices(invoice_date)",
+    "CREATE INDEX IF NOT EXISTS idx_gst_invoices_sale ON gst_invoices(sale_id)",
+
+    # User indexes
+    "CREATE INDEX IF NOT EXISTS idx_users_role ON users(role)",
+    "CREATE INDEX IF NOT EXISTS idx_users_status ON users(status)",
+
+    # Audit log indexes
+    "CREATE INDEX IF NOT EXISTS idx_audit_log_record ON audit_log(table_name, record_id)",
+    "CREATE INDEX IF NOT EXISTS idx_audit_log_user_time ON audit_log(user_id, timestamp)",
+
+    # Single-column indexes replaced by a composite with the same leading column
+    "DROP INDEX IF EXISTS idx_sales_customer",
+    "DROP INDEX IF EXISTS idx_sale_items_sale",
+    "DROP INDEX IF EXISTS idx_sale_items_product",
+    "DROP INDEX IF EXISTS idx_stock_movements_product",
+    "DROP INDEX IF EXISTS idx_credit_sales_status",
+
+    # Duplicates of the automatic index behind a UNIQUE column
+    "DROP INDEX IF EXISTS idx_products_code",
+    "DROP INDEX IF EXISTS idx_products_barcode",
+    "DROP INDEX IF EXISTS idx_customers_phone",
+    "DROP INDEX IF EXISTS idx_customers_cnic",
+    "DROP INDEX IF EXISTS idx_users_username",
+)
+
+# One-off data fixes, run with the indexes whenever the schema hash changes
+BACKFILL_SQL = (
+    # Copy customer name/phone onto sales recorded before the POS filled them in
+    """
+        UPDATE sales SET
+            customer_name = (SELECT full_name FROM customers WHERE id = sales.customer_id),
+            customer_phone = COALESCE(customer_phone, (SELECT phone FROM customers WHERE id = sales.customer_id))
+        WHERE customer_name IS NULL AND customer_id IS NOT NULL
+    """,
+)
+
+SCHEMA_DDL = TABLE_DDL + INDEX_DDL + BACKFILL_SQL
+
+# Fingerprint of SCHEMA_DDL, recorded in _schema_meta once it has been applied
+SCHEMA_HASH = hashlib.sha256("\n".join(SCHEMA_DDL).encode()).hexdigest()
+
+# Monthly audit archive files (ATTACHed as "archive"); no foreign keys,
+# since users only exists in the main database
+AUDIT_COLUMNS = (
+    "id, user_id, username, action, table_name, record_id, "
+    "old_values, new_values, ip_address, user_agent, timestamp"
+)
+AUDIT_ARCHIVE_DDL = """
+    CREATE TABLE IF NOT EXISTS archive.audit_log (
+        id INTEGER PRIMARY KEY,
+        user_id INTEGER,
+        username TEXT,
+        action TEXT NOT NULL,
+        table_name TEXT,
+        record_id INTEGER,
+        old_values TEXT,
+        new_values TEXT,
+        ip_address TEXT,
+        user_agent TEXT,
+        timestamp TIMESTAMP
+    )
+"""
+
+# ==================== SCHEMA DIFF ====================
+
+# Bookkeeping table holding SCHEMA_HASH once the schema has been applied
+SCHEMA_META_DDL = "CREATE TABLE IF NOT EXISTS _schema_meta (hash TEXT NOT NULL)"
+
+# Object named by a CREATE ... IF NOT EXISTS or DROP ... IF EXISTS statement
+_OBJECT_NAME_RE = re.compile(r"^\s*(CREATE|DROP)\s+(?:TABLE|INDEX)\s+IF\s+(?:NOT\s+)?EXISTS\s+(\w+)", re.IGNORECASE)
+
+
+def existing_objects(cursor) -> Set[str]:
+    """
+    Names of the tables and indexes already in the main database.
+    
+    Args:
+        cursor: Cursor on the main database
+        
+    Returns:
+        Set of table and index names
+    """
+    cursor.execute("SELECT name FROM sqlite_master WHERE type IN ('table', 'index')")
+    return {row[0] for row in cursor.fetchall()}
+
+
+def pending_statements(statements: Iterable[str], existing: Set[str]) -> List[str]:
+    """
+    Filter statements down to the ones that would change the schema.
+    
+    CREATE statements are kept when their object is missing, DROP
+    statements when it still exists; anything else (data fixes) is
+    always kept.
+    
+    Args:
+        statements: DDL statements, e.g. TABLE_DDL or INDEX_DDL
+        existing: Result of existing_objects()
+        
+    Returns:
+        Statements to execute, in their original order
+    """
+    pending = []
+    for statement in statements:
+        match = _OBJECT_NAME_RE.match(statement)
+        if match is None or (match.group(1).upper() == 'CREATE') != (match.group(2) in existing):
+            pending.append(statement)
+    return pending
@@ -5,7 +5,7 @@ SECURITY MIDDLEWARE FOR RATE LIMITING AND SECURITY HEADERS
 
 import time
 import threading
-from collections import defaultdict
+from collections import defaultdict, deque
 from datetime import datetime, timedelta
 from fastapi import Request, HTTPException
 
@@ -22,6 +22,27 @@ class SecurityMiddleware(BaseHTTPMiddleware):
     Adds security headers and logs security events.
     """
     
+    # SQL injection patterns in the URL (path and query params). Quote,
+    # comment and '#' markers are matched on their own, which also covers
+    # the older "'or" / "'union" / "=...'" forms. The "=...;" check is
+    # anchored at the first '=' so a URL full of '=' is scanned once, not
+    # once per '='
+    SQL_INJECTION_RE = re.compile("|".join(f"(?:{pattern})" for pattern in [
+        r"\%27|\'|\-\-|\%23|#",
+        r"\A(?:(?!\%3D)[^=])*+(?:\%3D|=).*(?:\%3B|;)"
+    ]), re.IGNORECASE)
+    
+    # XSS patterns (the script tag check is anchored the same way)
+    XSS_RE = re.compile("|".join(f"(?:{pattern})" for pattern in [
+        r"\A(?:(?!<script).)*+<script[^>]*+>.*</script>",
+        r"javascript:",
+        r"onerror=",
+        r"onload="
+    ]), re.IGNORECASE)
+    
+    # URLs longer than this are suspicious by themselves and not scanned
+    MAX_SCAN_LENGTH = 4096
+    
     async def dispatch(self, request: Request, call_next):
         # Get client IP
         client_ip = request.client.host if request.client else "unknown"
@@ -64,32 +85,10 @@ class SecurityMiddleware(BaseHTTPMiddleware):
         """
         Check if request looks suspicious.
         """
-        # Check for SQL injection patterns in query params
-        sql_patterns = [
-            r"(\%27)|(\')|(\-\-)|(\%23)|(#)",
-            r"((\%3D)|(=))[^\n]*((\%27)|(\')|(\-\-)|(\%3B)|(;))",
-            r"\w*((\%27)|(\'))((\%6F)|o|(\%4F))((\%72)|r|(\%52))",
-            r"((\%27)|(\'))union"
-        ]
-        
         path = str(request.url)
-        for pattern in sql_patterns:
-            if re.search(pattern, path, re.IGNORECASE):
-                return True
-        
-        # Check for XSS patterns
-        xss_patterns = [
-            r"<script.*?>.*?</script>",
-            r"javascript:",
-            r"onerror=",
-            r"onload="
-        ]
-        
-        for pattern in xss_patterns:
-            if re.search(pattern, path, re.IGNORECASE):
-                return True
-        
-        return False
+        if len(path) > self.MAX_SCAN_LENGTH:
+            return True
+        return bool(self.SQL_INJECTION_RE.search(path) or self.XSS_RE.search(path))
     
     def log_security_event(self, event_type: str, details: dict):
         """
@@ -106,12 +105,19 @@ class RateLimitMiddleware(BaseHTTPMiddleware):
     Rate limiting middleware.
     """
     
+    SHARD_COUNT = 16
+    
     def __init__(self, app, max_requests: int = 100, window_seconds: int = 60):
         super().__init__(app)
         self.max_requests = max_requests
         self.window_seconds = window_seconds
-        self.requests = defaultdict(list)
-        self.lock = threading.Lock()
+        # Last max_requests request times per IP; the oldest falls off the
+        # left. IPs are striped over shards so unrelated clients don't
+        # share a lock
+        self.shards = [
+            (threading.Lock(), defaultdict(lambda: deque(maxlen=self.max_requests)))
+            for _ in range(self.SHARD_COUNT)
+        ]
         
         # Exclude these paths from rate limiting
         self.excluded_paths = ["/health", "/auth/login"]
@@ -124,18 +130,15 @@ class RateLimitMiddleware(BaseHTTPMiddleware):
             
             client_ip = request.client.host if request.client else "unknown"
             
-            with self.lock:
+            lock, requests = self.shards[hash(client_ip) % self.SHARD_COUNT]
+            with lock:
                 now = time.time()
                 window_start = now - self.window_seconds
                 
-                # Clean old requests
-                self.requests[client_ip] = [
-                    req_time for req_time in self.requests[client_ip]
-                    if req_time > window_start
-                ]
+                recent = requests[client_ip]
                 
-                # Check rate limit
-                if len(self.requests[client_ip]) >= self.max_requests:
+                # Check rate limit: full ring whose oldest entry is in the window
+                if len(recent) == self.max_requests and recent[0] > window_start:
                     logger.warning(f"Rate limit exceeded for IP: {client_ip}")
                     raise HTTPException(
                         status_code=429,
@@ -143,7 +146,7 @@ class RateLimitMiddleware(BaseHTTPMiddleware):
                     )
                 
                 # Add current request
-                self.requests[client_ip].append(now)
+                recent.append(now)
             
             return await call_next(request)
         except HTTPException:
@@ -4,6 +4,7 @@ Supports ESC/POS cash drawer control
 """
 
 import logging
+import threading
 
 logger = logging.getLogger(__name__)
 
@@ -11,6 +12,9 @@ logger = logging.getLogger(__name__)
 class CashDrawer:
     """Cash drawer control driver."""
     
+    # ESC/POS cash drawer open command (pulse pin 2)
+    OPEN_COMMAND = b'\x1b\x70\x00\x19\xfa'
+    
     def __init__(self, printer_port='COM1'):
         self.printer_port = printer_port
         self.is_connected = False
@@ -41,11 +45,8 @@ class CashDrawer:
             return False
         
         try:
-            # ESC/POS cash drawer open command
-            command = b'\x1b\x70\x00\x19\xfa'
-            
             if self.printer:
-                self.printer.write(command)
+                self.printer.write(self.OPEN_COMMAND)
             
             logger.info("Cash drawer opened")
             return True
@@ -53,6 +54,18 @@ class CashDrawer:
             logger.error(f"Error opening cash drawer: {e}")
             return False
     
+    def queue_open(self):
+        """
+        Open the cash drawer with the printer's next write (e.g. the receipt),
+        so the kick and the print go out as one transfer.
+        """
+        if not self.is_connected or not self.printer:
+            logger.warning("Cash drawer not connected")
+            return False
+        
+        self.printer.queue(self.OPEN_COMMAND)
+        return True
+    
     def check_status(self):
         """Check if cash drawer is open."""
         try:
@@ -74,14 +87,18 @@ class CashDrawer:
 
 # Cash drawer instance (singleton pattern)
 _drawer_instance = None
+_drawer_lock = threading.Lock()
 
 
 def get_cash_drawer(printer_port='COM1'):
-    """Get or create cash drawer instance."""
+    """Get or create cash drawer instance (connected once, even under concurrent first calls)."""
     global _drawer_instance
     if _drawer_instance is None:
-        _drawer_instance = CashDrawer(printer_port)
-        _drawer_instance.connect()
+        with _drawer_lock:
+            if _drawer_instance is None:
+                drawer = CashDrawer(printer_port)
+                drawer.connect()
+                _drawer_instance = drawer
     return _drawer_instance
 
 
@@ -17,10 +17,13 @@ class ThermalPrinter:
         self.port = port
         self.width = width  # 80mm or 58mm
         self.is_connected = False
+        self.pending = b''  # Commands sent ahead of the next write
         self.connect()
     
     def connect(self):
         """Establish connection to printer."""
+        # Queued commands belonged to the previous connection's job
+        self.pending = b''
         try:
             if platform.system() == 'Windows':
                 import win32print
@@ -51,8 +54,19 @@ class ThermalPrinter:
         except Exception as e:
             logger.error(f"Error closing printer: {e}")
     
+    def queue(self, data):
+        """Hold raw data to be sent in front of the next write."""
+        self.pending += data
+    
     def write(self, data):
-        """Send raw data to printer."""
+        """
+        Send raw data (after anything queued) to printer.
+        
+        Queued commands are dropped if the write fails, so e.g. a drawer
+        kick can't fire later with some other sale's receipt.
+        """
+        data, self.pending = self.pending + data, b''
+        
         if not self.is_connected:
             logger.warning("Printer not connected")
             return False
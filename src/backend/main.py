@@ -15,7 +15,8 @@ import logging
 sys.path.insert(0, str(Path(__file__).parent))
 
 from core.security import middleware
-from core.logger import setup_logging
+from core.logger import setup_logging, start_audit_writer, stop_audit_writer
+from core.auth import start_session_activity_flusher, stop_session_activity_flusher
 from api.auth import router as auth_router
 from api.products import router as products_router
 from api.customers import router as customers_router
@@ -142,6 +143,12 @@ async def startup_event():
         # Initialize database
         db_manager.initialize_database()
         
+        # Background audit writer (keeps audit inserts off request paths)
+        start_audit_writer()
+        
+        # Batched session last_activity updates
+        start_session_activity_flusher()
+        
         # Ensure local backups directory exists (for user visibility)
         local_backups = Path.cwd() / "backups"
         local_backups.mkdir(exist_ok=True)
@@ -168,10 +175,10 @@ async def startup_event():
                     
                     # Also copy to local backups folder for user visibility
                     if internal_path_str:
-                        import shutil
+                        from core.file_manager import fast_copy
                         internal_path = Path(internal_path_str)
                         if internal_path.exists():
-                            shutil.copy2(internal_path, local_backups / f"{backup_name}.db")
+                            fast_copy(internal_path, local_backups / f"{backup_name}.db")
                             logger.info(f"Copied auto-backup to {local_backups}")
                 except Exception as e:
                      logger.error(f"Backup copy failed: {e}")
@@ -191,6 +198,10 @@ async def startup_event():
 @app.on_event("shutdown")
 async def shutdown_event():
     """Close database connections on shutdown."""
+    # Flush queued audit entries and session activity while connections are still available
+    await stop_audit_writer()
+    await stop_session_activity_flusher()
+    
     try:
         from core.database import get_database_manager
         
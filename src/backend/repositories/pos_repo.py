@@ -319,9 +319,9 @@ class ProductRepository:
                 
                 # Apply pagination
                 offset = (page - 1) * page_size
-                query += f" ORDER BY p.created_at DESC LIMIT {page_size} OFFSET {offset}"
+                query += " ORDER BY p.created_at DESC LIMIT ? OFFSET ?"
                 
-                cursor.execute(query, query_params)
+                cursor.execute(query, query_params + [page_size, offset])
                 products = [dict(row) for row in cursor.fetchall()]
                 
                 return {
@@ -387,10 +387,9 @@ class ProductRepository:
                 cursor.execute('''
                     SELECT si.sale_id, s.invoice_number, s.invoice_date,
                            si.quantity, si.unit_price, si.line_total,
-                           c.full_name as customer_name
+                           s.customer_name
                     FROM sale_items si
                     JOIN sales s ON si.sale_id = s.id
-                    LEFT JOIN customers c ON s.customer_id = c.id
                     WHERE si.product_id = ?
                     ORDER BY s.invoice_date DESC
                     LIMIT 50
@@ -885,9 +884,9 @@ class ProductRepository:
                 
                 # Get data
                 query += " ORDER BY sm.created_at DESC"
-                query += f" LIMIT {page_size} OFFSET {(page - 1) * page_size}"
+                query += " LIMIT ? OFFSET ?"
                 
-                cursor.execute(query, query_params)
+                cursor.execute(query, query_params + [page_size, (page - 1) * page_size])
                 movements = [dict(row) for row in cursor.fetchall()]
                 
                 return {
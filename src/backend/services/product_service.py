@@ -10,9 +10,9 @@ import logging
 import json
 
 from repositories.product_repo import get_product_repository
-from utils.validators import validate_product_data, validate_category_data
+from utils.validators import validate_product_data, validate_category_data, validate_movement_type
 from utils.calculations import calculate_profit_margin, calculate_gst_amount
-from core.logger import audit_log
+from core.logger import queue_audit_log
 
 logger = logging.getLogger(__name__)
 
@@ -60,7 +60,7 @@ class ProductService:
             category = self.repo.create_category(category_data, user_id)
             
             # Log audit trail
-            audit_log(
+            queue_audit_log(
                 user_id=user_id,
                 action="create_category",
                 table_name="categories",
@@ -93,7 +93,7 @@ class ProductService:
             updated_category = self.repo.update_category(category_id, category_data)
             
             # Log audit trail
-            audit_log(
+            queue_audit_log(
                 user_id=user_id,
                 action="update_category",
                 table_name="categories",
@@ -204,7 +204,7 @@ class ProductService:
             )
             
             # Log audit trail
-            audit_log(
+            queue_audit_log(
                 user_id=user_id,
                 action="create_product",
                 table_name="products",
@@ -271,7 +271,7 @@ class ProductService:
             )
             
             # Log audit trail
-            audit_log(
+            queue_audit_log(
                 user_id=user_id,
                 action="update_product",
                 table_name="products",
@@ -300,6 +300,7 @@ class ProductService:
             # Validate adjustment
             if quantity == 0:
                 raise ValueError("Quantity cannot be zero")
+            validate_movement_type(movement_type)
             
             # Perform stock adjustment
             result = self.repo.update_product_stock(
@@ -320,7 +321,7 @@ class ProductService:
                 logger.warning(f"Product {product_id} is now low on stock: {product['current_stock']} units")
             
             # Log audit trail
-            audit_log(
+            queue_audit_log(
                 user_id=user_id,
                 action="adjust_stock",
                 table_name="products",
@@ -464,7 +465,7 @@ class ProductService:
                     })
             
             # Log bulk import
-            audit_log(
+            queue_audit_log(
                 user_id=user_id,
                 action="bulk_import_products",
                 table_name="products",
@@ -553,7 +554,7 @@ class ProductService:
             )
             
             # Log audit trail
-            audit_log(
+            queue_audit_log(
                 user_id=user_id,
                 action="bulk_update_prices",
                 table_name="products",
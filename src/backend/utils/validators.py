@@ -6,6 +6,9 @@ They perform light checks and raise ValueError on invalid input.
 """
 from typing import Dict, Any
 
+# stock_movements.movement_type values (not CHECK-constrained in the schema)
+STOCK_MOVEMENT_TYPES = ('purchase', 'sale', 'return', 'adjustment', 'damage', 'transfer', 'production')
+
 
 def validate_product_data(data: Dict[str, Any]):
 	if not isinstance(data, dict):
@@ -29,6 +32,12 @@ def validate_category_data(data: Dict[str, Any]):
 		raise ValueError("name is required")
 
 
+def validate_movement_type(movement_type: str):
+	"""Validate a stock movement type."""
+	if movement_type not in STOCK_MOVEMENT_TYPES:
+		raise ValueError(f"Invalid movement_type: {movement_type}")
+
+
 def validate_customer_data(data: Dict[str, Any]):
 	"""Validate customer data."""
 	if not isinstance(data, dict):
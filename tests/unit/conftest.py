@@ -0,0 +1,18 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+# Backend modules import each other as top-level packages (core, api, ...)
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "src" / "backend"))
+
+from core.database import DatabaseManager
+
+
+@pytest.fixture
+def db_manager(tmp_path):
+    """Initialized DatabaseManager on a throwaway data directory."""
+    manager = DatabaseManager(tmp_path)
+    manager.initialize_database()
+    yield manager
+    manager.close_all_connections()
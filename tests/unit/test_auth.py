@@ -0,0 +1,209 @@
+import pytest
+from fastapi import FastAPI, HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+from fastapi.testclient import TestClient
+
+import core.database
+
+
+@pytest.fixture
+def auth(db_manager, monkeypatch):
+    """core.auth bound to the throwaway database, with an empty user cache."""
+    # core.auth builds its AuthenticationManager from the singleton on import
+    monkeypatch.setattr(core.database, "_db_instance", db_manager)
+    from core import auth
+
+    monkeypatch.setattr(auth.auth_manager, "db_manager", db_manager)
+    monkeypatch.setattr(auth, "_ENV_DEV", False)
+    auth.invalidate_user_cache()
+    yield auth
+    auth.invalidate_user_cache()
+
+
+@pytest.fixture
+def client(auth):
+    """TestClient over the auth and user management routers."""
+    from api.auth import router as auth_router
+    from api.users import router as users_router
+    from core.logger import start_audit_writer, stop_audit_writer
+
+    app = FastAPI()
+    app.include_router(auth_router)
+    app.include_router(users_router)
+    # As in main.py: without the writer, audit entries are written inline
+    app.add_event_handler("startup", start_audit_writer)
+    app.add_event_handler("shutdown", stop_audit_writer)
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+def _add_user(db_manager, auth, username, role):
+    password_hash, _ = auth.AuthenticationManager.hash_password("secret123")
+    with db_manager.get_cursor() as cursor:
+        cursor.execute(
+            "INSERT INTO users (username, password_hash, full_name, role) VALUES (?, ?, ?, ?)",
+            (username, password_hash, username.title(), role),
+        )
+        return cursor.lastrowid
+
+
+def _login(client, username, password):
+    response = client.post("/auth/login", json={"username": username, "password": password})
+    assert response.status_code == 200, response.text
+    body = response.json()
+    return {
+        "Authorization": f"Bearer {body['access_token']}",
+        "X-Session-Token": body["user"]["session_token"],
+    }
+
+
+def test_current_user_is_cached_until_invalidated(client, auth, db_manager):
+    user_id = _add_user(db_manager, auth, "ali", "munshi")
+    headers = _login(client, "ali", "secret123")
+    assert client.get("/auth/me", headers=headers).json()["role"] == "munshi"
+
+    # A write that skips invalidation is masked by the cached lookup
+    with db_manager.get_cursor() as cursor:
+        cursor.execute("UPDATE users SET role = 'shop_boy' WHERE id = ?", (user_id,))
+    assert client.get("/auth/me", headers=headers).json()["role"] == "munshi"
+
+    auth.invalidate_user_cache(user_id)
+    assert client.get("/auth/me", headers=headers).json()["role"] == "shop_boy"
+
+
+def test_demoted_user_sees_new_role_on_next_request(client, auth, db_manager):
+    user_id = _add_user(db_manager, auth, "ali", "malik")
+    admin = _login(client, "admin", "admin123")
+    ali = _login(client, "ali", "secret123")
+    me = client.get("/auth/me", headers=ali).json()
+    assert me["role"] == "malik"
+    assert me["can_manage_users"]
+
+    response = client.put(f"/users/{user_id}", json={"role": "shop_boy"}, headers=admin)
+    assert response.status_code == 200, response.text
+
+    me = client.get("/auth/me", headers=ali).json()
+    assert me["role"] == "shop_boy"
+    assert not me["can_manage_users"]
+    assert client.get("/users/", headers=ali).status_code == 403
+
+
+def test_undecodable_token_is_rejected_without_decoding_again(auth, monkeypatch):
+    calls = []
+    real_decode = auth.auth_manager.decode_token
+
+    def counting_decode(token):
+        calls.append(token)
+        return real_decode(token)
+
+    monkeypatch.setattr(auth.auth_manager, "decode_token", counting_decode)
+    credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials="not-a-jwt")
+
+    for _ in range(2):
+        with pytest.raises(HTTPException) as excinfo:
+            auth.asyncio.run(auth.get_current_user(credentials, None))
+        assert excinfo.value.status_code == 401
+
+    assert calls == ["not-a-jwt"]
+
+
+def test_user_list_pages_by_keyset(client, auth, db_manager):
+    for index in range(5):
+        _add_user(db_manager, auth, f"clerk{index}", "shop_boy")
+    admin = _login(client, "admin", "admin123")
+
+    everyone = client.get("/auth/users", headers=admin).json()
+    assert everyone["next_cursor"] is None
+    all_ids = [user["id"] for user in everyone["users"]]
+    assert len(all_ids) == 6
+    assert all_ids == sorted(all_ids, reverse=True)
+
+    first = client.get("/auth/users", params={"limit": 4}, headers=admin).json()
+    assert [user["id"] for user in first["users"]] == all_ids[:4]
+    assert first["next_cursor"] == all_ids[3]
+
+    second = client.get(
+        "/auth/users", params={"limit": 4, "after_id": first["next_cursor"]}, headers=admin
+    ).json()
+    assert [user["id"] for user in second["users"]] == all_ids[4:]
+    assert second["next_cursor"] is None
+
+
+@pytest.mark.parametrize("has_returning", [True, False], ids=["returning", "update-then-select"])
+def test_update_user_returns_the_updated_row(client, auth, db_manager, monkeypatch, has_returning):
+    monkeypatch.setattr(auth, "SQLITE_HAS_RETURNING", has_returning)
+    user_id = _add_user(db_manager, auth, "ali", "munshi")
+    admin = _login(client, "admin", "admin123")
+    ali = _login(client, "ali", "secret123")
+    assert client.get("/auth/me", headers=ali).status_code == 200
+
+    response = client.put(
+        f"/auth/users/{user_id}", json={"full_name": "Ali Raza", "status": "inactive"}, headers=admin
+    )
+    assert response.status_code == 200, response.text
+    user = response.json()["user"]
+    assert (user["id"], user["full_name"], user["status"], user["role"]) == (
+        user_id, "Ali Raza", "inactive", "munshi"
+    )
+    assert user["role_name"]
+    assert "password_hash" not in user
+
+    # No fields to change still answers with the stored row
+    unchanged = client.put(f"/auth/users/{user_id}", json={}, headers=admin).json()["user"]
+    assert unchanged["full_name"] == "Ali Raza"
+
+    assert client.get("/auth/me", headers=ali).status_code == 401
+    assert client.put("/auth/users/9999", json={"full_name": "Nobody"}, headers=admin).status_code == 404
+
+
+@pytest.mark.parametrize("has_returning", [True, False], ids=["returning", "select-then-update"])
+def test_terminate_session_checks_ownership(client, auth, db_manager, monkeypatch, has_returning):
+    monkeypatch.setattr(auth, "SQLITE_HAS_RETURNING", has_returning)
+    _add_user(db_manager, auth, "ali", "shop_boy")
+    _add_user(db_manager, auth, "sara", "shop_boy")
+    admin = _login(client, "admin", "admin123")
+    ali = _login(client, "ali", "secret123")
+    sara = _login(client, "sara", "secret123")
+
+    def terminate(token, headers):
+        return client.delete(f"/auth/sessions/{token}", headers=headers).status_code
+
+    assert terminate(ali["X-Session-Token"], sara) == 403
+    assert terminate("no-such-session", sara) == 404
+    assert client.get("/auth/me", headers=ali).status_code == 200
+
+    assert terminate(sara["X-Session-Token"], sara) == 200
+    assert client.get("/auth/me", headers=sara).status_code == 401
+    assert terminate(sara["X-Session-Token"], admin) == 404
+
+    assert terminate(ali["X-Session-Token"], admin) == 200
+    assert client.get("/auth/me", headers=ali).status_code == 401
+
+
+def test_restore_forgets_cached_users(auth, db_manager):
+    auth._USER_CACHE.set("cached-login", {"id": 1, "role": "malik"})
+    backup_path = db_manager.backup_database("before_restore")
+
+    assert db_manager.restore_database(backup_path)
+    assert len(auth._USER_CACHE) == 0
+
+
+def test_stopping_the_activity_flusher_writes_the_batch_in_hand(auth, db_manager):
+    with db_manager.get_cursor() as cursor:
+        cursor.execute(
+            "INSERT INTO user_sessions (user_id, session_token, last_activity, expiry_time) "
+            "VALUES (1, 'tok', '2000-01-01 00:00:00', '2999-01-01 00:00:00')"
+        )
+
+    async def touch_then_stop():
+        auth.start_session_activity_flusher()
+        auth.queue_session_activity("tok")
+        # Let the flusher take the token and start waiting out the flush delay
+        await auth.asyncio.sleep(0)
+        await auth.stop_session_activity_flusher()
+
+    auth.asyncio.run(touch_then_stop())
+
+    with db_manager.get_cursor(readonly=True) as cursor:
+        cursor.execute("SELECT last_activity FROM user_sessions WHERE session_token = 'tok'")
+        assert cursor.fetchone()[0] != "2000-01-01 00:00:00"
@@ -0,0 +1,84 @@
+import core.cache
+from core.cache import TTLCache, RotatingSet
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def _use_clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(core.cache.time, "monotonic", clock)
+    return clock
+
+
+def test_ttl_cache_expires_entries(monkeypatch):
+    clock = _use_clock(monkeypatch)
+    cache = TTLCache(maxsize=10, ttl=30)
+
+    cache.set("a", 1)
+    cache.set("b", 2, ttl=5)
+    clock.now += 10
+
+    assert cache.get("a") == 1
+    assert cache.get("b", "missing") == "missing"
+
+    clock.now += 25
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_ttl_cache_caps_per_entry_ttl_and_size(monkeypatch):
+    clock = _use_clock(monkeypatch)
+    cache = TTLCache(maxsize=2, ttl=30)
+
+    cache.set("long", 1, ttl=300)
+    clock.now += 31
+    assert cache.get("long") is None
+
+    for key in ("a", "b", "c"):
+        cache.set(key, key)
+    assert cache.get("a") is None
+    assert cache.get("c") == "c"
+
+
+def test_ttl_cache_discard_where():
+    cache = TTLCache()
+    cache.set(1, {"user_id": 7})
+    cache.set(2, {"user_id": 8})
+    cache.set(3, {"user_id": 7})
+
+    assert cache.discard_where(lambda value: value["user_id"] == 7) == 2
+    assert cache.get(1) is None and cache.get(3) is None
+    assert cache.get(2) == {"user_id": 8}
+
+
+def test_rotating_set_forgets_after_two_rotations(monkeypatch):
+    clock = _use_clock(monkeypatch)
+    seen = RotatingSet(rotate_seconds=60)
+
+    seen.add("token")
+    clock.now += 61
+    # First rotation: still remembered through the previous generation
+    assert "token" in seen
+
+    clock.now += 61
+    assert "token" not in seen
+
+
+def test_rotating_set_rotates_when_full():
+    seen = RotatingSet(rotate_seconds=3600, maxsize=2)
+
+    seen.add("a")
+    seen.add("b")
+    seen.add("c")  # current is full: {"a", "b"} becomes the previous generation
+    assert "a" in seen and "c" in seen
+
+    seen.add("d")
+    seen.add("e")  # {"c", "d"} rotates out {"a", "b"}
+    assert "a" not in seen
+    assert "c" in seen and "e" in seen
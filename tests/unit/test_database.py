@@ -0,0 +1,139 @@
+import pytest
+
+from core.database import sqlite3
+
+
+def _category_codes(db_manager):
+    with db_manager.get_cursor(readonly=True) as cursor:
+        cursor.execute("SELECT category_code FROM categories WHERE category_code LIKE 'ZZ%'")
+        return {row[0] for row in cursor.fetchall()}
+
+
+def _page_size(db_manager):
+    with db_manager.get_cursor(readonly=True) as cursor:
+        return cursor.execute("PRAGMA page_size").fetchone()[0]
+
+
+def test_restore_backup_with_4096_byte_pages(db_manager):
+    with db_manager.get_cursor() as cursor:
+        cursor.execute("INSERT INTO categories (category_code, name) VALUES ('ZZ1', 'Before')")
+    backup_path = db_manager.backup_database("before")
+
+    # Backups taken before 8192-byte pages (and the shipped pos_main.db) use 4096
+    conn = sqlite3.connect(backup_path)
+    conn.execute("PRAGMA journal_mode = DELETE")
+    conn.execute("PRAGMA page_size = 4096")
+    conn.execute("VACUUM")
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.close()
+
+    with db_manager.get_cursor() as cursor:
+        cursor.execute("INSERT INTO categories (category_code, name) VALUES ('ZZ2', 'After')")
+    assert _page_size(db_manager) == 8192
+
+    assert db_manager.restore_database(backup_path)
+
+    assert _page_size(db_manager) == 4096
+    assert _category_codes(db_manager) == {"ZZ1"}
+    assert db_manager.maintenance_thread.is_alive()
+
+    # Writes through the pool and the writer thread work on the restored file
+    assert db_manager.submit_write(
+        "INSERT INTO categories (category_code, name) VALUES ('ZZ3', 'Queued')"
+    ).result(timeout=10) == 1
+    assert _category_codes(db_manager) == {"ZZ1", "ZZ3"}
+
+
+def test_backup_restore_round_trip(db_manager):
+    with db_manager.get_cursor() as cursor:
+        cursor.execute("INSERT INTO categories (category_code, name) VALUES ('ZZ1', 'Before')")
+    backup_path = db_manager.backup_database("round_trip")
+
+    with db_manager.get_cursor() as cursor:
+        cursor.execute("DELETE FROM categories WHERE category_code = 'ZZ1'")
+        cursor.execute("INSERT INTO categories (category_code, name) VALUES ('ZZ2', 'After')")
+
+    assert db_manager.restore_database(backup_path)
+
+    assert _page_size(db_manager) == 8192
+    assert _category_codes(db_manager) == {"ZZ1"}
+    with db_manager.get_cursor(readonly=True) as cursor:
+        cursor.execute("SELECT backup_type FROM backup_history")
+        assert [row[0] for row in cursor.fetchall()] == ["restore"]
+
+
+def test_close_all_connections_stops_wal_maintenance(db_manager):
+    thread = db_manager.maintenance_thread
+    assert thread.is_alive()
+
+    db_manager.close_all_connections()
+
+    assert not thread.is_alive()
+    assert db_manager.maintenance_thread is None
+
+
+def test_archive_audit_log_moves_old_months(db_manager):
+    rows = [
+        (1, "old_january", "2020-01-15 10:00:00"),
+        (1, "old_january", "2020-01-20 10:00:00"),
+        (1, "old_february", "2020-02-03 10:00:00"),
+        (1, "recent", "2999-01-01 10:00:00"),
+    ]
+    with db_manager.get_cursor() as cursor:
+        cursor.executemany("INSERT INTO audit_log (user_id, action, timestamp) VALUES (?, ?, ?)", rows)
+
+    assert db_manager.archive_audit_log(keep_months=3) == 3
+
+    with db_manager.get_cursor(readonly=True) as cursor:
+        cursor.execute("SELECT action FROM audit_log")
+        assert [row[0] for row in cursor.fetchall()] == ["recent"]
+
+    for month, expected in (("202001", ["old_january", "old_january"]), ("202002", ["old_february"])):
+        conn = sqlite3.connect(db_manager.audit_archive_dir / f"audit_{month}.db")
+        assert [row[0] for row in conn.execute("SELECT action FROM audit_log ORDER BY id")] == expected
+        conn.close()
+
+    # A second run finds nothing left to move
+    assert db_manager.archive_audit_log(keep_months=3) == 0
+
+
+def test_backup_and_restore_carry_audit_archives(db_manager):
+    with db_manager.get_cursor() as cursor:
+        cursor.executemany(
+            "INSERT INTO audit_log (user_id, action, timestamp) VALUES (?, ?, ?)",
+            [(1, "archived", "2020-01-15 10:00:00"), (1, "recent", "2999-01-01 10:00:00")],
+        )
+    assert db_manager.archive_audit_log(keep_months=3) == 1
+    backup_path = db_manager.backup_database("with_archive")
+
+    # A month archived after the backup is dropped again by the restore
+    with db_manager.get_cursor() as cursor:
+        cursor.execute("INSERT INTO audit_log (user_id, action, timestamp) VALUES (1, 'later', '2020-02-01 10:00:00')")
+        cursor.execute("INSERT INTO audit_log (user_id, action, timestamp) VALUES (1, 'newest', '2999-02-01 10:00:00')")
+    assert db_manager.archive_audit_log(keep_months=3) == 1
+    (db_manager.audit_archive_dir / "audit_202001.db").unlink()
+
+    assert db_manager.restore_database(backup_path)
+
+    assert sorted(path.name for path in db_manager.audit_archive_dir.iterdir()) == ["audit_202001.db"]
+    conn = sqlite3.connect(db_manager.audit_archive_dir / "audit_202001.db")
+    assert [row[0] for row in conn.execute("SELECT action FROM audit_log")] == ["archived"]
+    conn.close()
+
+
+def test_failed_queued_write_rolls_back_only_itself(db_manager):
+    insert = "INSERT INTO categories (category_code, name) VALUES (?, ?)"
+
+    # Hold the writer so the next writes queue up and share one transaction
+    db_manager.initialized_event.clear()
+    first = db_manager.submit_write(insert, ("ZZ1", "First"))
+    # ZZ2 goes in before the duplicate ZZ1 fails; the savepoint undoes it
+    failing = db_manager.submit_write(insert, [("ZZ2", "Second"), ("ZZ1", "Duplicate")], many=True)
+    last = db_manager.submit_write(insert, ("ZZ3", "Third"))
+    db_manager.initialized_event.set()
+
+    assert first.result(timeout=10) == 1
+    with pytest.raises(sqlite3.IntegrityError):
+        failing.result(timeout=10)
+    assert last.result(timeout=10) == 1
+    assert _category_codes(db_manager) == {"ZZ1", "ZZ3"}
@@ -0,0 +1,27 @@
+import os
+
+import core.file_manager
+from core.file_manager import fast_copy
+
+
+def test_fast_copy_copies_content_and_mtime(tmp_path):
+    source = tmp_path / "source.db"
+    source.write_bytes(os.urandom(64 * 1024))
+    os.utime(source, (1_600_000_000, 1_600_000_000))
+
+    destination = tmp_path / "copy.db"
+    assert fast_copy(source, destination) == str(destination)
+
+    assert destination.read_bytes() == source.read_bytes()
+    assert destination.stat().st_mtime == source.stat().st_mtime
+
+
+def test_fast_copy_falls_back_to_shutil(tmp_path, monkeypatch):
+    monkeypatch.setattr(core.file_manager, "_reflink", lambda src, dst: False)
+    source = tmp_path / "source.db"
+    source.write_bytes(b"pos data")
+
+    destination = tmp_path / "copy.db"
+    fast_copy(source, destination)
+
+    assert destination.read_bytes() == b"pos data"
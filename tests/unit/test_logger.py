@@ -0,0 +1,69 @@
+import asyncio
+import queue
+
+import pytest
+
+import core.database
+from core import logger
+
+
+@pytest.fixture
+def audit_db(db_manager, monkeypatch):
+    """Audit writes go to the throwaway database; no writer thread running."""
+    monkeypatch.setattr(core.database, "_db_instance", db_manager)
+    monkeypatch.setattr(logger, "_audit_writer_thread", None)
+    monkeypatch.setattr(logger, "_audit_queue", queue.Queue(maxsize=logger.AUDIT_QUEUE_MAXSIZE))
+    return db_manager
+
+
+def _queue_entry(record_id):
+    logger.queue_audit_log(
+        user_id=1,
+        action="test_action",
+        table_name="products",
+        record_id=record_id,
+        old_values=None,
+        new_values={"record": record_id},
+        ip_address=None,
+        user_agent=None,
+    )
+
+
+def _audited_records(db_manager):
+    with db_manager.get_cursor(readonly=True) as cursor:
+        cursor.execute("SELECT record_id FROM audit_log WHERE action = 'test_action' ORDER BY record_id")
+        return [row[0] for row in cursor.fetchall()]
+
+
+def test_queue_audit_log_writes_inline_without_writer(audit_db):
+    _queue_entry(1)
+    assert _audited_records(audit_db) == [1]
+
+
+def test_queue_audit_log_writes_inline_when_queue_is_full(audit_db, monkeypatch):
+    class StalledWriter:
+        def is_alive(self):
+            return True
+
+    full_queue = queue.Queue(maxsize=1)
+    full_queue.put(("queued",))
+    monkeypatch.setattr(logger, "_audit_queue", full_queue)
+    monkeypatch.setattr(logger, "_audit_writer_thread", StalledWriter())
+
+    _queue_entry(2)
+    assert _audited_records(audit_db) == [2]
+    assert full_queue.qsize() == 1
+
+
+def test_stop_audit_writer_drains_the_queue(audit_db):
+    logger.start_audit_writer()
+    thread = logger._audit_writer_thread
+    # More than one batch, so the drain spans several executemany calls
+    for record_id in range(logger.AUDIT_BATCH_SIZE * 2 + 1):
+        _queue_entry(record_id)
+
+    asyncio.run(logger.stop_audit_writer())
+
+    assert not thread.is_alive()
+    assert logger._audit_writer_thread is None
+    assert _audited_records(audit_db) == list(range(logger.AUDIT_BATCH_SIZE * 2 + 1))
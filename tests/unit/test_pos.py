@@ -0,0 +1,74 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+import core.database
+
+CASHIER = {"id": 1, "username": "admin"}
+
+
+@pytest.fixture(params=[True, False], ids=["returning", "select-then-update"])
+def pos(request, db_manager, monkeypatch):
+    """api.pos on the throwaway database, with and without UPDATE ... RETURNING."""
+    monkeypatch.setattr(core.database, "_db_instance", db_manager)
+    from api import pos
+
+    monkeypatch.setattr(pos, "SQLITE_HAS_RETURNING", request.param)
+    return pos
+
+
+@pytest.fixture
+def product_id(db_manager):
+    with db_manager.get_cursor() as cursor:
+        cursor.execute(
+            "INSERT INTO products (product_code, name, category_id, cost_price, retail_price, current_stock) "
+            "VALUES ('ZZ-OIL', 'Engine Oil', (SELECT id FROM categories LIMIT 1), 100, 150, 10)"
+        )
+        return cursor.lastrowid
+
+
+def _sell(pos, lines):
+    items = [
+        {"product_id": product_id, "quantity": quantity, "unit_price": 150, "total_price": 150 * quantity}
+        for product_id, quantity in lines
+    ]
+    return asyncio.run(pos.create_pos_transaction(
+        {"items": items, "total_amount": sum(item["total_price"] for item in items), "payment_type": "cash"},
+        CASHIER,
+    ))
+
+
+def _stock(db_manager, product_id):
+    with db_manager.get_cursor(readonly=True) as cursor:
+        return cursor.execute("SELECT current_stock FROM products WHERE id = ?", (product_id,)).fetchone()[0]
+
+
+def test_sale_takes_stock_and_records_movements(pos, db_manager, product_id):
+    sale_id = _sell(pos, [(product_id, 2), (product_id, 1)])["sale_id"]
+
+    assert _stock(db_manager, product_id) == 7
+    with db_manager.get_cursor(readonly=True) as cursor:
+        cursor.execute(
+            "SELECT quantity, previous_quantity, new_quantity FROM stock_movements "
+            "WHERE reference_id = ? ORDER BY id", (sale_id,)
+        )
+        assert [tuple(row) for row in cursor.fetchall()] == [(-2, 10, 8), (-1, 8, 7)]
+        cursor.execute(
+            "SELECT product_code, product_name, cost_price, line_profit FROM sale_items "
+            "WHERE sale_id = ? ORDER BY id", (sale_id,)
+        )
+        assert [tuple(row) for row in cursor.fetchall()] == [
+            ("ZZ-OIL", "Engine Oil", 100, 100),
+            ("ZZ-OIL", "Engine Oil", 100, 50),
+        ]
+
+
+def test_unknown_product_rolls_back_the_sale(pos, db_manager, product_id):
+    with pytest.raises(HTTPException) as excinfo:
+        _sell(pos, [(product_id, 2), (999_999, 1)])
+    assert "999999 not found" in excinfo.value.detail
+
+    assert _stock(db_manager, product_id) == 10
+    with db_manager.get_cursor(readonly=True) as cursor:
+        assert cursor.execute("SELECT COUNT(*) FROM sales").fetchone()[0] == 0
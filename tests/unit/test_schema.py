@@ -0,0 +1,76 @@
+import core.database
+from core.database import DatabaseManager
+from core.schema import (
+    TABLE_DDL,
+    INDEX_DDL,
+    SCHEMA_HASH,
+    existing_objects,
+    pending_statements,
+)
+
+
+def test_pending_statements_keeps_only_changes():
+    existing = {"users", "idx_old"}
+    statements = [
+        "CREATE TABLE IF NOT EXISTS users (id INTEGER PRIMARY KEY)",
+        "CREATE TABLE IF NOT EXISTS products (id INTEGER PRIMARY KEY)",
+        "DROP INDEX IF EXISTS idx_old",
+        "DROP INDEX IF EXISTS idx_gone",
+        "UPDATE sales SET customer_name = NULL",
+    ]
+
+    assert pending_statements(statements, existing) == [
+        "CREATE TABLE IF NOT EXISTS products (id INTEGER PRIMARY KEY)",
+        "DROP INDEX IF EXISTS idx_old",
+        "UPDATE sales SET customer_name = NULL",
+    ]
+
+
+def test_fresh_database_gets_full_schema(db_manager):
+    with db_manager.get_cursor(readonly=True) as cursor:
+        assert cursor.execute("SELECT hash FROM _schema_meta").fetchone()[0] == SCHEMA_HASH
+        assert cursor.execute("PRAGMA page_size").fetchone()[0] == 8192
+        assert cursor.execute("PRAGMA auto_vacuum").fetchone()[0] == 2  # INCREMENTAL
+        assert cursor.execute("SELECT COUNT(*) FROM users WHERE username = 'admin'").fetchone()[0] == 1
+
+        # Every CREATE in the schema has been applied and every DROP taken effect
+        assert pending_statements(TABLE_DDL + INDEX_DDL, existing_objects(cursor)) == []
+
+
+def test_reinit_with_current_hash_skips_schema_diff(db_manager, monkeypatch):
+    db_manager.close_all_connections()
+
+    def fail(cursor):
+        raise AssertionError("schema diff ran although the hash matches")
+
+    monkeypatch.setattr(core.database, "existing_objects", fail)
+    manager = DatabaseManager(db_manager.app_data_path)
+    try:
+        manager.initialize_database()
+        with manager.get_cursor(readonly=True) as cursor:
+            assert cursor.execute("SELECT COUNT(*) FROM users").fetchone()[0] == 1
+            assert cursor.execute("SELECT COUNT(*) FROM shop_settings").fetchone()[0] == 1
+    finally:
+        manager.close_all_connections()
+
+
+def test_reinit_of_existing_database_applies_missing_objects(db_manager):
+    with db_manager.get_cursor() as cursor:
+        cursor.execute("DROP INDEX idx_sales_customer_date")
+        cursor.execute("CREATE INDEX idx_sales_customer ON sales(customer_id)")
+        cursor.execute("CREATE INDEX idx_sale_items_sale ON sale_items(sale_id)")
+        cursor.execute("UPDATE _schema_meta SET hash = 'outdated'")
+    db_manager.close_all_connections()
+
+    manager = DatabaseManager(db_manager.app_data_path)
+    try:
+        manager.initialize_database()
+        with manager.get_cursor(readonly=True) as cursor:
+            names = existing_objects(cursor)
+            assert "idx_sales_customer_date" in names
+            assert "idx_sales_customer" not in names
+            assert "idx_sale_items_sale" not in names
+            assert cursor.execute("SELECT hash FROM _schema_meta").fetchone()[0] == SCHEMA_HASH
+            assert cursor.execute("SELECT COUNT(*) FROM users WHERE username = 'admin'").fetchone()[0] == 1
+    finally:
+        manager.close_all_connections()